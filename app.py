@@ -7,25 +7,43 @@ from game_logic.character import (
 # Faction è già importato in character e player
 from game_logic.factions import get_factions, AVAILABLE_FACTIONS_OBJECTS
 import traceback  # Importa traceback se vuoi usarlo, anche se logger.error con exc_info=True è spesso sufficiente
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash, Response
+from flask.json.provider import DefaultJSONProvider
 import os
 import traceback
 import logging
 import json
+import functools
 
 from game_logic.factions import get_factions, AVAILABLE_FACTIONS_OBJECTS, Faction, generate_faction_logo_svg
 from game_logic.player import Player
 from game_logic.habitat import Habitat, ALL_BUILDING_BLUEPRINTS as RAW_GAME_BLUEPRINTS
-from game_logic.resources import Resource
+from game_logic.resources import Resource, ResourceVector
+from game_logic.versioning import current_version
 from game_logic.technologies import TECH_TREE, Technology, TechEffect
-from game_logic.game_loop_singleplayer import GameState
+from game_logic.game_loop_singleplayer import GameState, STATE_SECTIONS, resolve_state_sections
+from game_logic.catalog import STATIC_CATALOG
+from game_logic import serialization
+from game_logic.scheduler import RealTimeTickScheduler, CATCH_UP_BURST
+from game_logic.push import STATE_CHANGES, LONG_POLL_MAX_SECONDS, stream_player_state, wait_for_player_change
 from game_logic.hex_map import MarsHexMap
 from game_logic.character import (Character, CharacterAttribute,
                                   get_predefined_character_objects, get_random_level1_bonus,
                                   LEVEL_1_STARTING_BONUSES, ALL_CHARACTER_BONUSES_MAP,
                                   PREDEFINED_CHARACTERS_DATA)
 
+
+class GameJSONProvider(DefaultJSONProvider):
+    """jsonify/tojson through game_logic.serialization: orjson when installed, game objects encoded natively."""
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        return serialization.dumps(obj, **kwargs)
+
+
 app = Flask(__name__)
+app.json = GameJSONProvider(app)
 
 logging.basicConfig(level=logging.DEBUG,
                     format='%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s')
@@ -37,9 +55,71 @@ if app.secret_key == 'dev_secret_key_that_should_be_changed_!@#$':
     app.logger.warning(
         "Using default Flask secret key. Please set FLASK_SECRET_KEY environment variable for production.")
 
-game_instance = GameState()
+# Seed of the generated map; unset: a new random seed for every game (logged by GameState)
+MAP_SEED = int(os.environ['GAME_MAP_SEED']) if os.environ.get('GAME_MAP_SEED') else None
+
+game_instance = GameState(map_seed=MAP_SEED)
 app.logger.info("Global GameState initialized.")
 
+# Il tempo di gioco avanza in un thread dedicato, indipendente dalle richieste HTTP.
+# Velocità iniziale 0 (pausa): finché il giocatore non cambia velocità si gioca a turni con /api/action/next_turn.
+tick_scheduler = RealTimeTickScheduler(
+    game_instance,
+    ticks_per_second=float(os.environ.get('GAME_TICKS_PER_SECOND', 1.0)),
+    speed=int(os.environ.get('GAME_SPEED', 0)),
+    catch_up_policy=os.environ.get('GAME_CATCH_UP_POLICY', CATCH_UP_BURST))
+# Ogni tick sveglia gli stream /api/stream, che inviano le sezioni cambiate
+tick_scheduler.add_tick_listener(lambda game_state, num_ticks: STATE_CHANGES.publish())
+
+
+@app.before_request
+def ensure_tick_scheduler_running():
+    # Avviato alla prima richiesta e non all'import (reloader di Flask, test, import da altri moduli)
+    tick_scheduler.start()
+
+
+def replace_game_instance():
+    """Stops the tick scheduler and installs a new GameState; the next request starts the scheduler again."""
+    global game_instance
+    tick_scheduler.stop()
+    game_instance = GameState(map_seed=MAP_SEED)
+    tick_scheduler.set_game_state(game_instance)
+    return game_instance
+
+
+def game_locked(view=None, *, publish=True):
+    """
+    Runs the view while holding the lock of the current game_instance (the scheduler ticks under the same lock).
+    With publish=False (read-only views) the open streams are not woken up afterwards.
+    """
+    if view is None:
+        return functools.partial(game_locked, publish=publish)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with game_instance.lock:
+            response = view(*args, **kwargs)
+        if publish:
+            STATE_CHANGES.publish()  # Actions change the state outside ticks: push it to the open streams
+        return response
+    return wrapper
+
+def action_result(player_id, message, habitat_id=None, **extra):
+    """
+    Compact response of a successful action: outcome, resources of the habitat it touched and the version
+    of the new state. The client gets the rest as a delta (/api/stream or /api/game_state?since=).
+    """
+    result = {"success": True, "message": message, **extra}
+    player = game_instance.get_player(player_id)
+    habitat = None
+    if player:
+        habitat = player.get_habitat(habitat_id) if habitat_id else player.get_primary_habitat()
+    if habitat:
+        result["habitat_id"] = habitat.id
+        result["resources"] = ResourceVector(habitat.resources)
+    result["version"] = current_version()
+    return jsonify(result)
+
 # Per passare i dati al template per la selezione personaggio
 
 
@@ -74,26 +154,8 @@ def get_character_creation_data_for_template():
 
 
 def process_data_for_json(data_item):
-    if isinstance(data_item, dict):
-        new_dict = {}
-        for k, v in data_item.items():
-            new_key = k.value if isinstance(k, Resource) else str(k)
-            new_dict[new_key] = process_data_for_json(v)
-        return new_dict
-    elif isinstance(data_item, list):
-        return [process_data_for_json(elem) for elem in data_item]
-    elif isinstance(data_item, (set, frozenset)):
-        return [process_data_for_json(elem) for elem in list(data_item)]
-    elif isinstance(data_item, Resource):
-        return data_item.value
-    elif isinstance(data_item, (Technology, TechEffect)):
-        if hasattr(data_item, 'to_dict') and callable(data_item.to_dict):
-            return process_data_for_json(data_item.to_dict())
-        else:
-            app.logger.warning(
-                f"Object of type {type(data_item).__name__} is missing to_dict() method.")
-            return str(data_item)
-    return data_item
+    """Plain-JSON copy of data_item (for templates). Responses do not need it: app.json encodes game objects."""
+    return serialization.to_json_compatible(data_item)
 
 
 @app.route('/')
@@ -281,7 +343,7 @@ def start_game_route():
     # Ora che abbiamo un player_character valido, procediamo
     try:
         app.logger.info("Resetting global game instance for new game.")
-        game_instance = GameState()  # Resetta l'istanza del gioco
+        replace_game_instance()  # Resetta l'istanza del gioco
 
         player_obj = Player(
             name=player_name_input, faction=selected_faction_object, character=player_character)
@@ -323,6 +385,7 @@ def start_game_route():
 
 
 @app.route('/api/action/character_spend_ap', methods=['POST'])
+@game_locked
 def api_char_spend_ap():
     player_id = session.get('player_id')
     if not player_id or not session.get('game_started'):
@@ -338,12 +401,13 @@ def api_char_spend_ap():
     success, message = game_instance.player_spend_attribute_point_action(
         player_id, attribute_name, amount)
     if success:
-        return api_get_game_state()
+        return action_result(player_id, message)
     else:
         return jsonify({"error": message}), 400
 
 
 @app.route('/api/action/character_acquire_bonus', methods=['POST'])
+@game_locked
 def api_char_acquire_bonus():
     player_id = session.get('player_id')
     if not player_id or not session.get('game_started'):
@@ -358,12 +422,13 @@ def api_char_acquire_bonus():
     success, message = game_instance.player_acquire_bonus_action(
         player_id, bonus_id)
     if success:
-        return api_get_game_state()
+        return action_result(player_id, message)
     else:
         return jsonify({"error": message}), 400
 
 
 @app.route('/game')
+@game_locked(publish=False)
 def game_view_html():
     app.logger.debug(f"SESSION AT START OF /game: {dict(session)}")
     player_id = session.get('player_id')
@@ -398,16 +463,14 @@ def game_view_html():
             return redirect(url_for('home'))
 
         game_state_for_template = process_data_for_json(game_state_data_raw)
-        tech_tree_for_js = process_data_for_json(TECH_TREE)
-        building_blueprints_for_js = process_data_for_json(RAW_GAME_BLUEPRINTS)
+        # Serializzati una volta all'avvio (vedi game_logic/catalog.py)
+        tech_tree_for_js = STATIC_CATALOG.data["tech_tree"]
+        building_blueprints_for_js = STATIC_CATALOG.data["building_blueprints"]
 
         app.logger.debug(
             "Game state data fully processed for template and JS.")
         # >>> NUOVO: Prendi tutte le fazioni per il pannello relazioni <<<
-        # Questa funzione restituisce già una lista di dizionari
-        all_factions_list = get_factions()
-        # Non c'è bisogno di process_data_for_json se get_factions() già serializza correttamente
-        # (assicurati che lo faccia, specialmente per gli Enum nei bonus se li usi direttamente)
+        all_factions_list = STATIC_CATALOG.data["factions"]
 
         app.logger.debug(
             "Game state data and supplementary data fully processed for template and JS.")
@@ -426,26 +489,143 @@ def game_view_html():
 
 
 # === API Endpoints (come prima, omessi per brevità se non modificati) ===
+def _if_none_match_version():
+    """Highest state version among the ETags of If-None-Match (None if there are none)."""
+    versions = [int(etag) for etag in request.if_none_match.as_set() if etag.isdigit()]
+    return max(versions) if versions else None
+
+
+def _requested_state_sections():
+    """Sections named by ?fields= (None: all of them). Returns (sections, error response)."""
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    if not fields:
+        return None, None
+    sections, unknown_fields = resolve_state_sections(fields)
+    if unknown_fields:
+        return None, (jsonify({"error": f"Unknown fields: {', '.join(unknown_fields)}",
+                               "valid_sections": list(STATE_SECTIONS)}), 400)
+    return sections, None
+
+
+# ETag = version of the last change visible to the player (GameState.get_player_state_version):
+# If-None-Match with the current one gets a 304 without building the state.
+# ?wait=<seconds> (long poll): with since= or If-None-Match, waits for the next change before answering.
+# ?fields=research,current_research,...: only these sections (names or keys of STATE_SECTIONS) are built,
+# e.g. the research panel never pays for the map. ETag and long poll then follow only these sections.
 @app.route('/api/game_state', methods=['GET'])
 def api_get_game_state():
     player_id = session.get('player_id')
     if not player_id or not session.get('game_started'):
         return jsonify({"error": "Not authenticated or no active game"}), 401
 
-    player = game_instance.get_player(player_id)
-    if not player:
-        session.clear()
-        return jsonify({"error": "Player session invalid, please restart."}), 404
+    # ?since=<version of the last state received>: only the sections changed after it (see GameState.get_player_game_state).
+    since_version = request.args.get('since', type=int)
+    sections, error_response = _requested_state_sections()
+    if error_response:
+        return error_response
+    known_version = since_version if since_version is not None else _if_none_match_version()
+    wait_seconds = min(max(request.args.get('wait', 0.0, type=float), 0.0), LONG_POLL_MAX_SECONDS)
+    if wait_seconds and known_version is not None:
+        wait_for_player_change(lambda: game_instance, player_id, known_version, wait_seconds, sections=sections)
+
+    with game_instance.lock:
+        player = game_instance.get_player(player_id)
+        if not player:
+            session.clear()
+            return jsonify({"error": "Player session invalid, please restart."}), 404
 
-    game_state_data_raw = game_instance.get_player_game_state(player_id)
-    if not game_state_data_raw:
-        return jsonify({"error": "Failed to retrieve game state"}), 500
+        etag = str(game_instance.get_player_state_version(player_id, sections))
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            game_state_data_raw = game_instance.get_player_game_state(player_id, since=since_version, sections=sections)
+            if not game_state_data_raw:
+                return jsonify({"error": "Failed to retrieve game state"}), 500
+            response = jsonify(game_state_data_raw)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# Push channel (Server-Sent Events): one "state" message with the changed sections after every tick or action.
+# A reconnecting EventSource sends the id of the last message as Last-Event-ID and resumes from that version.
+# ?fields= limits the sections as for /api/game_state.
+@app.route('/api/stream', methods=['GET'])
+def api_stream():
+    player_id = session.get('player_id')
+    if not player_id or not session.get('game_started'):
+        return jsonify({"error": "Not authenticated or no active game"}), 401
+    with game_instance.lock:
+        if not game_instance.get_player(player_id):
+            return jsonify({"error": "Player session invalid, please restart."}), 404
+
+    since_version = request.headers.get('Last-Event-ID', type=int)
+    if since_version is None:
+        since_version = request.args.get('since', type=int)
+    sections, error_response = _requested_state_sections()
+    if error_response:
+        return error_response
+    app.logger.debug(f"Push stream opened for Player={player_id} since version {since_version}")
+    stream = stream_player_state(lambda: game_instance, player_id, since=since_version, sections=sections)
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# Viewport paging: /api/map?q0=..&r0=..&q1=..&r1=..&zoom=.. returns only the hexes of the axial box
+# q0 <= q <= q1, r0 <= r <= r1 the player can see, as parallel lists (see MarsHexMap.get_viewport_for_json).
+# ETag = map version: If-None-Match with the current one gets a 304 (the box is part of the URL).
+@app.route('/api/map', methods=['GET'])
+def api_map_viewport():
+    player_id = session.get('player_id')
+    if not player_id or not session.get('game_started'):
+        return jsonify({"error": "Not authenticated or no active game"}), 401
 
-    processed_state = process_data_for_json(game_state_data_raw)
-    return jsonify(processed_state)
+    box = [request.args.get(name, type=int) for name in ('q0', 'r0', 'q1', 'r1')]
+    if None in box:
+        return jsonify({"error": "q0, r0, q1 and r1 are required integers."}), 400
+    q0, r0, q1, r1 = box
+    if q0 > q1 or r0 > r1:
+        return jsonify({"error": "Empty box: q0 must not exceed q1, nor r0 r1."}), 400
+    zoom = request.args.get('zoom', 1.0, type=float)
+    if not zoom > 0:
+        return jsonify({"error": "zoom must be a positive number."}), 400
+
+    with game_instance.lock:
+        if not game_instance.get_player(player_id):
+            session.clear()
+            return jsonify({"error": "Player session invalid, please restart."}), 404
+        etag = str(game_instance.map.versions["map"])
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            try:
+                viewport = game_instance.get_player_map_viewport(player_id, q0, r0, q1, r1, zoom)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            response = jsonify(viewport)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# Tech tree, blueprints and factions never change while the server runs: serialized once, cached by clients.
+# /api/catalog/<version> never changes and is immutable; /api/catalog is revalidated with its ETag.
+@app.route('/api/catalog', methods=['GET'])
+@app.route('/api/catalog/<version>', methods=['GET'])
+def api_catalog(version=None):
+    if version is not None and version != STATIC_CATALOG.version:
+        return redirect(url_for('api_catalog', version=STATIC_CATALOG.version))
+    response = Response(STATIC_CATALOG.body, mimetype='application/json')
+    response.set_etag(STATIC_CATALOG.version)
+    if version is None:
+        response.headers['Cache-Control'] = 'no-cache'
+    else:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response.make_conditional(request)
 
 
 @app.route('/api/action/build', methods=['POST'])
+@game_locked
 def api_build():
     player_id = session.get('player_id')
     if not player_id or not session.get('game_started'):
@@ -469,12 +649,13 @@ def api_build():
     success, message = game_instance.player_build_action(
         player_id, habitat_id, blueprint_id, q_coord, r_coord)  # Passa q,r
     if success:
-        return api_get_game_state()
+        return action_result(player_id, message, habitat_id)
     else:
         return jsonify({"error": message}), 400
 
 
 @app.route('/api/action/upgrade', methods=['POST'])
+@game_locked
 def api_upgrade():
     player_id = session.get('player_id')
     if not player_id or not session.get('game_started'):
@@ -492,12 +673,13 @@ def api_upgrade():
     success, message = game_instance.player_upgrade_action(
         player_id, habitat_id, blueprint_id)
     if success:
-        return api_get_game_state()
+        return action_result(player_id, message, habitat_id)
     else:
         return jsonify({"error": message}), 400
 
 
 @app.route('/api/action/research', methods=['POST'])
+@game_locked
 def api_research():
     player_id = session.get('player_id')
     if not player_id or not session.get('game_started'):
@@ -513,11 +695,32 @@ def api_research():
         f"API Research request: Player={player_id}, Tech={tech_id}")
     success, message = game_instance.player_research_action(player_id, tech_id)
     if success:
-        return api_get_game_state()
+        return action_result(player_id, message)  # Research costs are paid by the primary habitat
     else:
         return jsonify({"error": message}), 400
 
 
+# Ordered list of build/upgrade/research/explore actions, applied all or nothing (see GameState.player_batch_action).
+# One stats recalculation per habitat and one state delta (?since=) for the whole batch.
+@app.route('/api/actions/batch', methods=['POST'])
+@game_locked
+def api_actions_batch():
+    player_id = session.get('player_id')
+    if not player_id or not session.get('game_started'):
+        return jsonify({"error": "Not authenticated"}), 401
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('actions'), list):
+        return jsonify({"error": "Missing actions list"}), 400
+
+    app.logger.debug(f"API Batch request: Player={player_id}, {len(data['actions'])} actions")
+    success, message, results = game_instance.player_batch_action(player_id, data['actions'])
+    if not success:
+        return jsonify({"error": message, "results": results}), 400
+    since_version = request.args.get('since', type=int)
+    return jsonify({"message": message, "results": results,
+                    "state": game_instance.get_player_game_state(player_id, since=since_version)})
+
+
 @app.route('/api/action/next_turn', methods=['POST'])
 def api_next_turn():
     player_id = session.get('player_id')
@@ -530,23 +733,48 @@ def api_next_turn():
 
     try:
         app.logger.debug(f"API Next Turn request for Player={player_id}")
-        game_instance.advance_turn()
-        return api_get_game_state()
+        # Il tick viene eseguito dal thread dello scheduler: qui si attende solo che sia completato
+        if not tick_scheduler.run_ticks(1):
+            return jsonify({"error": "Timed out waiting for the turn to advance."}), 503
+        with game_instance.lock:
+            return action_result(player_id, f"Turno {game_instance.current_turn} completato.",
+                                 current_turn=game_instance.current_turn, current_year=game_instance.current_year)
     except Exception as e:
         app.logger.error(f"Error advancing turn: {e}", exc_info=True)
         return jsonify({"error": "Internal server error during turn advance."}), 500
 
 
+@app.route('/api/game_speed', methods=['GET', 'POST'])
+def api_game_speed():
+    player_id = session.get('player_id')
+    if not player_id or not session.get('game_started'):
+        return jsonify({"error": "Not authenticated"}), 401
+
+    if request.method == 'POST':
+        data = request.get_json()
+        if not data or 'speed' not in data:
+            return jsonify({"error": "Missing speed"}), 400
+        try:
+            speed = int(data.get('speed'))
+        except (ValueError, TypeError):
+            return jsonify({"error": f"Invalid speed: {data.get('speed')}"}), 400
+        success, message = tick_scheduler.set_speed(speed)
+        if not success:
+            return jsonify({"error": message}), 400
+        app.logger.info(f"Player {player_id} set game speed to {speed}x.")
+
+    return jsonify(tick_scheduler.get_status())
+
+
 @app.route('/api/admin/reset_game', methods=['POST'])
 def api_reset_game():
     allowed_ips = ['127.0.0.1']
     if request.remote_addr not in allowed_ips and not app.debug:
         return jsonify({"error": "Unauthorized"}), 403
 
-    global game_instance
     app.logger.warning(
         f"!!! GAME STATE RESET requested by {request.remote_addr} !!!")
-    game_instance = GameState()
+    replace_game_instance()
     current_session_cleared = False
     if 'player_id' in session:
         session.clear()
@@ -0,0 +1,280 @@
+# benchmarks/bench_hex_map.py
+"""
+Hex map benchmarks: HexCell objects (dict storage) vs NumPy arrays (array storage) at several radii.
+
+With pytest-benchmark installed (files are named bench_*.py, so a plain `pytest` run skips them):
+    python -m pytest benchmarks/bench_hex_map.py --benchmark-only
+
+Without extra dependencies (prints memory per hex, map generation time, get_neighbors/explore_hex throughput,
+the spatial queries of MarsHexMap.spatial, the pathfinding of MarsHexMap.paths and the LOD pyramid of MarsHexMap.lod):
+    python -m benchmarks.bench_hex_map [--quick] [--json results.json]
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+try:
+    import pytest
+except ImportError:  # Only the standalone runner is available
+    pytest = None
+
+from benchmarks.synthetic_states import DEFAULT_SEED, quiet_logging
+from game_logic.hex_grid import is_array_storage_available
+from game_logic.hex_map import MarsHexMap, HEX_STORAGE_DICT, HEX_STORAGE_ARRAY
+from game_logic.map_lod import LOD_SCALES
+
+RADII = (10, 50, 100, 200)
+QUICK_RADII = (10, 50, 100)
+SAMPLE_SIZE = 1000  # Coordinates visited per get_neighbors/explore_hex measurement
+QUERY_DISTANCE = 10  # k of the ring/range queries
+SPATIAL_QUERIES = ("ring", "in_range", "line", "nearest_with_resource")
+PATH_OFFSET = (15, -5)  # A* goals: this far from each sampled coordinate (20 hexes)
+PATH_QUERIES = ("a_star", "field_route")
+LOD_PLAYER = "bench_player"
+
+quiet_logging()
+
+
+def _storages():
+    return [HEX_STORAGE_DICT, HEX_STORAGE_ARRAY] if is_array_storage_available() else [HEX_STORAGE_DICT]
+
+
+def build_map(radius, storage, seed=DEFAULT_SEED, map_seed=None):
+    """map_seed: None for one random draw per hex, else the seeded noise-field generation."""
+    random.seed(seed)
+    return MarsHexMap(radius, storage=storage, seed=map_seed)
+
+
+def sample_coords(hex_map, count=SAMPLE_SIZE, seed=DEFAULT_SEED):
+    rng = random.Random(seed)
+    coords = list(hex_map.layout.iter_coords())
+    return [rng.choice(coords) for _ in range(count)]
+
+
+def _get_neighbors_loop(hex_map, coords):
+    for q, r in coords:
+        hex_map.get_neighbors(q, r)
+
+
+def _explore_loop(hex_map, coords):
+    for q, r in coords:
+        hex_map.explore_hex(q, r)
+
+
+def spatial_query_loop(hex_map, query, coords):
+    """Function running one spatial query per coordinate (lines go from each coordinate to the next)."""
+    spatial = hex_map.spatial
+    resources = sorted(spatial.resource_index)
+    if query == "ring":
+        return lambda: [spatial.ring(q, r, QUERY_DISTANCE) for q, r in coords]
+    if query == "in_range":
+        return lambda: [spatial.in_range(q, r, QUERY_DISTANCE) for q, r in coords]
+    if query == "line":
+        return lambda: [spatial.line(q1, r1, q2, r2) for (q1, r1), (q2, r2) in zip(coords, coords[1:])]
+    return lambda: [spatial.nearest_with_resource(q, r, resources[i % len(resources)])
+                    for i, (q, r) in enumerate(coords)]
+
+
+def path_query_loop(hex_map, query, coords):
+    """
+    Function routing from each coordinate: "a_star" to a hex PATH_OFFSET away (mirrored near the edge,
+    the map center on small maps),
+    "field_route" to the map center along its distance field (built beforehand, as shared by many agents).
+    """
+    layout, paths = hex_map.layout, hex_map.paths
+    if query == "field_route":
+        field = paths.distance_field(layout.index_of(0, 0))
+        starts = [layout.index_of(q, r) for q, r in coords]
+        return lambda: [field.path_from(start) for start in starts]
+    dq, dr = PATH_OFFSET
+    pairs = []
+    for q, r in coords:
+        goal = layout.index_of(q + dq, r + dr)
+        if goal is None:
+            goal = layout.index_of(q - dq, r - dr)
+        pairs.append((layout.index_of(q, r), goal if goal is not None else layout.index_of(0, 0)))
+    return lambda: [paths._a_star(start, goal, None) for start, goal in pairs]
+
+
+def lod_map(radius, storage=HEX_STORAGE_DICT):
+    """Seeded map whose whole surface is explored by LOD_PLAYER (every LOD tile is sent)."""
+    hex_map = build_map(radius, storage, map_seed=DEFAULT_SEED)
+    hex_map.reveal_hexes(LOD_PLAYER, range(hex_map.layout.count))
+    return hex_map
+
+
+def lod_query(hex_map, level):
+    """Function fetching every tile of LOD level for LOD_PLAYER (the fully zoomed-out map)."""
+    radius = hex_map.layout.radius
+    return lambda: hex_map.get_lod_for_json(LOD_PLAYER, level, -radius, -radius, radius, radius)
+
+
+# --- pytest-benchmark harnesses ---
+
+if pytest is not None and __name__ != "__main__":
+    pytest.importorskip("pytest_benchmark")
+
+    @pytest.mark.parametrize("radius", RADII)
+    @pytest.mark.parametrize("storage", [HEX_STORAGE_DICT, HEX_STORAGE_ARRAY])
+    def test_get_neighbors(benchmark, storage, radius):
+        if storage == HEX_STORAGE_ARRAY and not is_array_storage_available():
+            pytest.skip("NumPy not installed")
+        hex_map = build_map(radius, storage)
+        coords = sample_coords(hex_map)
+        benchmark.extra_info["calls"] = len(coords)
+        benchmark(_get_neighbors_loop, hex_map, coords)
+
+    @pytest.mark.parametrize("radius", RADII)
+    @pytest.mark.parametrize("storage", [HEX_STORAGE_DICT, HEX_STORAGE_ARRAY])
+    def test_explore_hex(benchmark, storage, radius):
+        if storage == HEX_STORAGE_ARRAY and not is_array_storage_available():
+            pytest.skip("NumPy not installed")
+        benchmark.extra_info["calls"] = SAMPLE_SIZE
+
+        def setup():  # A fresh map per round, so most calls explore a hex for the first time
+            hex_map = build_map(radius, storage)
+            return (hex_map, sample_coords(hex_map)), {}
+
+        benchmark.pedantic(_explore_loop, setup=setup, rounds=5)
+
+    @pytest.mark.parametrize("radius", RADII)
+    @pytest.mark.parametrize("query", SPATIAL_QUERIES)
+    def test_spatial_query(benchmark, query, radius):
+        hex_map = build_map(radius, HEX_STORAGE_DICT)
+        coords = sample_coords(hex_map)
+        benchmark.extra_info["calls"] = len(coords)
+        benchmark(spatial_query_loop(hex_map, query, coords))
+
+    @pytest.mark.parametrize("radius", RADII)
+    @pytest.mark.parametrize("query", PATH_QUERIES)
+    def test_path_query(benchmark, query, radius):
+        hex_map = build_map(radius, HEX_STORAGE_DICT, map_seed=DEFAULT_SEED)
+        coords = sample_coords(hex_map)
+        benchmark.extra_info["calls"] = len(coords)
+        benchmark(path_query_loop(hex_map, query, coords))
+
+    @pytest.mark.parametrize("radius", RADII)
+    def test_distance_field(benchmark, radius):
+        hex_map = build_map(radius, HEX_STORAGE_DICT, map_seed=DEFAULT_SEED)
+        benchmark(hex_map.paths._build_field, hex_map.layout.index_of(0, 0), None)
+
+    @pytest.mark.parametrize("radius", RADII)
+    @pytest.mark.parametrize("level", range(len(LOD_SCALES)))
+    def test_lod_query(benchmark, level, radius):
+        benchmark(lod_query(lod_map(radius), level))
+
+    @pytest.mark.parametrize("radius", RADII)
+    @pytest.mark.parametrize("storage", [HEX_STORAGE_DICT, HEX_STORAGE_ARRAY])
+    def test_seeded_generation(benchmark, storage, radius):
+        if not is_array_storage_available():
+            pytest.skip("NumPy not installed")
+        benchmark(build_map, radius, storage, map_seed=DEFAULT_SEED)
+
+
+# --- Standalone runner ---
+
+def _memory_per_hex(radius, storage):
+    """(bytes per hex allocated while building the map, seconds to build it)."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    hex_map = build_map(radius, storage)
+    elapsed = time.perf_counter() - started
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated / hex_map.layout.count, elapsed
+
+
+def _time_per_call(func, coords, min_time):
+    """Mean seconds per coordinate, repeating func(coords) for at least min_time seconds."""
+    loops = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        func(coords)
+        loops += 1
+        elapsed = time.perf_counter() - started
+    return elapsed / (loops * len(coords))
+
+
+def _explore_time_per_call(radius, storage):
+    """Mean seconds per explore_hex on a fresh map (mostly first-time explorations)."""
+    hex_map = build_map(radius, storage)
+    coords = sample_coords(hex_map)
+    started = time.perf_counter()
+    _explore_loop(hex_map, coords)
+    return (time.perf_counter() - started) / len(coords)
+
+
+def run(radii=RADII, min_time=0.5):
+    results = {"python": platform.python_version(), "platform": platform.platform(), "benchmarks": []}
+
+    def record(name, params, **values):
+        results["benchmarks"].append({"name": name, "params": params, **values})
+        values_text = "  ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                                for key, value in values.items())
+        print(f"{name:<24} {params:<24} {values_text}")
+
+    for radius in radii:
+        for storage in _storages():
+            params = f"radius={radius} {storage}"
+            bytes_per_hex, build_seconds = _memory_per_hex(radius, storage)
+            hex_map = build_map(radius, storage)
+            record("memory", params, hexes=hex_map.layout.count, bytes_per_hex=bytes_per_hex,
+                   build_ms=build_seconds * 1e3)
+            if is_array_storage_available():
+                started = time.perf_counter()
+                build_map(radius, storage, map_seed=DEFAULT_SEED)
+                record("seeded_generation", params, build_ms=(time.perf_counter() - started) * 1e3)
+            coords = sample_coords(hex_map)
+            seconds = _time_per_call(lambda sample: _get_neighbors_loop(hex_map, sample), coords, min_time)
+            record("get_neighbors", params, us_per_call=seconds * 1e6, calls_per_sec=1.0 / seconds)
+            seconds = _explore_time_per_call(radius, storage)
+            record("explore_hex", params, us_per_call=seconds * 1e6, calls_per_sec=1.0 / seconds)
+        # The spatial index does not depend on the storage
+        hex_map = build_map(radius, HEX_STORAGE_DICT)
+        coords = sample_coords(hex_map)
+        for query in SPATIAL_QUERIES:
+            seconds = _time_per_call(lambda sample: spatial_query_loop(hex_map, query, sample)(), coords, min_time)
+            record(f"spatial.{query}", f"radius={radius}", us_per_call=seconds * 1e6, calls_per_sec=1.0 / seconds)
+        # Pathfinding on the seeded terrain (contiguous regions, like the game maps)
+        hex_map = build_map(radius, HEX_STORAGE_DICT, map_seed=DEFAULT_SEED)
+        started = time.perf_counter()
+        hex_map.paths._build_field(hex_map.layout.index_of(0, 0), None)
+        record("path.distance_field", f"radius={radius}", build_ms=(time.perf_counter() - started) * 1e3)
+        for query in PATH_QUERIES:
+            seconds = _time_per_call(lambda sample: path_query_loop(hex_map, query, sample)(), coords, min_time)
+            record(f"path.{query}", f"radius={radius}", us_per_call=seconds * 1e6, calls_per_sec=1.0 / seconds)
+        # Zoomed-out map: the whole surface at each LOD level
+        hex_map = lod_map(radius)
+        started = time.perf_counter()
+        hex_map.lod.add_player("bench_rebuild", hex_map.get_player_visibility(LOD_PLAYER))
+        record("lod.add_player", f"radius={radius}", build_ms=(time.perf_counter() - started) * 1e3)
+        for level, scale in enumerate(LOD_SCALES):
+            query = lod_query(hex_map, level)
+            seconds = _time_per_call(lambda sample: query(), [None], min_time)
+            record("lod.full_map", f"radius={radius} scale={scale}", ms_per_call=seconds * 1e3,
+                   tiles=len(query()["q"]))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hex map storage benchmarks")
+    parser.add_argument("--quick", action="store_true", help="smaller radii and shorter runs (noisier numbers)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to PATH as JSON")
+    args = parser.parse_args(argv)
+    results = run(radii=QUICK_RADII if args.quick else RADII, min_time=0.1 if args.quick else 0.5)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# benchmarks/bench_resources.py
+"""
+ResourceVector vs the {Resource: amount} dicts it replaced, on the per-tick and per-purchase operations.
+
+With pytest-benchmark installed (files are named bench_*.py, so a plain `pytest` run skips them):
+    python -m pytest benchmarks/bench_resources.py --benchmark-only
+
+Without extra dependencies (prints ns per operation for both representations):
+    python -m benchmarks.bench_resources [--quick] [--json results.json]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+try:
+    import pytest
+except ImportError:  # Only the standalone runner is available
+    pytest = None
+
+from game_logic.resources import (Resource, ResourceVector, TICK_FLOOR, INITIAL_RESOURCE_AMOUNTS,
+                                  MAX_STORAGE_CAPACITY)
+
+OPERATIONS = ("tick", "can_afford", "spend")
+NET_PRODUCTION = {Resource.WATER_ICE: 3.5, Resource.REGOLITH_COMPOSITES: 12.0, Resource.RARE_EARTH_ELEMENTS: 0.5,
+                  Resource.ENERGY: -4.0, Resource.FOOD: -1.25}
+COST = {Resource.REGOLITH_COMPOSITES: 200, Resource.RARE_EARTH_ELEMENTS: 80, Resource.WATER_ICE: 50,
+        Resource.ENERGY: 70}
+
+
+# --- Dict baseline (the Habitat.update_tick / ResourceStorage loops before ResourceVector) ---
+
+def dict_tick(resources, net_production, capacity):
+    for resource_type, rate in net_production.items():
+        new_amount = resources.get(resource_type, 0) + rate
+        cap = capacity.get(resource_type, float('inf'))
+        if resource_type == Resource.ENERGY:
+            if new_amount > cap:
+                new_amount = cap
+        else:
+            new_amount = max(0, min(new_amount, cap))
+        resources[resource_type] = new_amount
+
+
+def dict_can_afford(resources, costs):
+    missing = {}
+    for resource_type, amount in costs.items():
+        if resources.get(resource_type, 0) < amount:
+            missing[resource_type.value] = amount - resources.get(resource_type, 0)
+    return not missing, missing
+
+
+def dict_spend(resources, costs):
+    affordable, _ = dict_can_afford(resources, costs)
+    if affordable:
+        for resource_type, amount in costs.items():
+            resources[resource_type] -= amount
+            resources[resource_type] += amount  # Keep the amounts stable across repetitions
+    return affordable
+
+
+# --- ResourceVector ---
+
+def vector_tick(resources, net_production, capacity):
+    resources.add_scaled(net_production, 1)
+    resources.clamp(TICK_FLOOR, capacity)
+
+
+def vector_can_afford(resources, cost_vector):
+    if cost_vector.is_affordable_from(resources):
+        return True, {}
+    return False, cost_vector.shortfall(resources)
+
+
+def vector_spend(resources, cost_vector):
+    affordable = cost_vector.is_affordable_from(resources)
+    if affordable:
+        resources -= cost_vector
+        resources += cost_vector
+    return affordable
+
+
+def operation(kind, name):
+    """(function, args) running the operation name on the dict ("dict") or ResourceVector ("vector") representation."""
+    if kind == "dict":
+        resources, capacity = dict(INITIAL_RESOURCE_AMOUNTS), dict(MAX_STORAGE_CAPACITY)
+        functions = {"tick": (dict_tick, (resources, NET_PRODUCTION, capacity)),
+                     "can_afford": (dict_can_afford, (resources, COST)),
+                     "spend": (dict_spend, (resources, COST))}
+    else:
+        resources, capacity = ResourceVector(INITIAL_RESOURCE_AMOUNTS), ResourceVector(MAX_STORAGE_CAPACITY)
+        net_production, cost_vector = ResourceVector(NET_PRODUCTION), ResourceVector.from_costs(COST)
+        functions = {"tick": (vector_tick, (resources, net_production, capacity)),
+                     "can_afford": (vector_can_afford, (resources, cost_vector)),
+                     "spend": (vector_spend, (resources, cost_vector))}
+    return functions[name]
+
+
+# --- pytest-benchmark harnesses ---
+
+if pytest is not None and __name__ != "__main__":
+    pytest.importorskip("pytest_benchmark")
+
+    @pytest.mark.parametrize("name", OPERATIONS)
+    @pytest.mark.parametrize("kind", ["dict", "vector"])
+    def test_resource_operation(benchmark, kind, name):
+        function, args = operation(kind, name)
+        benchmark(function, *args)
+
+
+# --- Standalone runner ---
+
+def _time_per_call(function, args, min_time):
+    calls = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        for _ in range(1000):
+            function(*args)
+        calls += 1000
+        elapsed = time.perf_counter() - started
+    return elapsed / calls
+
+
+def run(min_time=0.5):
+    results = {"python": platform.python_version(), "platform": platform.platform(), "benchmarks": []}
+    for name in OPERATIONS:
+        timings = {kind: _time_per_call(*operation(kind, name), min_time) for kind in ("dict", "vector")}
+        results["benchmarks"].append({"name": name, **{f"{kind}_ns": seconds * 1e9 for kind, seconds in timings.items()}})
+        print(f"{name:<12} dict {timings['dict'] * 1e9:8.0f} ns   vector {timings['vector'] * 1e9:8.0f} ns   "
+              f"speedup {timings['dict'] / timings['vector']:.2f}x")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ResourceVector vs dict benchmarks")
+    parser.add_argument("--quick", action="store_true", help="shorter runs (noisier numbers)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to PATH as JSON")
+    args = parser.parse_args(argv)
+    results = run(min_time=0.1 if args.quick else 0.5)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
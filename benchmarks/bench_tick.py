@@ -0,0 +1,221 @@
+# benchmarks/bench_tick.py
+"""
+Tick-throughput benchmarks for the game_logic engine.
+
+With pytest-benchmark installed (files are named bench_*.py, so a plain `pytest` run skips them):
+    python -m pytest benchmarks/bench_tick.py --benchmark-only
+
+Without extra dependencies (prints ticks/sec and per-phase timings of a GameState tick, and checks that
+GameState.advance_ticks matches repeated advance_turn calls within FAST_FORWARD_TOLERANCE; exit status 1 if not):
+    python -m benchmarks.bench_tick [--quick] [--json results.json]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+try:
+    import pytest
+except ImportError:  # Only the standalone runner is available
+    pytest = None
+
+from benchmarks.synthetic_states import (PHASES, build_game_state, build_habitat, count_active_modifiers,
+                                         quiet_logging)
+from game_logic.character import get_predefined_character_objects
+from game_logic.game_loop_singleplayer import FAST_FORWARD_TOLERANCE
+from game_logic.resources import Resource
+from game_logic.tick_engine import is_vectorized_engine_available
+
+PHASE_NAMES = tuple(PHASES)
+HABITAT_COUNTS = (1, 4, 16)
+PLAYER_COUNTS = (1, 4, 16)
+FAST_FORWARD_TICKS = 500
+
+quiet_logging()
+
+
+def _game_state_numbers(game_state):
+    """Clock, research progress, populations, stored amounts and net production of game_state, in a fixed order."""
+    numbers = [game_state.current_turn, game_state.current_year, game_state.current_tick_in_year]
+    for player in game_state.players.values():
+        numbers += [player.current_research_progress_rp, len(player.unlocked_technologies)]
+        for habitat in player.habitats.values():
+            numbers.append(habitat.population)
+            numbers += [habitat.resources.get(res_enum, 0) for res_enum in Resource]
+            numbers += [habitat.current_net_production.get(res_enum, 0) for res_enum in Resource]
+    return numbers
+
+
+def fast_forward_check(phase, num_players=None, num_ticks=FAST_FORWARD_TICKS):
+    """
+    (largest relative difference, seconds of the advance_turn loop, seconds of advance_ticks) between
+    num_ticks calls to advance_turn and one advance_ticks(num_ticks) on the same synthetic state.
+    By default there is one player per predefined character (their bonuses change the population upkeep).
+    """
+    num_players = num_players or len(get_predefined_character_objects())
+    looped = build_game_state(phase, num_players=num_players)
+    started = time.perf_counter()
+    for _ in range(num_ticks):
+        looped.advance_turn()
+    loop_seconds = time.perf_counter() - started
+    fast = build_game_state(phase, num_players=num_players)
+    started = time.perf_counter()
+    fast.advance_ticks(num_ticks)
+    fast_seconds = time.perf_counter() - started
+    worst = max(abs(expected - actual) / max(1.0, abs(expected))
+                for expected, actual in zip(_game_state_numbers(looped), _game_state_numbers(fast)))
+    return worst, loop_seconds, fast_seconds
+
+
+# --- pytest-benchmark harnesses ---
+
+if pytest is not None and __name__ != "__main__":
+    pytest.importorskip("pytest_benchmark")
+
+    @pytest.mark.parametrize("phase", PHASE_NAMES)
+    def test_habitat_update_tick(benchmark, phase):
+        habitat = build_habitat(phase)
+        benchmark.extra_info["buildings"] = len(habitat.buildings)
+        benchmark.extra_info["active_modifiers"] = count_active_modifiers(habitat)
+        benchmark(habitat.update_tick)
+
+    @pytest.mark.parametrize("phase", PHASE_NAMES)
+    def test_habitat_recalculate_all_stats(benchmark, phase):
+        habitat = build_habitat(phase)
+        benchmark.extra_info["buildings"] = len(habitat.buildings)
+        benchmark.extra_info["active_modifiers"] = count_active_modifiers(habitat)
+        benchmark(habitat._recalculate_all_stats)
+
+    @pytest.mark.parametrize("num_habitats", HABITAT_COUNTS)
+    def test_player_update_player_state(benchmark, num_habitats):
+        game_state = build_game_state("mid", num_players=1, habitats_per_player=num_habitats)
+        player = next(iter(game_state.players.values()))
+        benchmark(player.update_player_state)
+
+    @pytest.mark.parametrize("num_players", PLAYER_COUNTS)
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_game_state_tick(benchmark, num_players, vectorized):
+        if vectorized and not is_vectorized_engine_available():
+            pytest.skip("NumPy not installed")
+        game_state = build_game_state("mid", num_players=num_players, vectorized_engine=vectorized)
+        benchmark(game_state.advance_turn)
+
+    @pytest.mark.parametrize("phase", PHASE_NAMES)
+    def test_game_state_advance_ticks(benchmark, phase):
+        worst, _, _ = fast_forward_check(phase)
+        assert worst <= FAST_FORWARD_TOLERANCE
+        benchmark.extra_info["ticks"] = FAST_FORWARD_TICKS
+        benchmark.pedantic(lambda game_state: game_state.advance_ticks(FAST_FORWARD_TICKS),
+                           setup=lambda: ((build_game_state(phase, num_players=len(get_predefined_character_objects())),), {}),
+                           rounds=5)
+
+
+# --- Standalone runner ---
+
+def _time_per_call(func, min_time):
+    """Mean seconds per call, repeating func for at least min_time seconds."""
+    calls = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        for _ in range(10):
+            func()
+        calls += 10
+        elapsed = time.perf_counter() - started
+    return elapsed / calls
+
+
+def _game_tick_phases(game_state, num_ticks):
+    """Runs GameState.advance_turn step by step, accumulating the time spent in each step."""
+    timings = {"predictions": 0.0, "habitats": 0.0, "research": 0.0, "clock": 0.0, "events": 0.0}
+    players = list(game_state.players.values())
+    for _ in range(num_ticks):
+        t0 = time.perf_counter()
+        game_state._reschedule_stale_predictions()
+        t1 = time.perf_counter()
+        if game_state.tick_engine:
+            game_state.tick_engine.tick()
+        else:
+            for player in players:
+                for habitat in player.habitats.values():
+                    habitat.update_tick()
+        t2 = time.perf_counter()
+        for player in players:
+            player.accrue_research_progress()
+        t3 = time.perf_counter()
+        game_state._advance_clock(1)
+        t4 = time.perf_counter()
+        game_state._process_due_events()
+        t5 = time.perf_counter()
+        timings["predictions"] += t1 - t0
+        timings["habitats"] += t2 - t1
+        timings["research"] += t3 - t2
+        timings["clock"] += t4 - t3
+        timings["events"] += t5 - t4
+    return {step: total / num_ticks for step, total in timings.items()}
+
+
+def run(min_time=0.5, phase_ticks=2000):
+    results = {"python": platform.python_version(), "platform": platform.platform(), "benchmarks": []}
+
+    def record(name, params, seconds_per_call, **extra):
+        entry = {"name": name, "params": params, "us_per_call": seconds_per_call * 1e6,
+                 "calls_per_sec": 1.0 / seconds_per_call, **extra}
+        results["benchmarks"].append(entry)
+        extra_text = " ".join(f"{key}={value}" for key, value in extra.items())
+        print(f"{name:<32} {params:<22} {entry['us_per_call']:>10.1f} us {entry['calls_per_sec']:>12.0f}/s  {extra_text}")
+
+    for phase in PHASE_NAMES:
+        habitat = build_habitat(phase)
+        info = {"buildings": len(habitat.buildings), "modifiers": count_active_modifiers(habitat)}
+        record("Habitat.update_tick", f"phase={phase}", _time_per_call(habitat.update_tick, min_time), **info)
+        record("Habitat._recalculate_all_stats", f"phase={phase}",
+               _time_per_call(habitat._recalculate_all_stats, min_time), **info)
+
+    for num_habitats in HABITAT_COUNTS:
+        game_state = build_game_state("mid", num_players=1, habitats_per_player=num_habitats)
+        player = next(iter(game_state.players.values()))
+        record("Player.update_player_state", f"habitats={num_habitats}",
+               _time_per_call(player.update_player_state, min_time))
+
+    engines = [False, True] if is_vectorized_engine_available() else [False]
+    for vectorized in engines:
+        for num_players in PLAYER_COUNTS:
+            params = f"players={num_players}{' vec' if vectorized else ''}"
+            game_state = build_game_state("mid", num_players=num_players, vectorized_engine=vectorized)
+            record("GameState.advance_turn", params, _time_per_call(game_state.advance_turn, min_time))
+            game_state = build_game_state("mid", num_players=num_players, vectorized_engine=vectorized)
+            phases = _game_tick_phases(game_state, phase_ticks)
+            results["benchmarks"][-1]["phases_us"] = {step: seconds * 1e6 for step, seconds in phases.items()}
+            print("    phases: " + ", ".join(f"{step} {seconds * 1e6:.1f} us" for step, seconds in phases.items()))
+
+    results["fast_forward_ok"] = True
+    for phase in PHASE_NAMES:
+        worst, loop_seconds, fast_seconds = fast_forward_check(phase)
+        ok = worst <= FAST_FORWARD_TOLERANCE
+        results["fast_forward_ok"] &= ok
+        results["benchmarks"].append({"name": "GameState.advance_ticks", "params": f"phase={phase}",
+                                      "ticks": FAST_FORWARD_TICKS, "loop_ms": loop_seconds * 1e3,
+                                      "fast_forward_ms": fast_seconds * 1e3, "max_relative_error": worst})
+        print(f"{'GameState.advance_ticks':<32} {f'phase={phase}':<22} {FAST_FORWARD_TICKS} ticks: "
+              f"loop {loop_seconds * 1e3:.1f} ms, fast-forward {fast_seconds * 1e3:.1f} ms, "
+              f"max relative error {worst:.1e} ({'ok' if ok else 'ABOVE FAST_FORWARD_TOLERANCE'})")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="game_logic tick-throughput benchmarks")
+    parser.add_argument("--quick", action="store_true", help="shorter runs (noisier numbers)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to PATH as JSON")
+    args = parser.parse_args(argv)
+    results = run(min_time=0.1 if args.quick else 0.5, phase_ticks=200 if args.quick else 2000)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+    return 0 if results["fast_forward_ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# benchmarks/synthetic_states.py
+"""
+Deterministic synthetic game states for the tick benchmarks.
+
+A phase fixes how much of ALL_BUILDING_BLUEPRINTS is built (and at which level), how much of
+TECH_TREE is unlocked (each tech adds its modifiers to the primary habitat) and how many habitats
+each player owns. The same seed always produces the same state.
+"""
+import logging
+import random
+
+from game_logic.character import get_predefined_character_objects
+from game_logic.factions import AVAILABLE_FACTIONS_OBJECTS
+from game_logic.game_loop_singleplayer import GameState
+from game_logic.habitat import Habitat, Building, ALL_BUILDING_BLUEPRINTS
+from game_logic.player import Player
+from game_logic.technologies import TECH_TREE
+from game_logic.resources import Resource
+
+# name: (fraction of blueprints built, (min level, max level), max tech tier unlocked, habitats per player)
+PHASES = {
+    "early": (0.15, (1, 1), 0, 1),
+    "mid": (0.5, (1, 3), 3, 3),
+    "late": (1.0, (3, 6), 5, 8),
+}
+DEFAULT_SEED = 2090
+
+
+def quiet_logging():
+    """The engine logs at DEBUG on every stats recalculation: keep handlers out of the measurements."""
+    logging.disable(logging.CRITICAL)
+
+
+def _unlock_techs_up_to_tier(player, max_tier):
+    # Tier order satisfies the prerequisites (they always point to lower tiers)
+    for tech_id, tech in sorted(TECH_TREE.items(), key=lambda item: (item[1].tier, item[0])):
+        if tech.tier <= max_tier:
+            player.unlock_technology(tech_id, apply_effects=True)
+
+
+def _populate_habitat(habitat, rng, built_fraction, level_range):
+    blueprint_ids = sorted(ALL_BUILDING_BLUEPRINTS)
+    for blueprint_id in rng.sample(blueprint_ids, round(len(blueprint_ids) * built_fraction)):
+        habitat.buildings[blueprint_id] = Building(blueprint_id=blueprint_id, level=rng.randint(*level_range))
+    habitat._recalculate_all_stats()
+    # Mid-range stocks: no resource starts pinned at zero or at capacity
+    for res_enum in Resource:
+        capacity = habitat.storage_capacity[res_enum]
+        habitat.resources[res_enum] = rng.uniform(0.2, 0.8) * (capacity if capacity != float('inf') else 10000)
+
+
+def build_game_state(phase="mid", num_players=1, habitats_per_player=None, seed=DEFAULT_SEED,
+                     vectorized_engine=False):
+    """Returns a GameState in the given phase with num_players players (factions and characters cycled)."""
+    built_fraction, level_range, max_tier, default_habitats = PHASES[phase]
+    habitats_per_player = habitats_per_player or default_habitats
+    rng = random.Random(seed)
+    game_state = GameState(map_radius=3, vectorized_engine=vectorized_engine)
+    factions = [AVAILABLE_FACTIONS_OBJECTS[key] for key in sorted(AVAILABLE_FACTIONS_OBJECTS)]
+    characters = get_predefined_character_objects()
+
+    for index in range(num_players):
+        faction = factions[index % len(factions)]
+        player = Player(f"Bench {index}", faction, characters[index % len(characters)])
+        game_state.add_player(player)
+        for hab_index in range(1, habitats_per_player):
+            player.add_habitat(Habitat(name=f"Bench {index} Outpost {hab_index}", faction=faction,
+                                       player_owner_id=player.id, game_state_ref=game_state))
+        _unlock_techs_up_to_tier(player, max_tier)
+        for habitat in player.habitats.values():
+            _populate_habitat(habitat, rng, built_fraction, level_range)
+
+        available = [tech_id for tech_id, tech in sorted(TECH_TREE.items())
+                     if tech_id not in player.unlocked_technologies and not tech.cost_resources
+                     and all(prereq in player.unlocked_technologies for prereq in tech.prerequisites)]
+        if available:
+            player.current_research_project = rng.choice(available)
+            player._notify_research_changed()
+    return game_state
+
+
+def build_habitat(phase="mid", seed=DEFAULT_SEED):
+    """A single habitat (the primary one of a one-player game) in the given phase."""
+    game_state = build_game_state(phase, num_players=1, habitats_per_player=1, seed=seed)
+    return next(iter(game_state.players.values())).get_primary_habitat()
+
+
+def count_active_modifiers(habitat):
+    return len(habitat.active_tech_modifiers["GLOBAL"]) + \
+        sum(len(mods) for mods in habitat.active_tech_modifiers["BUILDINGS"].values())
@@ -0,0 +1,75 @@
+# game_logic/catalog.py
+import enum
+import hashlib
+import json
+import logging
+
+from .technologies import TECH_TREE
+from .habitat import ALL_BUILDING_BLUEPRINTS
+from .factions import get_factions
+from .hex_map import HEX_TYPES, HEX_RESOURCE_NAMES
+
+logger = logging.getLogger(__name__)
+
+
+def _to_json_data(value):
+    """Converts Resource (and other Enum) keys/values to their string value, recursively."""
+    if isinstance(value, dict):
+        return {(k.value if isinstance(k, enum.Enum) else str(k)): _to_json_data(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_to_json_data(item) for item in value]
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+class StaticCatalog:
+    """
+    Definitions that never change while the server runs: technologies, building blueprints, factions,
+    hex types and resources.
+    Serialized once; the version is a hash of the serialized body, so it changes only when the
+    definitions do and clients can cache /api/catalog/<version> forever.
+    The dynamic game state refers to these entries by ID only (technology_statuses, available_building_ids).
+    """
+
+    def __init__(self):
+        self.data = {
+            # Per-tech fields shown next to the player's status (keyed like technology_statuses)
+            "technologies": {
+                tech_id: {
+                    "id": tech_id,
+                    "name": tech.display_name,
+                    "description": tech.description,
+                    "tier": tech.tier,
+                    "cost_rp": tech.cost_rp,
+                    "cost_resources": _to_json_data(tech.cost_resources),
+                    "prerequisites": list(tech.prerequisites),
+                    "building_prerequisites": dict(tech.building_prerequisites),
+                }
+                for tech_id, tech in TECH_TREE.items()
+            },
+            # Build menu entries (keyed like available_building_ids)
+            "buildings": {
+                bp_id: {
+                    "id": bp_id,
+                    "name": bp_data.get("display_name", bp_id),
+                    "cost": _to_json_data(bp_data.get("cost", {})),
+                }
+                for bp_id, bp_data in ALL_BUILDING_BLUEPRINTS.items()
+            },
+            # Full definitions
+            "tech_tree": {tech_id: _to_json_data(tech.to_dict()) for tech_id, tech in TECH_TREE.items()},
+            "building_blueprints": _to_json_data(ALL_BUILDING_BLUEPRINTS),
+            "factions": _to_json_data(get_factions()),
+            # Decoding tables of the /api/map columns: terrain type IDs and resource bitmask bits
+            "hex_types": list(HEX_TYPES),
+            "hex_resources": list(HEX_RESOURCE_NAMES),
+        }
+        canonical_body = json.dumps(self.data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        self.version = hashlib.sha256(canonical_body.encode("utf-8")).hexdigest()[:16]
+        self.data["version"] = self.version
+        self.body = json.dumps(self.data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        logger.info(f"Static catalog built: version {self.version}, {len(self.body)} bytes.")
+
+
+STATIC_CATALOG = StaticCatalog()
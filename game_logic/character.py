@@ -111,6 +111,8 @@ class Character:
         self.active_bonus_ids = []
         if starting_bonus_id:
             self.active_bonus_ids.append(starting_bonus_id)
+        # Incrementato ad ogni bonus acquisito: gli Habitat lo usano per invalidare le stats derivate
+        self.bonus_version = 0
 
         self.is_custom = is_custom
         self.player_owner_id = None
@@ -171,6 +173,7 @@ class Character:
         bonus_obj = ALL_DEFINED_BONUSES_MAP.get(bonus_id)
         self.bonus_points_available -= bonus_obj.cost_bp
         self.active_bonus_ids.append(bonus_id)
+        self.bonus_version += 1
         logger.info(
             f"Character '{self.name}' acquired bonus '{bonus_obj.display_name}'. BP left: {self.bonus_points_available}")
         return True, f"Bonus '{bonus_obj.display_name}' acquisito."
@@ -0,0 +1,89 @@
+# game_logic/event_scheduler.py
+import heapq
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Kinds of predicted events
+EVENT_RESEARCH_COMPLETE = "research_complete"
+EVENT_STORAGE_FULL = "storage_full"
+EVENT_RESOURCE_DEPLETED = "resource_depleted"
+EVENT_ENERGY_SIGN_CHANGE = "energy_sign_change"
+EVENT_POPULATION_CAP = "population_cap"
+EVENT_RECHECK = "recheck"  # Nothing predicted within the horizon: predict again from there
+
+# How far ahead threshold crossings are predicted (in ticks)
+EVENT_PREDICTION_HORIZON = 4096
+
+# The heap is rebuilt without cancelled entries once they exceed this share of it (and COMPACT_MIN_SIZE entries)
+COMPACT_STALE_RATIO = 0.5
+COMPACT_MIN_SIZE = 64
+
+
+class GameEventScheduler:
+    """
+    Min-heap of predicted game events keyed by tick.
+    Every event belongs to an owner key (e.g. ("habitat", habitat_id) or ("research", player_id)).
+    Rescheduling an owner bumps its generation: its older entries stay in the heap and are
+    discarded lazily when they reach the top, so rescheduling costs O(log n) per new event.
+    When cancelled entries make up more than COMPACT_STALE_RATIO of the heap it is rebuilt without them.
+    """
+
+    def __init__(self):
+        self._heap = []  # (tick, seq, generation, owner_key, kind, payload)
+        self._seq = itertools.count()  # Tie-breaker: events of the same tick pop in scheduling order
+        self._generations = {}  # owner_key -> current generation
+        self._live_counts = {}  # owner_key -> entries of the current generation still in the heap
+        self._stale_count = 0  # Cancelled entries still in the heap
+
+    def __len__(self):
+        return len(self._heap) - self._stale_count
+
+    def cancel(self, owner_key):
+        """Invalidates every pending event of owner_key."""
+        self._generations[owner_key] = self._generations.get(owner_key, 0) + 1
+        self._stale_count += self._live_counts.pop(owner_key, 0)
+        if self._stale_count > COMPACT_STALE_RATIO * len(self._heap) and len(self._heap) >= COMPACT_MIN_SIZE:
+            self._compact()
+
+    def schedule(self, tick, owner_key, kind, payload=None):
+        generation = self._generations.setdefault(owner_key, 0)
+        heapq.heappush(self._heap, (tick, next(self._seq), generation, owner_key, kind, payload))
+        self._live_counts[owner_key] = self._live_counts.get(owner_key, 0) + 1
+
+    def reschedule(self, owner_key, events):
+        """Replaces the pending events of owner_key with events [(tick, kind, payload), ...]."""
+        self.cancel(owner_key)
+        for tick, kind, payload in events:
+            self.schedule(tick, owner_key, kind, payload)
+
+    def _compact(self):
+        generations = self._generations
+        self._heap = [entry for entry in self._heap if entry[2] == generations.get(entry[3])]
+        heapq.heapify(self._heap)  # (tick, seq) keys are unique: the pop order does not change
+        self._stale_count = 0
+
+    def _discard_stale(self):
+        heap = self._heap
+        while heap and heap[0][2] != self._generations.get(heap[0][3]):
+            heapq.heappop(heap)
+            self._stale_count -= 1
+
+    def peek_tick(self):
+        """Tick of the earliest pending event, or None."""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, current_tick):
+        """Removes and returns [(owner_key, kind, payload), ...] for every event due at or before current_tick."""
+        due_events = []
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > current_tick:
+                return due_events
+            _, _, _, owner_key, kind, payload = heapq.heappop(self._heap)
+            self._live_counts[owner_key] -= 1
+            if not self._live_counts[owner_key]:
+                del self._live_counts[owner_key]
+            due_events.append((owner_key, kind, payload))
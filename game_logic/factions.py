@@ -1,5 +1,5 @@
 # game_logic/factions.py
-from .resources import Resource
+from .resources import Resource, RESOURCE_RESOLVER
 import copy
 import logging
 
@@ -37,37 +37,16 @@ class Faction:
         """ Ensure resource keys in bonuses use Enum members """
         processed = {}
         for category, details in bonus_dict.items():
-            if category == "resource_production_modifier" and isinstance(details, dict):
-                enum_details = {}
-                for res_key, value in details.items():
-                    res_enum = self._get_resource_enum_helper(res_key)
-                    if res_enum:
-                        enum_details[res_enum] = value
-                    else:
-                         logger.warning(f"Bonus processing: Invalid resource key '{res_key}' in resource_production_modifier.")
+            if category in ("resource_production_modifier", "starting_resources_bonus") and isinstance(details, dict):
+                enum_details, unknown_keys = RESOURCE_RESOLVER.normalize(details)
+                for res_key in unknown_keys:
+                    logger.warning(f"Bonus processing: Invalid resource key '{res_key}' in {category}.")
                 processed[category] = enum_details
-            elif category == "starting_resources_bonus" and isinstance(details, dict):
-                 enum_details = {}
-                 for res_key, value in details.items():
-                    res_enum = self._get_resource_enum_helper(res_key)
-                    if res_enum:
-                        enum_details[res_enum] = value
-                    else:
-                        logger.warning(f"Bonus processing: Invalid resource key '{res_key}' in starting_resources_bonus.")
-                 processed[category] = enum_details
             else:
                 # Other categories like initial_tech (list) or modifiers (float/dict)
                 processed[category] = details
         return processed
 
-    def _get_resource_enum_helper(self, key):
-        """Internal helper just for bonus processing"""
-        if isinstance(key, Resource): return key
-        if isinstance(key, str):
-             try: return Resource[key.upper()]
-             except KeyError: return None
-        return None
-
     def __str__(self):
         return self.name
 
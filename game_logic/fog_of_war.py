@@ -0,0 +1,87 @@
+# game_logic/fog_of_war.py
+import logging
+
+from .hex_grid import np
+
+logger = logging.getLogger(__name__)
+
+# Same levels as HexCell.visibility_level
+VISIBILITY_UNKNOWN = 0
+VISIBILITY_FOGGED = 1    # Terrain visible
+VISIBILITY_EXPLORED = 2  # Details visible
+
+
+class HexBitset:
+    """Set of hex indices (see hex_grid.HexGridLayout) stored as one bit per hex."""
+
+    __slots__ = ("bits", "count")
+
+    def __init__(self, count):
+        self.bits = bytearray((count + 7) // 8)
+        self.count = count
+
+    def __contains__(self, index):
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+    def add(self, index):
+        """Sets the bit of index. Returns True if it was not set."""
+        byte, bit = index >> 3, 1 << (index & 7)
+        if self.bits[byte] & bit:
+            return False
+        self.bits[byte] |= bit
+        return True
+
+    def discard(self, index):
+        self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def __len__(self):
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def indices(self):
+        """Indices of the set bits, in increasing order."""
+        if np is not None:
+            flags = np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8), bitorder="little")
+            return np.flatnonzero(flags[:self.count]).tolist()
+        return [byte_index * 8 + bit for byte_index, byte in enumerate(self.bits) if byte
+                for bit in range(8) if byte & (1 << bit)]
+
+
+class PlayerVisibility:
+    """
+    What one player has uncovered of the map: one HexBitset per visibility level.
+    A hex at level EXPLORED is also in the FOGGED bitset, so `fogged` holds every hex the player can see.
+    """
+
+    def __init__(self, count):
+        self.fogged = HexBitset(count)
+        self.explored = HexBitset(count)
+
+    def level(self, index):
+        if index in self.explored:
+            return VISIBILITY_EXPLORED
+        return VISIBILITY_FOGGED if index in self.fogged else VISIBILITY_UNKNOWN
+
+    def reveal(self, indices, level=VISIBILITY_EXPLORED):
+        """Raises the hexes at indices to level (never lowers them). Returns the indices whose level rose."""
+        revealed = []
+        for index in indices:
+            raised = self.fogged.add(index)
+            if level >= VISIBILITY_EXPLORED:
+                raised = self.explored.add(index) or raised
+            if raised:
+                revealed.append(index)
+        return revealed
+
+    def set_level(self, index, level):
+        """Sets the level of one hex, also lowering it (e.g. to undo a reveal)."""
+        if level >= VISIBILITY_FOGGED:
+            self.fogged.add(index)
+        else:
+            self.fogged.discard(index)
+        if level >= VISIBILITY_EXPLORED:
+            self.explored.add(index)
+        else:
+            self.explored.discard(index)
+
+    def visible_indices(self):
+        return self.fogged.indices()
@@ -1,18 +1,28 @@
 # game_logic/game_loop_singleplayer.py
 import time
 import uuid
+import random
 import logging
+import threading
 import traceback
 
 from .player import Player
-from .hex_map import MarsHexMap
+from .hex_map import MarsHexMap, HEX_STORAGE_DICT
+from .map_lod import lod_level_for_zoom
 from .factions import AVAILABLE_FACTIONS_OBJECTS
 # Import Technology class for isinstance checks
 from .technologies import TECH_TREE, Technology
-from .habitat import Habitat, ALL_BUILDING_BLUEPRINTS
-from .resources import Resource  # Import Resource for isinstance checks
+from .habitat import Habitat, ALL_BUILDING_BLUEPRINTS, stats_affected_by_blueprint
+from .resources import Resource, ResourceVector  # Import Resource for isinstance checks
 # Assicurati che sia accessibile
 from .character import Character, ALL_CHARACTER_BONUSES_MAP
+from .tick_engine import VectorizedTickEngine, is_vectorized_engine_available
+from .ledger import ResourceLedger
+from .catalog import STATIC_CATALOG
+from .versioning import SectionVersions, current_version
+from .event_scheduler import (GameEventScheduler, EVENT_PREDICTION_HORIZON, EVENT_RESEARCH_COMPLETE,
+                              EVENT_STORAGE_FULL, EVENT_RESOURCE_DEPLETED, EVENT_ENERGY_SIGN_CHANGE,
+                              EVENT_POPULATION_CAP)
 
 logger = logging.getLogger(__name__)
 
@@ -20,22 +30,100 @@ logger = logging.getLogger(__name__)
 TICKS_PER_YEAR = 52
 STARTING_YEAR = 2090
 MAX_EVENTS_LOG = 30
+# Maximum relative difference between advance_ticks(n) and n calls to advance_turn().
+# Only floating-point summation order differs (closed-form sums vs repeated additions);
+# benchmarks/bench_tick.py (fast_forward_check) fails when the difference is larger.
+FAST_FORWARD_TOLERANCE = 1e-9
+
+# Actions accepted by GameState.player_batch_action (applied in order, all or nothing)
+BATCH_ACTION_TYPES = ("build", "upgrade", "research", "explore")
+MAX_BATCH_ACTIONS = 50
+
+# Sections of get_player_game_state and the top-level keys each one fills.
+# A delta request (since=<version>) rebuilds and returns only the sections changed after that version;
+# a request for some sections (see resolve_state_sections) never builds the others.
+STATE_SECTIONS = {
+    "clock": ("current_turn", "current_year", "current_tick_in_year", "game_over", "winner"),
+    "profile": ("player_id", "player_name", "faction_name", "faction_bonuses", "catalog_version"),
+    "character": ("character",),
+    "primary_resources": ("resources", "population"),
+    "primary_report": ("primary_habitat_report",),
+    "primary_stats": ("storage_capacity", "net_production", "max_population", "morale"),
+    "primary_buildings": ("habitat_buildings",),
+    "habitats_overview": ("habitats_overview",),
+    "technologies": ("technology_statuses", "available_building_ids"),
+    "research": ("current_research", "research_production"),
+    "map": ("map_data",),
+    "events": ("events",),
+}
+# Sections that a delta sends as their changes only, under a key of their own:
+# "changed_hexes" replaces the hexes with the same q, r in map_data, "new_events" are appended to events.
+# (A since older than the map change journal gets the full map_data instead.)
+INCREMENTAL_SECTIONS = {
+    "map": ("changed_hexes",),
+    "events": ("new_events",),
+}
+
+
+def resolve_state_sections(fields):
+    """
+    Sections of get_player_game_state that provide fields: section names or top-level keys
+    (e.g. "research" or "current_research"). Returns (set of sections, list of unknown fields).
+    """
+    sections, unknown = set(), []
+    for field in fields:
+        if field in STATE_SECTIONS:
+            sections.add(field)
+            continue
+        section = next((name for name, keys in STATE_SECTIONS.items() if field in keys), None)
+        if section is None:
+            section = next((name for name, keys in INCREMENTAL_SECTIONS.items() if field in keys), None)
+        if section is None:
+            unknown.append(field)
+        else:
+            sections.add(section)
+    return sections, unknown
 
 
 class GameState:
     """Manages the global state of a single-player game instance."""
 
-    def __init__(self, map_radius=10):
+    def __init__(self, map_radius=10, vectorized_engine=False, map_storage=HEX_STORAGE_DICT, map_seed=None):
         self.players = {}  # Dizionario per memorizzare i giocatori: {player_id: player_object}
-        self.map = MarsHexMap(map_radius=map_radius)
+        # Seed of the map generation: logged, so a map can be reproduced by passing it again
+        self.map_seed = map_seed if map_seed is not None else random.randrange(2 ** 32)
+        # map_storage: HEX_STORAGE_DICT or HEX_STORAGE_ARRAY (NumPy arrays, for large radii)
+        self.map = MarsHexMap(map_radius=map_radius, storage=map_storage, seed=self.map_seed)
         self.current_turn = 0
         self.current_year = STARTING_YEAR
         self.current_tick_in_year = 0
         self.events = []
         self.game_over = False
         self.winner = None
+        # Serializes ticks (scheduler thread) with reads and actions (request threads)
+        self.lock = threading.RLock()
+        # Atomic reserve/commit/rollback of resource costs across this game's habitats
+        self.ledger = ResourceLedger()
+        # Change versions of the clock and of the event log (see versioning.py and get_player_game_state)
+        self.versions = SectionVersions(("clock", "events"))
+
+        # Predicted research completions and resource/population threshold crossings, keyed by turn.
+        # Predictions are recomputed only for habitats/players marked stale (rates or amounts changed).
+        self.event_scheduler = GameEventScheduler()
+        self._stale_habitats = set()
+        self._stale_research_player_ids = set()
+
+        # Optional structure-of-arrays engine: all habitats are ticked in one batched NumPy pass.
+        # Off by default: it only pays off from a few habitats up (see benchmarks/bench_tick.py)
+        self.tick_engine = None
+        if vectorized_engine:
+            if is_vectorized_engine_available():
+                self.tick_engine = VectorizedTickEngine()
+            else:
+                logger.warning(
+                    "Vectorized tick engine requested but NumPy is not installed. Using per-habitat ticks.")
         logger.info(
-            f"New GameState initialized. Map Radius: {map_radius}. Turn: {self.current_turn}.")
+            f"New GameState initialized. Map Radius: {map_radius}. Map seed: {self.map_seed}. Turn: {self.current_turn}. Vectorized engine: {self.tick_engine is not None}.")
 
     def add_player(self, player_object: Player):
         if not isinstance(player_object, Player):
@@ -47,6 +135,8 @@ class GameState:
             return player_object.id  # Restituisce l'ID se già esiste
 
         self.players[player_object.id] = player_object
+        player_object.game_state_ref = self
+        self._stale_research_player_ids.add(player_object.id)
         logger.info(
             f"Player '{player_object.name}' (Character: {player_object.character.name if player_object.character else 'N/A'}) added to GameState.")
 
@@ -56,7 +146,11 @@ class GameState:
         if start_hex:
             start_hex.is_explored = True
             start_hex.visibility_level = 2
-            start_hex.owner_player_id = player_object.id
+            self.map.set_hex_owner(start_hex, player_object.id)
+            # Fog of war: the player sees the start hex and the hexes already explored around it
+            explored_neighbors = [hex_cell for hex_cell in self.map.get_neighbors(start_q, start_r, start_s)
+                                  if hex_cell.is_explored]
+            self.map.reveal_area(player_object.id, [start_hex] + explored_neighbors)
             try:
                 habitat_name = f"{player_object.faction.name} Prime Base ({player_object.character.name if player_object.character else player_object.name})"
                 initial_habitat = Habitat(name=habitat_name,
@@ -88,201 +182,157 @@ class GameState:
         return self.players.get(player_id)
     # >>> FINE METODO AGGIUNTO <<<
 
-    def get_player_game_state(self, player_id):
-        player = self.get_player(player_id)
-        if not player:
-            logger.warning(
-                f"Requested game state for non-existent player ID: {player_id}")
-            return None
-
-        # --------------------------------------------------------------------
-        # INIZIALIZZA game_state_data QUI COME DIZIONARIO VUOTO
-        # --------------------------------------------------------------------
-        game_state_data = {}
-
-        # Popola informazioni base del giocatore
-        game_state_data["player_id"] = player.id
-        game_state_data["player_name"] = player.name
-        game_state_data["faction_name"] = player.faction.name if player.faction else "N/A"
-
-        if player.faction:
-            # Faction.to_dict() dovrebbe gestire i suoi Enum
-            faction_dict = player.faction.to_dict()
-            game_state_data["faction_bonuses"] = self._stringify_resource_dict_keys(
-                faction_dict.get('starting_bonus', {}))
-        else:
-            game_state_data["faction_bonuses"] = {}
-
-        # Popola informazioni generali del gioco
-        game_state_data["current_turn"] = self.current_turn
-        game_state_data["current_year"] = self.current_year
-        game_state_data["current_tick_in_year"] = self.current_tick_in_year
-        game_state_data["game_over"] = self.game_over
-        game_state_data["winner"] = self.winner
-
-        # Aggiungi dati del personaggio
-        if player.character:
-            from .character import ALL_CHARACTER_BONUSES_MAP  # Importazione locale per ora
-            game_state_data["character"] = player.character.to_dict(
-                ALL_CHARACTER_BONUSES_MAP)
+    def advance_turn(self):
+        """Advances the whole simulation by one tick."""
+        self._reschedule_stale_predictions()
+        if self.tick_engine:
+            self.tick_engine.tick()
         else:
-            game_state_data["character"] = None
-
-        # Dati dell'Habitat Primario e Overview Habitat
-        # Rinomina per evitare conflitto con game_state_data['habitats_data']
-        habitats_data_list = []
-        # Rinomina per evitare conflitto
-        primary_habitat_report_str = "Nessun habitat primario."
-        primary_habitat = player.get_primary_habitat()
-
-        # Inizializza le chiavi relative all'habitat con valori di default
-        # Queste verranno sovrascritte se primary_habitat esiste
-        game_state_data["resources"] = {res.value: 0 for res in Resource}
-        game_state_data["storage_capacity"] = {res.value: MAX_STORAGE_CAPACITY.get(
-            res, 0) for res in Resource}  # Usa MAX_STORAGE_CAPACITY per default
-        game_state_data["net_production"] = {res.value: 0 for res in Resource}
-        game_state_data["population"] = 0
-        game_state_data["max_population"] = 0
-        game_state_data["morale"] = 0
-        game_state_data["habitat_buildings"] = {}
-
-        if primary_habitat:
-            # Ora puoi assegnare a game_state_data["resources"] ecc.
-            game_state_data["resources"] = {
-                res.value: amount for res, amount in primary_habitat.resources.items()}
-            game_state_data["storage_capacity"] = {
-                res.value: cap for res, cap in primary_habitat.storage_capacity.items()}
-            game_state_data["net_production"] = {
-                res.value: prod for res, prod in primary_habitat.current_net_production.items()}
-            game_state_data["population"] = primary_habitat.population
-            game_state_data["max_population"] = primary_habitat.max_population
-            game_state_data["morale"] = primary_habitat.morale
-            game_state_data["habitat_buildings"] = {
-                bid: {"name": b.name, "level": b.level}
-                for bid, b in primary_habitat.buildings.items() if b.level > 0
-            }
-            primary_habitat_report_str = primary_habitat.get_status_report()
-
-        # Popola l'overview di TUTTI gli habitat del giocatore
-        if player.habitats:  # Verifica se il dizionario habitats esiste ed è popolato
-            for hab_id, hab_obj in player.habitats.items():
-                habitats_data_list.append({
-                    "id": hab_id,
-                    "name": hab_obj.name,
-                    "population": hab_obj.population,
-                    "max_population": hab_obj.max_population,
-                    "resources": {res.value: amount for res, amount in hab_obj.resources.items()},
-                    "buildings": {bid: {"name": b.name, "level": b.level} for bid, b in hab_obj.buildings.items() if b.level > 0}
-                })
-
-        # Usa il nome corretto della variabile
-        game_state_data["habitats_overview"] = habitats_data_list
-        # Usa il nome corretto
-        game_state_data["primary_habitat_report"] = primary_habitat_report_str
-
-        # Tecnologie
-        tech_states = {}
-        for tech_id, tech_obj in TECH_TREE.items():
-            if isinstance(tech_obj, Technology):
-                status = player.get_technology_status(tech_id)
-                # Usa il metodo to_dict della tecnologia
-                tech_data_for_json = tech_obj.to_dict()
-                tech_states[tech_id] = {
-                    "id": tech_data_for_json["id_name"],
-                    "name": tech_data_for_json["display_name"],
-                    "status": status,
-                    "description": tech_data_for_json["description"],
-                    "tier": tech_data_for_json["tier"],
-                    "cost_rp": tech_data_for_json["cost_rp"],
-                    # Già stringhe da to_dict
-                    "cost_resources": tech_data_for_json["cost_resources"],
-                    "prerequisites": tech_data_for_json["prerequisites"],
-                    # Già stringhe da to_dict
-                    "building_prerequisites": tech_data_for_json["building_prerequisites"]
-                }
+            for player in self.players.values():
+                for habitat in player.habitats.values():
+                    habitat.update_tick()
+        for player in self.players.values():
+            player.accrue_research_progress()
+
+        self._advance_clock(1)
+        # Stats refreshed during this tick invalidated the research rate: predict again before firing events
+        self._reschedule_stale_predictions()
+        self._process_due_events()
+
+    # --- Predicted events (see event_scheduler.py) ---
+
+    def invalidate_predictions(self, habitat):
+        """Called by a Habitat whose rates or stored amounts changed outside of a normal tick."""
+        self._stale_habitats.add(habitat)
+        owner = self.players.get(habitat.player_owner_id)
+        if owner:
+            owner.invalidate_research_rate()
+            self._stale_research_player_ids.add(owner.id)
+
+    def invalidate_research_predictions(self, player):
+        """Called by a Player whose current research project changed."""
+        self._stale_research_player_ids.add(player.id)
+
+    def _reschedule_stale_predictions(self):
+        if self._stale_habitats:
+            stale_habitats, self._stale_habitats = self._stale_habitats, set()
+            for habitat in stale_habitats:
+                owner = self.players.get(habitat.player_owner_id)
+                if owner and owner.habitats.get(habitat.id) is habitat:
+                    self._schedule_habitat_events(owner, habitat)
+        if self._stale_research_player_ids:
+            stale_player_ids, self._stale_research_player_ids = self._stale_research_player_ids, set()
+            for player_id in stale_player_ids:
+                player = self.players.get(player_id)
+                if player:
+                    self._schedule_research_events(player)
+
+    def _schedule_habitat_events(self, player, habitat):
+        events = [(self.current_turn + ticks, kind, (player.id, habitat.id, res_enum))
+                  for ticks, kind, res_enum in habitat.predict_threshold_events(EVENT_PREDICTION_HORIZON)]
+        self.event_scheduler.reschedule(("habitat", player.id, habitat.id), events)
+
+    def _schedule_research_events(self, player):
+        events = []
+        research_ticks = player.research_ticks_until_completion()
+        if player.is_research_complete():
+            events.append((self.current_turn, EVENT_RESEARCH_COMPLETE, player.id))  # Reached this tick: fire now
+        elif research_ticks is not None:
+            # One tick early: repeated additions of the RP rate can reach cost_rp before the closed-form estimate
+            events.append((self.current_turn + max(research_ticks - 1, 1), EVENT_RESEARCH_COMPLETE, player.id))
+        self.event_scheduler.reschedule(("research", player.id), events)
+
+    def _process_due_events(self):
+        for owner_key, kind, payload in self.event_scheduler.pop_due(self.current_turn):
+            if kind == EVENT_RESEARCH_COMPLETE:
+                self._handle_research_event(payload)
             else:
-                logger.warning(
-                    f"Item in TECH_TREE with id '{tech_id}' is not a Technology object.")
-        game_state_data["technologies"] = tech_states
-
-        # Ricerca Corrente
-        if player.current_research_project and player.current_research_project in TECH_TREE:
-            game_state_data["current_research"] = {
-                "tech_id": player.current_research_project,
-                "progress_rp": player.current_research_progress_rp,
-                "required_rp": TECH_TREE[player.current_research_project].cost_rp
-            }
-        else:
-            game_state_data["current_research"] = None
-
-        game_state_data["research_production"] = self._stringify_resource_dict_keys(
-            player.get_total_research_production())
-
-        # Dati Mappa ed Eventi
-        game_state_data["map_data"] = self.map.get_map_data_for_json(player_id)
-        game_state_data["events"] = list(self.events)
-
-        # Edifici Disponibili per Costruzione
-        current_available_buildings = []
-        always_available_blueprints = [
-            "BasicHabitatModule", "RegolithExtractorMk1", "WaterIceExtractorMk1", "SolarArrayMk1", "ResearchLab"]
-
-        # << LOG 1
-        logger.debug(
-            f"--- Generating Available Buildings for Player {player.id} ---")
-        # << LOG 2
-        logger.debug(
-            f"Player Unlocked Buildings (Tech): {player.unlocked_buildings}")
-        if player.faction:
-            logger.debug(f"Player Faction: {player.faction.name}")  # << LOG 3
-            logger.debug(
-                # << LOG 4
-                f"Player Faction Initial Buildings: {player.faction.initial_buildings}")
-        else:
-            logger.debug("Player has no faction set.")
-
-        for bp_id, bp_data in ALL_BUILDING_BLUEPRINTS.items():
-            cond1_tech_unlock = (bp_id in player.unlocked_buildings)
-            cond2_always_avail = (bp_id in always_available_blueprints)
-            cond3_faction_initial = (
-                player.faction and bp_id in player.faction.initial_buildings)
-
-            is_unlocked = cond1_tech_unlock or cond2_always_avail or cond3_faction_initial
-
-            # Log dettagliato per ogni blueprint
-            logger.debug(  # << LOG 5 (questo loggherà per ogni edificio nel gioco)
-                f"Blueprint Check: {bp_id:<30} | "
-                f"TechUnlock: {str(cond1_tech_unlock):<5} | "
-                f"AlwaysAvail: {str(cond2_always_avail):<5} | "
-                f"FactionInitial: {str(cond3_faction_initial):<5} | "
-                f"==> IsUnlocked: {str(is_unlocked):<5}"
-            )
-
-            if is_unlocked:
-                # << LOG 6
-                logger.debug(f"    ADDING {bp_id} to available_buildings.")
-                current_available_buildings.append({
-                    "id": bp_id,
-                    "name": bp_data.get("display_name", bp_id),
-                    "cost": self._stringify_resource_dict_keys(bp_data.get("cost", {})),
-                })
-        game_state_data["available_buildings"] = current_available_buildings
+                self._handle_habitat_event(kind, *payload)
 
+    def _handle_research_event(self, player_id):
+        player = self.players.get(player_id)
+        if not player:
+            return
+        if player.current_research_project and player.current_research_project not in TECH_TREE:
+            player.update_research_progress()  # Resets the unknown project
+        elif player.is_research_complete():
+            tech_data = TECH_TREE[player.current_research_project]
+            player.complete_research()
+            self.add_event(f"Ricerca completata: {tech_data.display_name}.",
+                           event_type="research_completed", player_id=player_id)
+        self._schedule_research_events(player)
+
+    def _handle_habitat_event(self, kind, player_id, habitat_id, res_enum):
+        player = self.players.get(player_id)
+        habitat = player.get_habitat(habitat_id) if player else None
+        if not habitat:
+            return
+        message = None
+        if kind == EVENT_STORAGE_FULL and habitat.resources.get(res_enum, 0) >= habitat.storage_capacity.get(res_enum, float('inf')):
+            message = f"Habitat '{habitat.name}': magazzino pieno ({res_enum.value})."
+        elif kind == EVENT_RESOURCE_DEPLETED and habitat.resources.get(res_enum, 0) <= 0:
+            message = f"Habitat '{habitat.name}': {res_enum.value} esaurito."
+        elif kind == EVENT_ENERGY_SIGN_CHANGE:
+            if habitat.resources.get(res_enum, 0) < 0:
+                message = f"Habitat '{habitat.name}': deficit energetico!"
+            else:
+                message = f"Habitat '{habitat.name}': deficit energetico risolto."
+        elif kind == EVENT_POPULATION_CAP and habitat.population >= habitat.max_population:
+            message = f"Habitat '{habitat.name}': popolazione massima raggiunta ({habitat.max_population})."
+        if message:
+            self.add_event(message, event_type=kind, player_id=player_id)
+        # The crossed threshold changes the closed-form model (e.g. a pinned resource): predict again
+        self._schedule_habitat_events(player, habitat)
+
+    def advance_ticks(self, num_ticks):
+        """
+        Advances the simulation by num_ticks ticks in O(events) instead of O(ticks).
+        Between events (a resource reaching its capacity or zero, population reaching max_population,
+        research reaching its cost_rp) resources, population and research progress are computed in
+        closed form from current_net_production; the ticks around each event run through advance_turn.
+        The result matches num_ticks calls to advance_turn within FAST_FORWARD_TOLERANCE (relative),
+        as checked by benchmarks/bench_tick.py.
+        """
+        remaining_ticks = num_ticks
+        while remaining_ticks > 0:
+            self._reschedule_stale_predictions()
+            horizon = remaining_ticks
+            next_event_turn = self.event_scheduler.peek_tick()
+            if next_event_turn is not None:
+                # The event tick and the one before it are simulated exactly
+                horizon = min(horizon, max(next_event_turn - self.current_turn - 2, 0))
+
+            if horizon > 0:
+                for player in self.players.values():
+                    for habitat in player.habitats.values():
+                        habitat.advance_ticks_analytically(horizon)
+                    player.advance_research_analytically(horizon)
+                self._advance_clock(horizon)
+                remaining_ticks -= horizon
+            if remaining_ticks > 0:
+                self.advance_turn()
+                remaining_ticks -= 1
+
+    def _advance_clock(self, num_ticks):
+        self.current_turn += num_ticks
+        self.current_tick_in_year += num_ticks
+        if self.current_tick_in_year >= TICKS_PER_YEAR:
+            self.current_year += self.current_tick_in_year // TICKS_PER_YEAR
+            self.current_tick_in_year %= TICKS_PER_YEAR
+        # Every tick moves stored amounts, population and research progress: one version for all of them
+        version = self.versions.touch("clock")
+        for player in self.players.values():
+            for habitat in player.habitats.values():
+                habitat.versions.touch("resources", version=version)
+            if player.current_research_project:
+                player.versions.touch("research", version=version)
         logger.debug(
-            # << LOG 7
-            f"FINAL available_buildings list for player (count): {len(game_state_data.get('available_buildings', []))}")
-        if game_state_data.get('available_buildings') and len(game_state_data.get('available_buildings')) > 0:
-            logger.debug(
-                # << LOG 8
-                f"First item in FINAL available_buildings: {game_state_data['available_buildings'][0]}")
-        # << LOG 9
-        logger.debug(f"--- Finished Generating Available Buildings ---")
-
-        return game_state_data
+            f"Advanced to turn {self.current_turn} (Year {self.current_year}, tick {self.current_tick_in_year}).")
 
     def add_event(self, message, event_type="general", player_id=None):
         event = {"turn": self.current_turn, "type": event_type,
                  "player_id": player_id, "message": message}
+        event["version"] = self.versions.touch("events")
         self.events.append(event)
         if len(self.events) > MAX_EVENTS_LOG:
             self.events = self.events[-MAX_EVENTS_LOG:]
@@ -293,141 +343,226 @@ class GameState:
             return data_dict
         return {(k.name if isinstance(k, Resource) else str(k)): v for k, v in data_dict.items()}
 
-    def get_player_game_state(self, player_id):
+    def get_player_game_state(self, player_id, since=None, sections=None):
+        """
+        Returns the game state seen by player_id, with the version it corresponds to.
+        With since=<version previously returned> only the sections changed after it are included
+        ("delta": True); the client merges them into the state it already has.
+        sections (names of STATE_SECTIONS, see resolve_state_sections) limits the sections built.
+        """
         player = self.get_player(player_id)
         if not player:
             logger.warning(
                 f"Requested game state for non-existent player ID: {player_id}")
             return None
 
-        # <<< INIZIALIZZA game_state_data QUI, UNA VOLTA SOLA >>>
-        game_state_data = {
-            "player_id": player.id,
-            "player_name": player.name,
-            "faction_name": player.faction.name if player.faction else "N/A",
-            "faction_bonuses": {},  # Sarà popolato dopo
+        # A version from the future (e.g. issued by a previous server process) cannot be trusted
+        is_delta = since is not None and since <= current_version()
+        game_state_data = {}
+        for section in STATE_SECTIONS:
+            if sections is not None and section not in sections:
+                continue
+            if is_delta and self._section_version(section, player) <= since:
+                continue
+            if is_delta and section in INCREMENTAL_SECTIONS:
+                game_state_data.update(getattr(self, f"_build_{section}_changes")(player, since))
+            else:
+                game_state_data.update(getattr(self, f"_build_{section}_section")(player))
+        # Read last: building a section can only issue versions, never change an older one
+        game_state_data["version"] = current_version()
+        game_state_data["delta"] = is_delta
+        return game_state_data
+
+    def get_player_state_version(self, player_id, sections=None):
+        """
+        Version of the last change visible in the state of player_id (None if the player does not exist):
+        get_player_game_state(player_id, since=v, sections=sections) has no sections for every v >= this version.
+        Computed from the section versions only, without building any section (ETag of /api/game_state).
+        """
+        player = self.get_player(player_id)
+        if not player:
+            return None
+        return max(self._section_version(section, player) for section in (sections or STATE_SECTIONS))
+
+    def _section_version(self, section, player):
+        """Version of the last change affecting a section of get_player_game_state."""
+        if section == "clock":
+            return self.versions["clock"]
+        if section == "events":
+            return self.versions["events"]
+        if section == "map":
+            return self.map.versions["map"]
+        if section in ("profile", "character"):
+            return player.versions[section]
+        if section == "technologies":
+            # Statuses also depend on buildings and affordability: the index bumps the version when one changes
+            player.tech_index.sync()
+            return player.versions["technologies"]
+        if section == "research":
+            return max([player.versions["research"]] +
+                       [habitat.versions["stats"] for habitat in player.habitats.values()])
+        if section == "habitats_overview":
+            return max([player.versions["habitats"]] +
+                       [habitat.versions.latest("resources", "buildings") for habitat in player.habitats.values()])
+
+        # The status report renders every section of the habitat
+        habitat_sections = {"primary_resources": ("resources",), "primary_report": (),
+                            "primary_stats": ("stats",), "primary_buildings": ("buildings",)}
+        primary_habitat = player.get_primary_habitat()
+        if not primary_habitat:
+            return player.versions["habitats"]
+        return max(player.versions["habitats"], primary_habitat.versions.latest(*habitat_sections[section]))
+
+    def _build_clock_section(self, player):
+        return {
             "current_turn": self.current_turn,
             "current_year": self.current_year,
             "current_tick_in_year": self.current_tick_in_year,
             "game_over": self.game_over,
             "winner": self.winner,
-            "character": None,  # Default
-            "resources": {res.value: 0 for res in Resource},  # Default
-            "storage_capacity": {res.value: 0 for res in Resource},  # Default
-            "net_production": {res.value: 0 for res in Resource},  # Default
-            "population": 0,  # Default
-            "max_population": 0,  # Default
-            "morale": 0,  # Default
-            "habitat_buildings": {},  # Default
-            "habitats_overview": [],  # Default
-            "primary_habitat_report": "Nessun habitat primario.",  # Default
-            "technologies": {},  # Default
-            "current_research": None,  # Default
-            "research_production": {},  # Default
-            "map_data": [],  # Default
-            "events": [],  # Default
-            "available_buildings": []  # Default
         }
-        # <<< FINE INIZIALIZZAZIONE >>>
 
+    def _build_profile_section(self, player):
+        faction_bonuses = {}
         if player.faction:
             faction_dict = player.faction.to_dict()
-            game_state_data["faction_bonuses"] = self._stringify_resource_dict_keys(
+            faction_bonuses = self._stringify_resource_dict_keys(
                 faction_dict.get('starting_bonus', {}))
+        return {
+            "player_id": player.id,
+            "player_name": player.name,
+            "faction_name": player.faction.name if player.faction else "N/A",
+            "faction_bonuses": faction_bonuses,
+            # Static definitions (tech names, costs, blueprints...) are served by /api/catalog/<catalog_version>
+            "catalog_version": STATIC_CATALOG.version,
+        }
 
+    def _build_character_section(self, player):
+        character_data = None
         if player.character:
-            from .character import ALL_CHARACTER_BONUSES_MAP
-            game_state_data["character"] = player.character.to_dict(
-                ALL_CHARACTER_BONUSES_MAP)
+            character_data = player.character.to_dict(ALL_CHARACTER_BONUSES_MAP)
+        return {"character": character_data}
 
+    def _build_primary_resources_section(self, player):
         primary_habitat = player.get_primary_habitat()
-        if primary_habitat:
-            # Ora puoi aggiungere/aggiornare le chiavi in game_state_data
-            game_state_data["resources"] = {
-                res.value: amount for res, amount in primary_habitat.resources.items()}
-            game_state_data["storage_capacity"] = {
-                res.value: cap for res, cap in primary_habitat.storage_capacity.items()}
-            game_state_data["net_production"] = {
-                res.value: prod for res, prod in primary_habitat.current_net_production.items()}
-            game_state_data["population"] = primary_habitat.population
-            game_state_data["max_population"] = primary_habitat.max_population
-            game_state_data["morale"] = primary_habitat.morale
-            game_state_data["habitat_buildings"] = {
-                bid: {"name": b.name, "level": b.level}
-                for bid, b in primary_habitat.buildings.items() if b.level > 0
+        if not primary_habitat:
+            return {"resources": ResourceVector(), "population": 0}
+        return {
+            "resources": ResourceVector(primary_habitat.resources),
+            "population": primary_habitat.population,
+        }
+
+    def _build_primary_report_section(self, player):
+        primary_habitat = player.get_primary_habitat()
+        if not primary_habitat:
+            return {"primary_habitat_report": "Nessun habitat primario."}
+        return {"primary_habitat_report": primary_habitat.get_status_report()}
+
+    def _build_primary_stats_section(self, player):
+        primary_habitat = player.get_primary_habitat()
+        if not primary_habitat:
+            return {
+                "storage_capacity": ResourceVector(),
+                "net_production": ResourceVector(),
+                "max_population": 0,
+                "morale": 0,
             }
-            game_state_data["primary_habitat_report"] = primary_habitat.get_status_report(
-            )
-
-            # Popola habitats_overview
-            current_habitats_data = []  # Usa una variabile locale per costruire la lista
-            for hab_id, hab_obj in player.habitats.items():
-                current_habitats_data.append({
-                    "id": hab_id,
-                    "name": hab_obj.name,
-                    "population": hab_obj.population,
-                    "max_population": hab_obj.max_population,
-                    "resources": {res.value: amount for res, amount in hab_obj.resources.items()},
-                    "buildings": {bid: {"name": b.name, "level": b.level} for bid, b in hab_obj.buildings.items() if b.level > 0}
-                })
-            game_state_data["habitats_overview"] = current_habitats_data
-        # Non c'è bisogno di un blocco 'else' qui perché abbiamo già impostato i default.
-
-        # Tecnologie
-        current_tech_states = {}  # Usa una variabile locale
-        for tech_id, tech_obj in TECH_TREE.items():
-            if isinstance(tech_obj, Technology):
-                status = player.get_technology_status(tech_id)
-                current_tech_states[tech_id] = {
-                    "id": tech_id,
-                    "name": tech_obj.display_name,
-                    "status": status,
-                    "description": tech_obj.description,
-                    "tier": tech_obj.tier,
-                    "cost_rp": tech_obj.cost_rp,
-                    "cost_resources": self._stringify_resource_dict_keys(tech_obj.cost_resources),
-                    "prerequisites": list(tech_obj.prerequisites),
-                    "building_prerequisites": tech_obj.building_prerequisites
-                }
-            else:
-                logger.warning(
-                    f"Item in TECH_TREE with id '{tech_id}' is not a Technology object.")
-        game_state_data["technologies"] = current_tech_states
+        primary_habitat._refresh_stats()
+        return {
+            "storage_capacity": ResourceVector(primary_habitat.storage_capacity),
+            "net_production": ResourceVector(primary_habitat.current_net_production),
+            "max_population": primary_habitat.max_population,
+            "morale": primary_habitat.morale,
+        }
 
+    def _build_primary_buildings_section(self, player):
+        primary_habitat = player.get_primary_habitat()
+        if not primary_habitat:
+            return {"habitat_buildings": {}}
+        return {"habitat_buildings": {
+            bid: {"name": b.name, "level": b.level}
+            for bid, b in primary_habitat.buildings.items() if b.level > 0
+        }}
+
+    def _build_habitats_overview_section(self, player):
+        habitats_overview = []
+        for hab_id, hab_obj in player.habitats.items():
+            habitats_overview.append({
+                "id": hab_id,
+                "name": hab_obj.name,
+                "population": hab_obj.population,
+                "max_population": hab_obj.max_population,
+                "resources": ResourceVector(hab_obj.resources),
+                "buildings": {bid: {"name": b.name, "level": b.level} for bid, b in hab_obj.buildings.items() if b.level > 0}
+            })
+        return {"habitats_overview": habitats_overview}
+
+    def _build_technologies_section(self, player):
+        """Only IDs and statuses: the definitions are in the static catalog (see catalog.py)."""
+        always_available_blueprints = [
+            "BasicHabitatModule", "RegolithExtractorMk1", "WaterIceExtractorMk1", "SolarArrayMk1", "ResearchLab"]
+        available_building_ids = [
+            bp_id for bp_id in ALL_BUILDING_BLUEPRINTS
+            if (bp_id in player.unlocked_buildings) or
+               (bp_id in always_available_blueprints) or
+               (player.faction and bp_id in player.faction.initial_buildings)
+        ]
+        return {"technology_statuses": player.get_technology_statuses(),
+                "available_building_ids": available_building_ids}
+
+    def _build_research_section(self, player):
+        current_research = None
         if player.current_research_project and player.current_research_project in TECH_TREE:
-            game_state_data["current_research"] = {
+            current_research = {
                 "tech_id": player.current_research_project,
                 "progress_rp": player.current_research_progress_rp,
                 "required_rp": TECH_TREE[player.current_research_project].cost_rp
             }
-        # 'else' non necessario, current_research ha già un default None
+        return {
+            "current_research": current_research,
+            "research_production": self._stringify_resource_dict_keys(player.get_total_research_production()),
+        }
 
-        game_state_data["research_production"] = self._stringify_resource_dict_keys(
-            player.get_total_research_production())
-        game_state_data["map_data"] = self.map.get_map_data_for_json(player_id)
-        game_state_data["events"] = list(self.events)
+    def _build_map_section(self, player):
+        return {"map_data": self.map.get_map_data_for_json(player.id)}
 
-        current_available_buildings = []  # Usa una variabile locale
-        always_available_blueprints = [
-            "BasicHabitatModule", "RegolithExtractorMk1", "WaterIceExtractorMk1", "SolarArrayMk1", "ResearchLab"]
-        for bp_id, bp_data in ALL_BUILDING_BLUEPRINTS.items():
-            is_unlocked = (bp_id in player.unlocked_buildings) or \
-                          (bp_id in always_available_blueprints) or \
-                          (player.faction and bp_id in player.faction.initial_buildings)
-            if is_unlocked:
-                current_available_buildings.append({
-                    "id": bp_id,
-                    "name": bp_data.get("display_name", bp_id),
-                    "cost": self._stringify_resource_dict_keys(bp_data.get("cost", {})),
-                })
-        game_state_data["available_buildings"] = current_available_buildings
+    def _build_map_changes(self, player, since):
+        changed_hexes = self.map.get_changed_hexes_for_json(since, player.id)
+        if changed_hexes is None:  # since predates the map change journal: full map
+            return self._build_map_section(player)
+        return {"changed_hexes": changed_hexes}
 
-        return game_state_data
+    def get_player_map_viewport(self, player_id, q0, r0, q1, r1, zoom=1.0):
+        """
+        The hexes of the box q0 <= q <= q1, r0 <= r <= r1 seen by player_id, in the columnar encoding of
+        MarsHexMap.get_viewport_for_json, with the version it corresponds to (None if the player does not exist).
+        Zoomed out (zoom <= 1 / LOD_SCALES[0]) the box gets the super-hex tiles of the matching LOD level
+        instead (MarsHexMap.get_lod_for_json). Raises ValueError for a box over MAP_VIEWPORT_MAX_HEXES hexes/tiles.
+        """
+        player = self.get_player(player_id)
+        if not player:
+            logger.warning(f"Requested map viewport for non-existent player ID: {player_id}")
+            return None
+        level = lod_level_for_zoom(zoom)
+        if level is None:
+            viewport = self.map.get_viewport_for_json(q0, r0, q1, r1, player.id)
+        else:
+            viewport = self.map.get_lod_for_json(player.id, level, q0, r0, q1, r1)
+        viewport["zoom"] = zoom
+        viewport["version"] = current_version()
+        return viewport
+
+    def _build_events_section(self, player):
+        return {"events": list(self.events)}
+
+    def _build_events_changes(self, player, since):
+        return {"new_events": [event for event in self.events if event["version"] > since]}
 
     def grant_xp_to_player(self, player_id, amount):
         player = self.get_player(player_id)
         if player and player.character:
             player.character.add_xp(amount)
+            player.versions.touch("character")
             # Potrebbe essere necessario salvare lo stato o aggiornare l'UI qui se non fatto altrove
             # self.add_event(f"Personaggio {player.character.name} ha guadagnato {amount} XP.", player_id=player_id)
 
@@ -443,6 +578,7 @@ class GameState:
         success, message = player.character.spend_attribute_point(
             attribute_enum, amount)
         if success:
+            player.versions.touch("character")
             self.add_event(
                 message, event_type="char_attribute_increase", player_id=player_id)
         return success, message
@@ -458,6 +594,7 @@ class GameState:
         if success:
             # Riapplica tutti i bonus del personaggio per aggiornare lo stato
             player._apply_character_bonuses()
+            player.versions.touch("character")
             self.add_event(
                 message, event_type="char_bonus_acquired", player_id=player_id)
         return success, message
@@ -583,6 +720,8 @@ class GameState:
             # Ensure message is appropriate.
             # Find the building to make the message more descriptive:
             hab = player.get_habitat(target_habitat_id)
+            if hab and hab.buildings.get(building_blueprint_id):
+                self.map.mark_building_changed(hab.buildings[building_blueprint_id])
             building_name = hab.buildings.get(building_blueprint_id).name if hab and hab.buildings.get(
                 building_blueprint_id) else blueprint_id
             level = hab.buildings.get(building_blueprint_id).level if hab and hab.buildings.get(
@@ -602,4 +741,178 @@ class GameState:
                            player_id=player_id)
         return success, message
 
+    def player_batch_action(self, player_id, actions):
+        """
+        Applies an ordered list of actions all or nothing. Each action is a dict with a "type":
+          {"type": "build", "habitat_id", "blueprint_id", "q", "r"}   (q, r optional: map placement)
+          {"type": "upgrade", "habitat_id", "blueprint_id"}
+          {"type": "research", "tech_id"}
+          {"type": "explore", "q", "r"}   (an unexplored hex next to an explored one)
+        Every action sees the effects of the previous ones. Costs are reserved in one ledger transaction,
+        the derived stats of each touched habitat are recalculated once at the end and the events are
+        logged only if every action succeeded; otherwise all the effects are undone.
+        Returns (success, message, results) with one {"index", "type", "success", "message"} per attempted action.
+        """
+        player = self.get_player(player_id)
+        if not player:
+            return False, "Player not found.", []
+        if not isinstance(actions, list) or not actions:
+            return False, "No actions given.", []
+        if len(actions) > MAX_BATCH_ACTIONS:
+            return False, f"Too many actions in one batch (max {MAX_BATCH_ACTIONS}).", []
+
+        results = []
+        undo_log = []  # Callables restoring what the applied actions changed (besides resources), in order
+        events = []  # (message, event_type) logged after the commit
+        touched_habitats = {}  # habitat id -> Habitat whose stats were invalidated
+        try:
+            with self.ledger.transaction() as txn:
+                for index, action in enumerate(actions):
+                    action_type = action.get("type") if isinstance(action, dict) else None
+                    success, message = self._apply_batch_action(
+                        player, action, txn, undo_log, events, touched_habitats)
+                    results.append({"index": index, "type": action_type, "success": success, "message": message})
+                    if not success:
+                        txn.abort()
+                        break
+        except Exception:
+            self._undo_batch_actions(undo_log, touched_habitats)
+            raise
+
+        if txn.failed:
+            # The ledger already returned the reserved resources
+            self._undo_batch_actions(undo_log, touched_habitats)
+            failed = results[-1]
+            logger.info(f"Batch of Player {player_id} rejected at action {failed['index']}: {failed['message']}")
+            return False, f"Azione {failed['index'] + 1} ({failed['type']}) non riuscita: {failed['message']} Nessuna azione applicata.", results
+
+        for habitat in touched_habitats.values():
+            habitat._refresh_stats()
+        for message, event_type in events:
+            self.add_event(message, event_type=event_type, player_id=player_id)
+        logger.info(f"Batch of {len(actions)} actions applied for Player {player_id}.")
+        return True, f"{len(actions)} azioni eseguite.", results
+
+    def _undo_batch_actions(self, undo_log, touched_habitats):
+        for undo in reversed(undo_log):
+            undo()
+        for habitat in touched_habitats.values():
+            habitat._refresh_stats()
+
+    def _resolve_player_habitat(self, player, habitat_id):
+        """The player's habitat habitat_id (the primary one if not given). Returns (habitat, error message)."""
+        if not habitat_id:
+            primary_habitat = player.get_primary_habitat()
+            if not primary_habitat:
+                return None, "No habitat specified and no primary habitat found."
+            return primary_habitat, None
+        habitat = player.get_habitat(habitat_id)
+        if not habitat:
+            return None, f"Habitat {habitat_id} not found for player."
+        return habitat, None
+
+    def _apply_batch_action(self, player, action, txn, undo_log, events, touched_habitats):
+        if not isinstance(action, dict) or action.get("type") not in BATCH_ACTION_TYPES:
+            return False, f"Unknown action. Valid types: {list(BATCH_ACTION_TYPES)}."
+        action_type = action["type"]
+        q, r = action.get("q"), action.get("r")
+        if (q is None) != (r is None) or not all(isinstance(c, int) for c in (q, r) if c is not None):
+            return False, "q and r must be given together, as integers."
+
+        if action_type == "research":
+            previous_research = (player.current_research_project, player.current_research_progress_rp)
+            success, message = player.start_research(action.get("tech_id"), txn=txn)
+            if success:
+                def undo_research():
+                    player.current_research_project, player.current_research_progress_rp = previous_research
+                    player._notify_research_changed()
+                undo_log.append(undo_research)
+                events.append((message, "research_started"))
+            return success, message
+
+        if action_type == "explore":
+            if q is None:
+                return False, "Missing q, r of the hex to explore."
+            target_hex = self.map.get_hex(q, r)
+            if not target_hex:
+                return False, f"Hex ({q},{r}) does not exist."
+            visibility = self.map.get_player_visibility(player.id)
+            if target_hex.index in visibility.explored:
+                return False, f"Hex ({q},{r}) is already explored."
+            neighbors = self.map.get_neighbors(q, r)
+            if not any(neighbor.index in visibility.explored for neighbor in neighbors):
+                return False, f"Hex ({q},{r}) is not adjacent to an explored hex."
+            previous_explored = target_hex.is_explored
+            previous_visibility = target_hex.visibility_level
+            previous_levels = {hex_cell.index: visibility.level(hex_cell.index) for hex_cell in [target_hex] + neighbors}
+            self.map.explore_hex(q, r, explorer_faction=player.name, player_id=player.id)
+
+            def undo_explore():
+                target_hex.is_explored = previous_explored
+                target_hex.visibility_level = previous_visibility
+                self.map.spatial.on_explored(target_hex.index, previous_explored)
+                for index, level in previous_levels.items():
+                    self.map.set_player_hex_level(player.id, index, level)
+                self.map.mark_hex_changed(target_hex)
+            undo_log.append(undo_explore)
+            events.append((f"Esagono ({q},{r}) esplorato: {target_hex.hex_type}.", "exploration"))
+            return True, f"Hex ({q},{r}) explored."
+
+        habitat, error = self._resolve_player_habitat(player, action.get("habitat_id"))
+        if error:
+            return False, error
+        blueprint_id = action.get("blueprint_id")
+        previous_building = habitat.buildings.get(blueprint_id)
+        previous_level = previous_building.level if previous_building else 0
+
+        if action_type == "upgrade":
+            success, message = habitat.upgrade_building(blueprint_id, txn=txn)
+            if not success:
+                return False, message
+
+            self.map.mark_building_changed(previous_building)
+
+            def undo_upgrade():
+                previous_building.level = previous_level
+                habitat.versions.touch("buildings")
+                habitat.invalidate_stats(*stats_affected_by_blueprint(previous_building.get_base_stats()))
+                self.map.mark_building_changed(previous_building)
+            undo_log.append(undo_upgrade)
+            touched_habitats[habitat.id] = habitat
+            events.append((f"{previous_building.name} potenziato a Liv. {previous_building.level} in {habitat.name}.",
+                           "upgrade"))
+            return True, message
+
+        # build: the target hex (if any) is checked first, the building is placed only if the build succeeds
+        target_hex = None
+        if q is not None:
+            target_hex = self.map.get_hex(q, r)
+            if not target_hex:
+                return False, f"Hex ({q},{r}) does not exist."
+            if target_hex.building:
+                return False, f"Hex ({q},{r}) is already occupied."
+        success, message = habitat.build_new_building(blueprint_id, player.unlocked_buildings, txn=txn)
+        if not success:
+            return False, message
+        new_building = habitat.buildings[blueprint_id]
+        if target_hex:
+            previous_owner = target_hex.owner_player_id
+            self.map.place_building(q, r, new_building, player.id)
+
+        def undo_build():
+            if previous_building is None:
+                del habitat.buildings[blueprint_id]
+            else:
+                habitat.buildings[blueprint_id] = previous_building
+            habitat.versions.touch("buildings")
+            habitat.invalidate_stats(*stats_affected_by_blueprint(new_building.get_base_stats()))
+            if target_hex:
+                self.map.remove_building(q, r)
+                self.map.set_hex_owner(target_hex, previous_owner)
+        undo_log.append(undo_build)
+        touched_habitats[habitat.id] = habitat
+        where = f"sull'esagono ({q},{r})" if target_hex else f"in {habitat.name}"
+        events.append((f"{new_building.name} costruito {where}.", "construction"))
+        return True, message
+
     # (Game class per console test omessa per brevità, puoi mantenerla se ti serve)
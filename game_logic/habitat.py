@@ -1,7 +1,12 @@
 # game_logic/habitat.py
-from .resources import Resource, INITIAL_RESOURCE_AMOUNTS, MAX_STORAGE_CAPACITY, BASE_PRODUCTION_RATES, ResourceStorage
+from .resources import Resource, INITIAL_RESOURCE_AMOUNTS, MAX_STORAGE_CAPACITY, BASE_PRODUCTION_RATES, ResourceVector, \
+    TICK_FLOOR
 # Importa la classe Faction per type hinting e accesso ai bonus
 from .factions import Faction
+from .ledger import DEFAULT_LEDGER
+from .versioning import SectionVersions
+from .event_scheduler import (EVENT_STORAGE_FULL, EVENT_RESOURCE_DEPLETED, EVENT_ENERGY_SIGN_CHANGE,
+                              EVENT_POPULATION_CAP, EVENT_RECHECK)
 import logging
 import math  # For floor/ceil if needed
 from typing import Optional, Any  # Importa Optional e Any per i type hints
@@ -283,6 +288,72 @@ ALL_BUILDING_BLUEPRINTS = {
 }
 
 
+def _compile_blueprint_costs():
+    cost_vectors = {}
+    for blueprint_id, blueprint in ALL_BUILDING_BLUEPRINTS.items():
+        if "cost" not in blueprint:
+            continue
+        for resource_key in blueprint["cost"]:
+            if not isinstance(resource_key, Resource):
+                logger.warning(
+                    f"Invalid resource key '{resource_key}' in cost for blueprint {blueprint_id}")
+        cost_vectors[blueprint_id] = ResourceVector.from_costs(blueprint["cost"])
+    return cost_vectors
+
+
+# Level-1 costs as ResourceVectors, compiled once (the dicts above stay as-is for the JSON API)
+BLUEPRINT_COST_VECTORS = _compile_blueprint_costs()
+
+
+# --- DERIVED STATS (invalidated independently by the dirty-tracking layer) ---
+STAT_NET_PRODUCTION = "net_production"
+STAT_RESEARCH_PRODUCTION = "research_production"
+STAT_STORAGE_CAPACITY = "storage_capacity"
+STAT_MAX_POPULATION = "max_population"
+ALL_DERIVED_STATS = frozenset({STAT_NET_PRODUCTION, STAT_RESEARCH_PRODUCTION,
+                               STAT_STORAGE_CAPACITY, STAT_MAX_POPULATION})
+# Population upkeep per colonist per tick (scaled by food/water_consumption_modifier)
+FOOD_CONSUMPTION_PER_CAPITA = 0.1
+WATER_CONSUMPTION_PER_CAPITA = 0.05
+
+# Versioned sections of a Habitat (see versioning.py): stored amounts and population, derived stats, buildings
+HABITAT_VERSIONED_SECTIONS = ("resources", "stats", "buildings")
+
+# Character bonuses never touch storage capacity
+CHARACTER_BONUS_STATS = (STAT_NET_PRODUCTION,
+                         STAT_RESEARCH_PRODUCTION, STAT_MAX_POPULATION)
+
+
+def stats_affected_by_blueprint(blueprint):
+    """Returns the derived stats that depend on buildings of the given blueprint."""
+    sections = set()
+    for prod_key in blueprint.get("production_per_level", {}):
+        sections.add(STAT_NET_PRODUCTION if isinstance(
+            prod_key, Resource) else STAT_RESEARCH_PRODUCTION)
+    if "energy_consumption_per_level" in blueprint or "resource_consumption_per_level" in blueprint:
+        sections.add(STAT_NET_PRODUCTION)
+    effects = blueprint.get("effects_per_level", {})
+    if "population_capacity" in effects:
+        sections.add(STAT_MAX_POPULATION)
+    if "storage_capacity" in effects:
+        sections.add(STAT_STORAGE_CAPACITY)
+    return sections
+
+
+def stats_affected_by_modifier(mod_key):
+    """Returns the derived stats read through an active_tech_modifiers key."""
+    if mod_key == "production_rate_modifier":
+        return {STAT_NET_PRODUCTION, STAT_RESEARCH_PRODUCTION}
+    if mod_key.endswith("_production_modifier"):
+        target = mod_key[:-len("_production_modifier")]
+        return {STAT_NET_PRODUCTION} if target in Resource.__members__ else {STAT_RESEARCH_PRODUCTION}
+    if mod_key.endswith("_consumption_modifier"):
+        return {STAT_NET_PRODUCTION}
+    if mod_key == "population_capacity_modifier":
+        return {STAT_MAX_POPULATION}
+    return set()
+
+
 class Building:
     """Represents a single building instance in a habitat."""
 
@@ -310,15 +381,16 @@ class Building:
         blueprint = self.get_base_stats()
         if not blueprint or 'cost' not in blueprint or self.level < 1:
             return {}
-        factor = self.level + 1
-        upgrade_cost = {}
-        for resource_enum, base_cost in blueprint["cost"].items():
-            if isinstance(resource_enum, Resource):
-                upgrade_cost[resource_enum] = math.ceil(base_cost * factor)
-            else:
-                logger.warning(
-                    f"Invalid resource key '{resource_enum}' in cost for blueprint {self.blueprint_id}")
-        return upgrade_cost
+        upgrade_cost_vector = self.get_current_upgrade_cost_vector()
+        return {resource_enum: int(upgrade_cost_vector[resource_enum]) for resource_enum in blueprint["cost"]
+                if isinstance(resource_enum, Resource)}
+
+    def get_current_upgrade_cost_vector(self):
+        """Upgrade cost to the next level as a ResourceVector (None if it cannot be upgraded)."""
+        base_cost_vector = BLUEPRINT_COST_VECTORS.get(self.blueprint_id)
+        if base_cost_vector is None or self.level < 1:
+            return None
+        return (base_cost_vector * (self.level + 1)).ceil()
 
     def __str__(self):
         return f"{self.name} (ID: {self.blueprint_id}, Liv. {self.level})"
@@ -342,6 +414,10 @@ class Habitat:
         self.player_owner_id = player_owner_id  # <<< QUESTA È L'ASSEGNAZIONE CRUCIALE
         self.game_state_ref = game_state_ref
         self.character_bonus_modifiers = {}  # Per bonus personaggio futuri
+        self.versions = SectionVersions(HABITAT_VERSIONED_SECTIONS)
+        # VectorizedTickEngine holding resources and population, and the habitat's row in it (see tick_engine.py)
+        self.tick_engine = None
+        self.tick_engine_row = None
 
         # Log per confermare l'assegnazione
         logger.debug(
@@ -350,11 +426,10 @@ class Habitat:
             f"Habitat.__init__: self.owner_player_id ATTRIBUTE is now '{self.player_owner_id}'")
 
         # Inizializza le altre strutture dati
-        self.resources = {}
-        self.storage_capacity = {}
+        self.resources = ResourceVector(INITIAL_RESOURCE_AMOUNTS)
+        self.reserved_resources = ResourceVector()  # Held by open ledger transactions (see ledger.py)
+        self.storage_capacity = ResourceVector()
         for res_enum in Resource:  # Assicurati che Resource sia importato
-            self.resources[res_enum] = INITIAL_RESOURCE_AMOUNTS.get(
-                res_enum, 0)
             self.storage_capacity[res_enum] = MAX_STORAGE_CAPACITY.get(
                 res_enum, float('inf') if res_enum != Resource.ENERGY else 0)
 
@@ -368,7 +443,15 @@ class Habitat:
         self.population_growth_rate = 0.01
         self.morale = 0.75
         self.research_points_production = {}
-        self.current_net_production = {}
+        self.current_net_production = ResourceVector()
+
+        # Dirty-tracking state: derived stats are recomputed only when invalidated
+        self._dirty_stats = set(ALL_DERIVED_STATS)
+        self._gross_production = {}
+        self._total_consumption = {}
+        self._net_production_population = None
+        self._character_bonus_cache_key = None
+        self._character_bonus_mods = ({}, {})
 
         # Chiamate ai metodi di setup solo DOPO che tutti gli attributi base sono impostati
         self._apply_faction_bonuses()
@@ -382,57 +465,137 @@ class Habitat:
         logger.info(
             f"Habitat '{self.name}' initialized for Faction '{self.faction.name}' (Player: {self.player_owner_id}). Stats recalculated.")
 
-    def _recalculate_all_stats(self):
-        current_storage_capacity = {}
-        for res_enum in Resource:
-            current_storage_capacity[res_enum] = MAX_STORAGE_CAPACITY.get(
-                res_enum, float('inf') if res_enum != Resource.ENERGY else 0)
+    @property
+    def population(self):
+        if self.tick_engine is None:
+            return self._population
+        return float(self.tick_engine.population[self.tick_engine_row])
 
-        gross_production = {res: rate for res,
-                            rate in self.base_production.items()}
-        total_consumption = {res: rate for res,
-                             rate in self.base_consumption.items()}
-        self.research_points_production = {}
-        self.max_population = 0
+    @population.setter
+    def population(self, value):
+        if self.tick_engine is None:
+            self._population = value
+        else:
+            self.tick_engine.population[self.tick_engine_row] = value
 
-        player_char_specific_building_mods = {}
-        global_char_mods_from_player = {}
+    def invalidate_stats(self, *sections):
+        """Marks derived stats as stale. With no arguments every derived stat is invalidated."""
+        self._dirty_stats.update(sections if sections else ALL_DERIVED_STATS)
+        if self.tick_engine is not None:
+            self.tick_engine.mark_stale(self)
 
+    def _recalculate_all_stats(self):
+        """Forces a full recomputation of every derived stat."""
+        self.invalidate_stats()
+        self._refresh_stats()
+
+    def _refresh_stats(self):
+        """Recomputes only the derived stats invalidated since the last refresh."""
+        self._check_character_bonus_version()
+        if self._dirty_stats:
+            dirty_sections = self._dirty_stats
+            self._dirty_stats = set()
+            self._recalculate_stats(dirty_sections)
+            if STAT_NET_PRODUCTION not in dirty_sections and self._net_production_population != self.population:
+                self._update_net_production()  # Population moved while only other stats were stale
+            self.versions.touch("stats")
+            self._notify_predictions_stale()
+        elif self._net_production_population != self.population:
+            # Only the per-capita food/water consumption moved
+            self._update_net_production()
+            self.versions.touch("stats")
+        else:
+            return
+        if self.tick_engine is not None:
+            self.tick_engine.sync(self)
+
+    def _notify_resources_changed(self):
+        """Called when stored amounts change outside of a tick (purchases, transfers)."""
+        self.versions.touch("resources")
+        self._notify_predictions_stale()
+
+    def _notify_predictions_stale(self):
+        """Tells the GameState that the predicted threshold events of this habitat are stale."""
+        invalidate_predictions = getattr(self.game_state_ref, "invalidate_predictions", None)
+        if invalidate_predictions:
+            invalidate_predictions(self)
+
+    def _check_character_bonus_version(self):
+        character = self._get_owner_character()
+        cache_key = (id(character), getattr(character, "bonus_version", 0)) if character else None
+        if cache_key != self._character_bonus_cache_key:
+            self._character_bonus_cache_key = cache_key
+            self._character_bonus_mods = self._collect_character_bonus_modifiers(character)
+            self.invalidate_stats(*CHARACTER_BONUS_STATS)
+
+    def _get_owner_character(self):
         if self.game_state_ref and self.player_owner_id:
-            owner_player = self.game_state_ref.get_player(
-                self.player_owner_id)  # Usa il nome corretto dell'attributo
+            owner_player = self.game_state_ref.get_player(self.player_owner_id)
             if owner_player and owner_player.character:
-                from .character import ALL_CHARACTER_BONUSES_MAP
-                for bonus_id in owner_player.character.active_bonus_ids:
-                    bonus = ALL_CHARACTER_BONUSES_MAP.get(bonus_id)
-                    if bonus:
-                        for effect in bonus.effects:
-                            logger.debug(
-                                f"Processing CharacterBonusEffect: {effect}")
-                            if effect.target_type == "building_type":
-                                if effect.target_id_or_category not in player_char_specific_building_mods:
-                                    player_char_specific_building_mods[effect.target_id_or_category] = [
-                                    ]
-                                player_char_specific_building_mods[effect.target_id_or_category].append(
-                                    effect)
-                                logger.debug(
-                                    f"  Added CharBonus for Building Type: {effect.target_id_or_category} - Effect: {effect.attribute_or_action}")
-                            elif effect.target_type == "habitat" and effect.target_id_or_category == "global":
-                                if effect.attribute_or_action not in global_char_mods_from_player:
-                                    global_char_mods_from_player[effect.attribute_or_action] = [
-                                    ]
-                                global_char_mods_from_player[effect.attribute_or_action].append(
-                                    effect.value)
-                                logger.debug(
-                                    f"  Added Global CharBonus for Habitat: {effect.attribute_or_action} - Value: {effect.value}")
-                            elif effect.target_type == "resource_production" and isinstance(effect.target_id_or_category, Resource):
-                                mod_key = f"{effect.target_id_or_category.name}_{effect.attribute_or_action}"
-                                if mod_key not in global_char_mods_from_player:
-                                    global_char_mods_from_player[mod_key] = []
-                                global_char_mods_from_player[mod_key].append(
-                                    effect.value)
-                                logger.debug(
-                                    f"  Added Resource Prod CharBonus: {mod_key} - Value: {effect.value}")
+                return owner_player.character
+        return None
+
+    def _collect_character_bonus_modifiers(self, character):
+        player_char_specific_building_mods = {}
+        global_char_mods_from_player = {}
+        if not character:
+            return player_char_specific_building_mods, global_char_mods_from_player
+
+        from .character import ALL_CHARACTER_BONUSES_MAP
+        for bonus_id in character.active_bonus_ids:
+            bonus = ALL_CHARACTER_BONUSES_MAP.get(bonus_id)
+            if bonus:
+                for effect in bonus.effects:
+                    logger.debug(
+                        f"Processing CharacterBonusEffect: {effect}")
+                    if effect.target_type == "building_type":
+                        if effect.target_id_or_category not in player_char_specific_building_mods:
+                            player_char_specific_building_mods[effect.target_id_or_category] = [
+                            ]
+                        player_char_specific_building_mods[effect.target_id_or_category].append(
+                            effect)
+                        logger.debug(
+                            f"  Added CharBonus for Building Type: {effect.target_id_or_category} - Effect: {effect.attribute_or_action}")
+                    elif effect.target_type == "habitat" and effect.target_id_or_category == "global":
+                        if effect.attribute_or_action not in global_char_mods_from_player:
+                            global_char_mods_from_player[effect.attribute_or_action] = [
+                            ]
+                        global_char_mods_from_player[effect.attribute_or_action].append(
+                            effect.value)
+                        logger.debug(
+                            f"  Added Global CharBonus for Habitat: {effect.attribute_or_action} - Value: {effect.value}")
+                    elif effect.target_type == "resource_production" and isinstance(effect.target_id_or_category, Resource):
+                        mod_key = f"{effect.target_id_or_category.name}_{effect.attribute_or_action}"
+                        if mod_key not in global_char_mods_from_player:
+                            global_char_mods_from_player[mod_key] = []
+                        global_char_mods_from_player[mod_key].append(
+                            effect.value)
+                        logger.debug(
+                            f"  Added Resource Prod CharBonus: {mod_key} - Value: {effect.value}")
+        return player_char_specific_building_mods, global_char_mods_from_player
+
+    def _recalculate_stats(self, sections):
+        want_net = STAT_NET_PRODUCTION in sections
+        want_rp = STAT_RESEARCH_PRODUCTION in sections
+        want_storage = STAT_STORAGE_CAPACITY in sections
+        want_pop_cap = STAT_MAX_POPULATION in sections
+
+        if want_storage:
+            current_storage_capacity = {}
+            for res_enum in Resource:
+                current_storage_capacity[res_enum] = MAX_STORAGE_CAPACITY.get(
+                    res_enum, float('inf') if res_enum != Resource.ENERGY else 0)
+        if want_net:
+            gross_production = {res: rate for res,
+                                rate in self.base_production.items()}
+            total_consumption = {res: rate for res,
+                                 rate in self.base_consumption.items()}
+        if want_rp:
+            research_points_production = {}
+        if want_pop_cap:
+            max_population = 0
+
+        player_char_specific_building_mods, global_char_mods_from_player = self._character_bonus_mods
 
         for building_obj in self.buildings.values():
             if building_obj.level <= 0:
@@ -442,12 +605,14 @@ class Habitat:
             blueprint = building_obj.get_base_stats()
             level = building_obj.level
 
-            prod_dict = blueprint.get("production_per_level", {})
+            prod_dict = blueprint.get("production_per_level", {}) if (want_net or want_rp) else {}
             for prod_key, base_val_per_level in prod_dict.items():
+                is_resource = isinstance(prod_key, Resource)
+                if (is_resource and not want_net) or (not is_resource and not want_rp):
+                    continue
                 base_prod = base_val_per_level * level
                 modified_prod = base_prod
-                key_str = prod_key.name if isinstance(
-                    prod_key, Resource) else str(prod_key)
+                key_str = prod_key.name if is_resource else str(prod_key)
 
                 global_tech_mod = self.active_tech_modifiers["GLOBAL"].get(
                     f"{key_str}_production_modifier", 1.0)
@@ -467,61 +632,67 @@ class Habitat:
                         elif char_effect.attribute_or_action == f"{key_str}_production_modifier" and char_effect.modifier_type == "percentage_increase":
                             modified_prod *= (1 + char_effect.value)
 
-                if isinstance(prod_key, Resource):
+                if is_resource:
                     gross_production[prod_key] = gross_production.get(
                         prod_key, 0) + modified_prod
                 elif isinstance(prod_key, str):
-                    self.research_points_production[prod_key] = self.research_points_production.get(
+                    research_points_production[prod_key] = research_points_production.get(
                         prod_key, 0) + modified_prod
 
-            energy_cons_per_level = blueprint.get(
-                "energy_consumption_per_level", 0)
-            base_energy_cons = energy_cons_per_level * level
-            modified_energy_cons = base_energy_cons
-            energy_mod_key_tech = "energy_consumption_modifier"
-            global_energy_tech_mod = self.active_tech_modifiers["GLOBAL"].get(
-                energy_mod_key_tech, 1.0)
-            building_energy_tech_mod_dict = self.active_tech_modifiers["BUILDINGS"].get(
-                blueprint_id, {})
-            building_energy_tech_mod = building_energy_tech_mod_dict.get(
-                energy_mod_key_tech, 1.0)
-            modified_energy_cons *= global_energy_tech_mod * building_energy_tech_mod
-
-            if blueprint_id in player_char_specific_building_mods:
-                for char_effect in player_char_specific_building_mods[blueprint_id]:
-                    if char_effect.attribute_or_action == "energy_consumption_modifier" and char_effect.modifier_type == "percentage_decrease":
-                        modified_energy_cons *= (1 - char_effect.value)
-
-            char_global_energy_cons_mod_values = global_char_mods_from_player.get(
-                "building_energy_consumption_modifier", [])
-            for mod_val in char_global_energy_cons_mod_values:
-                if isinstance(mod_val, (float, int)) and mod_val < 1:
-                    modified_energy_cons *= (1 - mod_val)
-
-            total_consumption[Resource.ENERGY] = total_consumption.get(
-                Resource.ENERGY, 0) + modified_energy_cons
-
-            resource_cons_dict = blueprint.get(
-                "resource_consumption_per_level", {})
-            for res_key, base_val_per_level in resource_cons_dict.items():
-                if isinstance(res_key, Resource):
-                    base_res_cons = base_val_per_level * level
-                    modified_res_cons = base_res_cons
-                    res_mod_key_tech = f"{res_key.name}_consumption_modifier"
-                    global_res_tech_mod = self.active_tech_modifiers["GLOBAL"].get(
-                        res_mod_key_tech, 1.0)
-                    building_res_tech_mod_dict = self.active_tech_modifiers["BUILDINGS"].get(
-                        blueprint_id, {})
-                    building_res_tech_mod = building_res_tech_mod_dict.get(
-                        res_mod_key_tech, 1.0)
-                    modified_res_cons *= global_res_tech_mod * building_res_tech_mod
-                    total_consumption[res_key] = total_consumption.get(
-                        res_key, 0) + modified_res_cons
+            if want_net:
+                energy_cons_per_level = blueprint.get(
+                    "energy_consumption_per_level", 0)
+                base_energy_cons = energy_cons_per_level * level
+                modified_energy_cons = base_energy_cons
+                energy_mod_key_tech = "energy_consumption_modifier"
+                global_energy_tech_mod = self.active_tech_modifiers["GLOBAL"].get(
+                    energy_mod_key_tech, 1.0)
+                building_energy_tech_mod_dict = self.active_tech_modifiers["BUILDINGS"].get(
+                    blueprint_id, {})
+                building_energy_tech_mod = building_energy_tech_mod_dict.get(
+                    energy_mod_key_tech, 1.0)
+                modified_energy_cons *= global_energy_tech_mod * building_energy_tech_mod
+
+                if blueprint_id in player_char_specific_building_mods:
+                    for char_effect in player_char_specific_building_mods[blueprint_id]:
+                        if char_effect.attribute_or_action == "energy_consumption_modifier" and char_effect.modifier_type == "percentage_decrease":
+                            modified_energy_cons *= (1 - char_effect.value)
+
+                char_global_energy_cons_mod_values = global_char_mods_from_player.get(
+                    "building_energy_consumption_modifier", [])
+                for mod_val in char_global_energy_cons_mod_values:
+                    if isinstance(mod_val, (float, int)) and mod_val < 1:
+                        modified_energy_cons *= (1 - mod_val)
+
+                total_consumption[Resource.ENERGY] = total_consumption.get(
+                    Resource.ENERGY, 0) + modified_energy_cons
+
+                resource_cons_dict = blueprint.get(
+                    "resource_consumption_per_level", {})
+                for res_key, base_val_per_level in resource_cons_dict.items():
+                    if isinstance(res_key, Resource):
+                        base_res_cons = base_val_per_level * level
+                        modified_res_cons = base_res_cons
+                        res_mod_key_tech = f"{res_key.name}_consumption_modifier"
+                        global_res_tech_mod = self.active_tech_modifiers["GLOBAL"].get(
+                            res_mod_key_tech, 1.0)
+                        building_res_tech_mod_dict = self.active_tech_modifiers["BUILDINGS"].get(
+                            blueprint_id, {})
+                        building_res_tech_mod = building_res_tech_mod_dict.get(
+                            res_mod_key_tech, 1.0)
+                        modified_res_cons *= global_res_tech_mod * building_res_tech_mod
+                        total_consumption[res_key] = total_consumption.get(
+                            res_key, 0) + modified_res_cons
+
+            if not (want_storage or want_pop_cap):
+                continue
 
              # --- Calculate Effects (Pop Cap, Storage Cap, etc.) ---
             effects_dict = blueprint.get("effects_per_level", {})
             for effect_key, base_val_per_level in effects_dict.items():
                 if effect_key == "population_capacity":
+                    if not want_pop_cap:
+                        continue
                     modified_pop_cap_increase = base_val_per_level * level
                     # Applica modificatori tecnologici
                     pop_cap_mod_key_tech = "population_capacity_modifier"
@@ -534,16 +705,17 @@ class Habitat:
                     modified_pop_cap_increase *= global_pop_cap_tech_mod * building_pop_cap_tech_mod
 
                     # Applica modificatori da bonus personaggio
-                    # Assicurati che player_char_specific_building_mods sia definito prima
                     if blueprint_id in player_char_specific_building_mods:
                         for char_effect in player_char_specific_building_mods[blueprint_id]:
                             if char_effect.attribute_or_action == "population_capacity_modifier" and char_effect.modifier_type == "percentage_increase":
                                 modified_pop_cap_increase *= (
                                     1 + char_effect.value)
 
-                    self.max_population += modified_pop_cap_increase  # <<< SPOSTATO QUI DENTRO
+                    max_population += modified_pop_cap_increase
 
                 elif effect_key == "storage_capacity":
+                    if not want_storage:
+                        continue
                     for res_to_store, cap_increase_per_level in base_val_per_level.items():
                         if isinstance(res_to_store, Resource):
                             modified_cap_increase = cap_increase_per_level * level
@@ -564,38 +736,55 @@ class Habitat:
                         f"Unhandled building effect key: {effect_key} for building {blueprint_id}")
                     pass
 
-        self.storage_capacity = current_storage_capacity
+        # Derived dicts are updated in place: they may be views owned by a tick engine
+        if want_storage:
+            self.storage_capacity.update(current_storage_capacity)
+        if want_pop_cap:
+            self.max_population = max_population
+        if want_rp:
+            self.research_points_production = research_points_production
+        if want_net:
+            # Character production bonuses do not depend on population, fold them in once
+            for res_enum in Resource:
+                prod = gross_production.get(res_enum, 0)
+                char_global_prod_mod_values = global_char_mods_from_player.get(
+                    f"{res_enum.name}_production_modifier", [])
+                for mod_val in char_global_prod_mod_values:
+                    if isinstance(mod_val, (float, int)):
+                        if mod_val > 0 and mod_val < 1:
+                            prod *= (1 + mod_val)
+                        elif mod_val > 1:
+                            prod *= mod_val
+                gross_production[res_enum] = prod
+            self._gross_production = gross_production
+            self._total_consumption = total_consumption
+            self._update_net_production()
+        logger.debug(
+            f"Habitat '{self.name}' stats recalculated ({', '.join(sorted(sections))}). Net Prod: {self.current_net_production}, RP: {self.research_points_production}, MaxPop: {self.max_population}")
 
-        self.current_net_production = {}
+    def _update_net_production(self):
+        """Combines the cached building production/consumption with the population-dependent upkeep."""
+        net_production = {}
         for res_enum in Resource:
-            prod = gross_production.get(res_enum, 0)
-            cons = total_consumption.get(res_enum, 0)
-
-            char_global_prod_mod_values = global_char_mods_from_player.get(
-                f"{res_enum.name}_production_modifier", [])
-            for mod_val in char_global_prod_mod_values:
-                if isinstance(mod_val, (float, int)):
-                    if mod_val > 0 and mod_val < 1:
-                        prod *= (1 + mod_val)
-                    elif mod_val > 1:
-                        prod *= mod_val
+            prod = self._gross_production.get(res_enum, 0)
+            cons = self._total_consumption.get(res_enum, 0)
 
             if res_enum == Resource.FOOD:
-                base_food_consumption_per_capita = 0.1
+                base_food_consumption_per_capita = FOOD_CONSUMPTION_PER_CAPITA
                 food_consumption_modifier_tech = self.active_tech_modifiers["GLOBAL"].get(
                     "food_consumption_modifier", 1.0)
                 cons += self.population * base_food_consumption_per_capita * \
                     food_consumption_modifier_tech
             if res_enum == Resource.WATER_ICE:
-                base_water_consumption_per_capita = 0.05
+                base_water_consumption_per_capita = WATER_CONSUMPTION_PER_CAPITA
                 water_consumption_modifier_tech = self.active_tech_modifiers["GLOBAL"].get(
                     "water_consumption_modifier", 1.0)
                 cons += self.population * base_water_consumption_per_capita * \
                     water_consumption_modifier_tech
 
-            self.current_net_production[res_enum] = prod - cons
-        logger.debug(
-            f"Habitat '{self.name}' stats recalculated. Net Prod: {self.current_net_production}, RP: {self.research_points_production}, MaxPop: {self.max_population}")
+            net_production[res_enum] = prod - cons
+        self.current_net_production.update(net_production)
+        self._net_production_population = self.population
 
     def _add_base_habitat_module(self):
         blueprint_id = "BasicHabitatModule"
@@ -629,6 +818,7 @@ class Habitat:
                 mod_key, 1.0)
             self.active_tech_modifiers["GLOBAL"][mod_key] = current_val * \
                 bonuses["energy_production_modifier"]
+            self.invalidate_stats(*stats_affected_by_modifier(mod_key))
             logger.info(
                 f"  Faction Bonus: {mod_key} set to {self.active_tech_modifiers['GLOBAL'][mod_key]}")
 
@@ -640,6 +830,8 @@ class Habitat:
                         mod_key, 1.0)
                     self.active_tech_modifiers["GLOBAL"][mod_key] = current_val * \
                         modifier_value
+                    self.invalidate_stats(
+                        *stats_affected_by_modifier(mod_key))
                     logger.info(
                         f"  Faction Bonus: {mod_key} set to {self.active_tech_modifiers['GLOBAL'][mod_key]}")
                 else:
@@ -654,6 +846,8 @@ class Habitat:
                         rp_mod_key, 1.0)
                     self.active_tech_modifiers["GLOBAL"][rp_mod_key] = current_val * \
                         modifier_value
+                    self.invalidate_stats(
+                        *stats_affected_by_modifier(rp_mod_key))
                     logger.info(
                         f"  Faction Bonus: {rp_mod_key} set to {self.active_tech_modifiers['GLOBAL'][rp_mod_key]}")
             elif isinstance(bonuses["research_speed_modifier"], (int, float)):
@@ -662,6 +856,7 @@ class Habitat:
                     mod_key, 1.0)
                 self.active_tech_modifiers["GLOBAL"][mod_key] = current_val * \
                     bonuses["research_speed_modifier"]
+                self.invalidate_stats(*stats_affected_by_modifier(mod_key))
                 logger.info(
                     f"  Faction Bonus: {mod_key} (global RP) set to {self.active_tech_modifiers['GLOBAL'][mod_key]}")
         # Rimosso il 'pass' errato qui
@@ -688,22 +883,18 @@ class Habitat:
                     f"  Initial building blueprint '{blueprint_id_iter}' for faction '{self.faction.name}' not found in ALL_BUILDING_BLUEPRINTS.")
 
     def update_tick(self, time_delta=1):
-        self._recalculate_all_stats()
-        for resource_type, net_prod_rate in self.current_net_production.items():
-            current_amount = self.resources.get(resource_type, 0)
-            change = net_prod_rate * time_delta
-            new_amount = current_amount + change
-            capacity = self.storage_capacity.get(resource_type, float('inf'))
-            if resource_type == Resource.ENERGY:
-                if new_amount > capacity:
-                    new_amount = capacity
-                if new_amount < 0:
-                    logger.warning(
-                        f"Habitat '{self.name}': Energy deficit! ({new_amount:.2f}) Applying penalties...")
-            else:
-                new_amount = max(0, min(new_amount, capacity))
-            self.resources[resource_type] = new_amount
+        self._refresh_stats()
+        self.resources.add_scaled(self.current_net_production, time_delta)
+        # Capped at storage capacity; only energy may stay below zero
+        self.resources.clamp(TICK_FLOOR, self.storage_capacity)
+        energy = self.resources[Resource.ENERGY]
+        if energy < 0:
+            logger.warning(
+                f"Habitat '{self.name}': Energy deficit! ({energy:.2f}) Applying penalties...")
 
+        self._grow_population(time_delta)
+
+    def _grow_population(self, time_delta=1):
         has_food = self.resources.get(Resource.FOOD, 0) > 0
         has_water = self.resources.get(Resource.WATER_ICE, 0) > 0
         has_space = self.population < self.max_population
@@ -712,22 +903,225 @@ class Habitat:
             self.population = min(self.max_population,
                                   self.population + growth)
 
+    # --- Closed-form fast-forward (used by GameState.advance_ticks) ---
+
+    def _population_upkeep(self):
+        """Returns {Resource: (consumption_per_capita, tech_modifier)} of the food/water consumed by the population."""
+        global_mods = self.active_tech_modifiers["GLOBAL"]
+        return {
+            Resource.FOOD: (FOOD_CONSUMPTION_PER_CAPITA, global_mods.get("food_consumption_modifier", 1.0)),
+            Resource.WATER_ICE: (WATER_CONSUMPTION_PER_CAPITA, global_mods.get("water_consumption_modifier", 1.0)),
+        }
+
+    def _fast_forward_model(self):
+        """Returns {Resource: (constant_rate, per_capita_rate)} so that net production = constant - per_capita * population."""
+        per_capita_rates = {res_enum: per_capita * modifier
+                            for res_enum, (per_capita, modifier) in self._population_upkeep().items()}
+        return {res_enum: (self._gross_production.get(res_enum, 0) - self._total_consumption.get(res_enum, 0),
+                           per_capita_rates.get(res_enum, 0))
+                for res_enum in Resource}
+
+    def _fast_forward_growth(self, model):
+        """Per-tick population growth factor of the next segment: 0 if population stays constant, None if unsupported."""
+        growth = self.population_growth_rate * self.morale
+        if growth < 0:
+            return None
+        if growth == 0 or self.population >= self.max_population:
+            return 0.0
+        for res_enum in (Resource.FOOD, Resource.WATER_ICE):
+            constant, per_capita = model[res_enum]
+            if self.resources.get(res_enum, 0) <= 0 and constant - per_capita * self.population <= 0:
+                return 0.0  # Starving colony: the resource stays at zero and nobody is born
+        return growth
+
+    @staticmethod
+    def _population_sum(start_population, growth, num_ticks):
+        """Sum of the population seen at the start of each of the next num_ticks ticks."""
+        if not growth:
+            return start_population * num_ticks
+        return start_population * ((1 + growth) ** num_ticks - 1) / growth
+
+    def _fast_forward_is_smooth(self, model, num_ticks, resources=None, check_population=True):
+        """
+        True if the next num_ticks ticks involve no clamping, starvation, energy sign change or population cap.
+        resources / check_population restrict the check to some resources and to the population cap.
+        """
+        if num_ticks <= 0:
+            return True
+        growth = self._fast_forward_growth(model)
+        if growth is None:
+            return False
+        start_population = self.population
+        if check_population and growth and start_population * (1 + growth) ** num_ticks >= self.max_population:
+            return False
+        last_population = start_population * (1 + growth) ** (num_ticks - 1)
+        population_sum = self._population_sum(start_population, growth, num_ticks)
+
+        for res_enum, (constant, per_capita) in model.items():
+            if resources is not None and res_enum not in resources:
+                continue
+            amount = self.resources.get(res_enum, 0)
+            capacity = self.storage_capacity.get(res_enum, float('inf'))
+            first_rate = constant - per_capita * start_population
+            last_rate = constant - per_capita * last_population
+            # Population only grows, so the rate never increases: pinned resources stay pinned
+            if amount >= capacity and last_rate >= 0:
+                continue
+            if res_enum != Resource.ENERGY and amount <= 0 and first_rate <= 0:
+                continue
+
+            after_first = amount + first_rate
+            final = amount + constant * num_ticks - per_capita * population_sum
+            if last_rate >= 0:
+                peak = final
+            elif first_rate <= 0:
+                peak = after_first
+            else:
+                # Amount keeps rising while the rate is positive
+                rising_ticks = math.ceil(math.log(constant / (per_capita * start_population)) / math.log(1 + growth))
+                rising_ticks = min(max(rising_ticks, 1), num_ticks)
+                peak = amount + constant * rising_ticks - per_capita * \
+                    self._population_sum(start_population, growth, rising_ticks)
+            lowest = min(after_first, final)
+
+            if peak >= capacity:
+                return False
+            if res_enum == Resource.ENERGY:
+                if (amount >= 0) != (lowest >= 0) or (amount < 0 and peak >= 0):
+                    return False
+            elif lowest <= 0:
+                return False
+        return True
+
+    def ticks_until_next_event(self, max_ticks):
+        """
+        Returns how many of the next max_ticks ticks can be applied in closed form, i.e. before a resource
+        reaches its capacity or zero, or population reaches max_population.
+        """
+        self._refresh_stats()
+        if max_ticks <= 0:
+            return 0
+        model = self._fast_forward_model()
+        if self._fast_forward_is_smooth(model, max_ticks):
+            return max_ticks
+        smooth_ticks, event_ticks = 0, max_ticks
+        while event_ticks - smooth_ticks > 1:
+            mid = (smooth_ticks + event_ticks) // 2
+            if self._fast_forward_is_smooth(model, mid):
+                smooth_ticks = mid
+            else:
+                event_ticks = mid
+        # One tick of margin: the ticks around the event are simulated exactly by update_tick
+        return max(smooth_ticks - 1, 0)
+
+    def _first_event_tick(self, model, max_ticks, resources, check_population):
+        """Smallest n <= max_ticks such that the n-th tick from now is not smooth, or None."""
+        if self._fast_forward_is_smooth(model, max_ticks, resources, check_population):
+            return None
+        smooth_ticks, event_ticks = 0, max_ticks
+        while event_ticks - smooth_ticks > 1:
+            mid = (smooth_ticks + event_ticks) // 2
+            if self._fast_forward_is_smooth(model, mid, resources, check_population):
+                smooth_ticks = mid
+            else:
+                event_ticks = mid
+        return event_ticks
+
+    def predict_threshold_events(self, max_ticks):
+        """
+        Predicts when each resource reaches its capacity, zero (or changes sign, for energy) and when
+        population reaches max_population. Returns [(ticks_from_now, kind, Resource or None), ...];
+        if nothing happens within max_ticks a single EVENT_RECHECK at max_ticks is returned.
+        """
+        self._refresh_stats()
+        model = self._fast_forward_model()
+        growth = self._fast_forward_growth(model)
+        if growth is None:
+            return [(1, EVENT_RECHECK, None)]  # Not modelled in closed form: predict again every tick
+
+        events = []
+        pop_ticks = self._first_event_tick(model, max_ticks, (), True)
+        if pop_ticks is not None:
+            events.append((pop_ticks, EVENT_POPULATION_CAP, None))
+        for res_enum, (constant, per_capita) in model.items():
+            res_ticks = self._first_event_tick(model, max_ticks, (res_enum,), False)
+            if res_ticks is None:
+                continue
+            amount_at_event = self.resources.get(res_enum, 0) + constant * res_ticks - \
+                per_capita * self._population_sum(self.population, growth, res_ticks)
+            if amount_at_event >= self.storage_capacity.get(res_enum, float('inf')):
+                kind = EVENT_STORAGE_FULL
+            elif res_enum == Resource.ENERGY:
+                kind = EVENT_ENERGY_SIGN_CHANGE
+            else:
+                kind = EVENT_RESOURCE_DEPLETED
+            events.append((res_ticks, kind, res_enum))
+        return events or [(max_ticks, EVENT_RECHECK, None)]
+
+    def advance_ticks_analytically(self, num_ticks):
+        """Applies num_ticks ticks in closed form. Only valid for num_ticks <= ticks_until_next_event()."""
+        if num_ticks <= 0:
+            return
+        self._refresh_stats()
+        model = self._fast_forward_model()
+        growth = self._fast_forward_growth(model) or 0.0
+        start_population = self.population
+        last_population = start_population * (1 + growth) ** (num_ticks - 1)
+        population_sum = self._population_sum(start_population, growth, num_ticks)
+
+        for res_enum, (constant, per_capita) in model.items():
+            amount = self.resources.get(res_enum, 0)
+            capacity = self.storage_capacity.get(res_enum, float('inf'))
+            if amount >= capacity and constant - per_capita * last_population >= 0:
+                new_amount = capacity
+            elif res_enum != Resource.ENERGY and amount <= 0 and constant - per_capita * start_population <= 0:
+                new_amount = 0
+            else:
+                new_amount = amount + constant * num_ticks - per_capita * population_sum
+            self.resources[res_enum] = new_amount
+
+        if growth:
+            # As after update_tick: the food/water upkeep of the population at the start of the last tick
+            self.population = last_population
+            self._update_net_production()
+            self.versions.touch("stats")
+            self.population = start_population * (1 + growth) ** num_ticks
+        energy = self.resources.get(Resource.ENERGY, 0)
+        if energy < 0:
+            logger.warning(
+                f"Habitat '{self.name}': Energy deficit! ({energy:.2f}) Applying penalties... (fast-forwarded {num_ticks} ticks)")
+
     def can_afford(self, costs: dict) -> (bool, dict):
-        return ResourceStorage(self.resources).can_afford(costs)
+        cost_vector = ResourceVector.from_costs(costs)
+        if cost_vector.is_affordable_from(self.resources):
+            return True, {}
+        return False, {res_enum.value: amount for res_enum, amount in cost_vector.shortfall(self.resources).items()}
+
+    @property
+    def ledger(self):
+        """The ResourceLedger serializing purchases on this habitat (the GameState one, if any)."""
+        return getattr(self.game_state_ref, "ledger", None) or DEFAULT_LEDGER
 
     def spend_resources(self, costs: dict) -> bool:
-        temp_storage = ResourceStorage()
-        temp_storage.storage = self.resources
-        success = temp_storage.spend_resources(costs)
+        success, missing = self.ledger.spend(self, costs)
         if success:
             logger.info(f"Habitat '{self.name}': Spent resources: {costs}")
         else:
-            _, missing = self.can_afford(costs)
             logger.warning(
                 f"Habitat '{self.name}': Failed to spend resources. Cost: {costs}, Missing: {missing}")
         return success
 
-    def build_new_building(self, blueprint_id_to_build, player_unlocked_buildings):
+    def _pay(self, costs, txn=None):
+        """Pays costs on its own (spend_resources) or as part of the LedgerTransaction txn."""
+        if txn is None:
+            return self.spend_resources(costs)
+        return txn.reserve(self, costs)
+
+    def build_new_building(self, blueprint_id_to_build, player_unlocked_buildings, txn=None):
+        """
+        Builds blueprint_id_to_build at level 1. With txn (a LedgerTransaction) the cost is reserved in it and
+        the affected stats are only invalidated: the caller refreshes them once (see GameState.player_batch_action).
+        """
         if blueprint_id_to_build in self.buildings and self.buildings[blueprint_id_to_build].level > 0:
             msg = f"Building '{ALL_BUILDING_BLUEPRINTS.get(blueprint_id_to_build, {}).get('display_name', blueprint_id_to_build)}' already exists in Habitat '{self.name}'."
             logger.warning(msg)
@@ -748,36 +1142,44 @@ class Habitat:
             logger.warning(msg)
             return False, msg
 
-        cost_for_level_1 = blueprint.get("cost", {})
-        if self.spend_resources(cost_for_level_1):
+        cost_for_level_1 = BLUEPRINT_COST_VECTORS[blueprint_id_to_build]
+        if self._pay(cost_for_level_1, txn):
             self.buildings[blueprint_id_to_build] = Building(
                 blueprint_id=blueprint_id_to_build, level=1)
+            self.versions.touch("buildings")
             msg = f"Building '{blueprint['display_name']}' constructed (Lv. 1) in Habitat '{self.name}'."
             logger.info(msg)
-            self._recalculate_all_stats()
+            self.invalidate_stats(*stats_affected_by_blueprint(blueprint))
+            if txn is None:
+                self._refresh_stats()
             return True, msg
         else:  # Questo else era de-indentato prima
             msg = f"Insufficient resources to construct '{blueprint['display_name']}' in Habitat '{self.name}'."
             return False, msg  # Era mancante un return False, msg
 
-    def upgrade_building(self, blueprint_id_to_upgrade):
+    def upgrade_building(self, blueprint_id_to_upgrade, txn=None):
+        """Upgrades a built building by one level. txn: as in build_new_building."""
         if blueprint_id_to_upgrade not in self.buildings or self.buildings[blueprint_id_to_upgrade].level == 0:
             msg = f"Building '{ALL_BUILDING_BLUEPRINTS.get(blueprint_id_to_upgrade, {}).get('display_name', blueprint_id_to_upgrade)}' not found or not built in Habitat '{self.name}'."
             logger.warning(msg)
             return False, msg
 
         building_obj = self.buildings[blueprint_id_to_upgrade]
-        cost_for_next_level = building_obj.get_current_upgrade_cost()
-        if not cost_for_next_level:
+        cost_for_next_level = building_obj.get_current_upgrade_cost_vector()
+        if not cost_for_next_level or not any(cost_for_next_level.values()):
             msg = f"Cannot determine upgrade cost for '{building_obj.name}' (Lv. {building_obj.level}). Maybe max level reached or error?"
             logger.warning(msg)
             return False, msg
 
-        if self.spend_resources(cost_for_next_level):
+        if self._pay(cost_for_next_level, txn):
             building_obj.level += 1
+            self.versions.touch("buildings")
             msg = f"Building '{building_obj.name}' upgraded to Level {building_obj.level} in Habitat '{self.name}'."
             logger.info(msg)
-            self._recalculate_all_stats()
+            self.invalidate_stats(
+                *stats_affected_by_blueprint(building_obj.get_base_stats()))
+            if txn is None:
+                self._refresh_stats()
             return True, msg
         else:
             msg = f"Insufficient resources to upgrade '{building_obj.name}' to Level {building_obj.level + 1} in Habitat '{self.name}'."
@@ -802,10 +1204,11 @@ class Habitat:
         target_name = "Global" if is_global else f"Building '{blueprint_id}'"
         logger.info(
             f"Habitat '{self.name}': Applied Tech Modifier - Target: {target_name}, Key: {mod_key_to_use}, New Value: {new_val:.4f} (Previous: {current_val:.4f})")
-        self._recalculate_all_stats()
+        self.invalidate_stats(*stats_affected_by_modifier(mod_key_to_use))
+        self._refresh_stats()
 
     def get_status_report(self):
-        self._recalculate_all_stats()
+        self._refresh_stats()
         faction_name = self.faction.name if self.faction else "N/A"
         report = f"--- Habitat Report: {self.name} (Faction: {faction_name}, ID: {self.id}, Owner: {self.player_owner_id}) ---\n"
         report += f"Population: {self.population:.0f} / {self.max_population:.0f} (Morale: {self.morale:.2f})\n"
@@ -0,0 +1,165 @@
+# game_logic/hex_grid.py
+import bisect
+import logging
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional: without it MarsHexMap keeps one HexCell object per hex
+    np = None
+
+logger = logging.getLogger(__name__)
+
+NO_OWNER = -1
+NO_HEX = -1  # Index of the hexes outside the map (see HexGridLayout.index_array)
+
+# Axial directions (dq, dr) of the six neighbors, in the order used by MarsHexMap.get_neighbors
+HEX_DIRECTIONS = ((+1, 0), (+1, -1), (0, -1), (-1, 0), (-1, +1), (0, +1))
+
+
+def hex_distance(q1, r1, q2, r2):
+    dq, dr = q1 - q2, r1 - r2
+    return (abs(dq) + abs(dr) + abs(dq + dr)) // 2
+
+
+def is_array_storage_available():
+    return np is not None
+
+
+class HexGridLayout:
+    """
+    Packed linear index of the hexes of a hexagonal map (axial coordinates, |q|, |r|, |s| <= radius).
+    Rows r = -radius..radius are stored one after the other, each starting from its first valid q,
+    so indices are dense (0..count-1) and index_of/coords_of are O(1)/O(log radius) arithmetic.
+    """
+
+    def __init__(self, radius):
+        self.radius = radius
+        self.row_starts = []
+        self._row_offsets = []  # index = _row_offsets[r + radius] + q
+        count = 0
+        for r in range(-radius, radius + 1):
+            self.row_starts.append(count)
+            self._row_offsets.append(count - self._row_first_q(r))
+            count += self._row_length(r)
+        self.count = count  # 3 * radius * (radius + 1) + 1
+
+    def _row_first_q(self, r):
+        return max(-self.radius, -r - self.radius)
+
+    def _row_length(self, r):
+        return 2 * self.radius + 1 - abs(r)
+
+    def contains(self, q, r):
+        return max(abs(q), abs(r), abs(q + r)) <= self.radius
+
+    def index_of(self, q, r):
+        """Linear index of the hex (q, r), or None if it is outside the map."""
+        radius = self.radius
+        if q > radius or q < -radius or r > radius or r < -radius or q + r > radius or q + r < -radius:
+            return None
+        return self._row_offsets[r + radius] + q
+
+    def row_index_range(self, r, q_min, q_max):
+        """range of the indices of row r with q_min <= q <= q_max (clipped to the map; empty outside it)."""
+        if r < -self.radius or r > self.radius:
+            return range(0)
+        first_q = self._row_first_q(r)
+        q_min = max(q_min, first_q)
+        q_max = min(q_max, first_q + self._row_length(r) - 1)
+        offset = self._row_offsets[r + self.radius]
+        return range(offset + q_min, offset + q_max + 1)
+
+    def box_rows(self, q0, r0, q1, r1):
+        """
+        Rows of the axial box q0 <= q <= q1, r0 <= r <= r1 clipped to the map: (r, first q, index range)
+        for each non-empty row, the q of index i being first q + (i - range.start).
+        """
+        for r in range(max(r0, -self.radius), min(r1, self.radius) + 1):
+            indices = self.row_index_range(r, q0, q1)
+            if indices:
+                yield r, indices.start - self._row_offsets[r + self.radius], indices
+
+    def coords_of(self, index):
+        """(q, r) of a linear index."""
+        row = bisect.bisect_right(self.row_starts, index) - 1
+        r = row - self.radius
+        return self._row_first_q(r) + index - self.row_starts[row], r
+
+    def iter_coords(self):
+        """(q, r) of every hex, in index order."""
+        for r in range(-self.radius, self.radius + 1):
+            first_q = self._row_first_q(r)
+            for q in range(first_q, first_q + self._row_length(r)):
+                yield q, r
+
+    def coordinate_arrays(self):
+        """NumPy arrays (q, r) with the coordinates of every index."""
+        rows = np.arange(-self.radius, self.radius + 1)
+        row_lengths = 2 * self.radius + 1 - np.abs(rows)
+        r = np.repeat(rows, row_lengths)
+        offsets_in_row = np.arange(self.count) - np.repeat(np.asarray(self.row_starts), row_lengths)
+        q = np.maximum(-self.radius, -r - self.radius) + offsets_in_row
+        return q, r
+
+    def index_array(self, q, r):
+        """Vectorized index_of: NumPy array of the indices of (q, r), NO_HEX outside the map."""
+        inside = (np.abs(q) <= self.radius) & (np.abs(r) <= self.radius) & (np.abs(q + r) <= self.radius)
+        rows = np.clip(r + self.radius, 0, 2 * self.radius)
+        return np.where(inside, np.asarray(self._row_offsets)[rows] + q, NO_HEX)
+
+
+class HexArrayStorage:
+    """
+    Structure-of-arrays storage of the hexes of a MarsHexMap, one row per index of its HexGridLayout:
+    terrain type IDs, resource bitmasks, visibility levels, explored flags, owner indexes and change versions.
+    The rare attributes (buildings, points of interest) are kept in dicts keyed by index.
+    """
+
+    def __init__(self, layout, hex_types, resource_names):
+        self.layout = layout
+        self.hex_types = list(hex_types)
+        self.type_ids = {hex_type: type_id for type_id, hex_type in enumerate(self.hex_types)}
+        self.resource_names = list(resource_names)
+        if len(self.resource_names) > 32:
+            raise ValueError("At most 32 hex resource types fit in a resource bitmask.")
+        self.resource_bits = {name: 1 << bit for bit, name in enumerate(self.resource_names)}
+
+        count = layout.count
+        self.terrain = np.zeros(count, dtype=np.uint8)
+        self.resource_masks = np.zeros(count, dtype=np.uint32)
+        self.visibility = np.zeros(count, dtype=np.uint8)
+        self.explored = np.zeros(count, dtype=np.bool_)
+        self.owners = np.full(count, NO_OWNER, dtype=np.int32)
+        self.versions = np.zeros(count, dtype=np.int64)
+        self.owner_ids = []  # Owner index -> player ID
+        self._owner_indexes = {}
+        self.buildings = {}  # Index -> building object
+        self.pois = {}  # Index -> point of interest
+
+    def encode_resources(self, names):
+        mask = 0
+        for name in names:
+            mask |= self.resource_bits[name]
+        return mask
+
+    def decode_resources(self, mask):
+        return [name for name, bit in self.resource_bits.items() if mask & bit]
+
+    def owner_index(self, player_id):
+        """Owner index of player_id (registered on first use), NO_OWNER for None."""
+        if player_id is None:
+            return NO_OWNER
+        owner_index = self._owner_indexes.get(player_id)
+        if owner_index is None:
+            owner_index = self._owner_indexes[player_id] = len(self.owner_ids)
+            self.owner_ids.append(player_id)
+        return owner_index
+
+    def owner_id(self, owner_index):
+        return None if owner_index == NO_OWNER else self.owner_ids[owner_index]
+
+    @property
+    def nbytes(self):
+        """Bytes held by the per-hex arrays."""
+        return sum(array.nbytes for array in (self.terrain, self.resource_masks, self.visibility,
+                                              self.explored, self.owners, self.versions))
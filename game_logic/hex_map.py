@@ -1,6 +1,16 @@
 # game_logic/hex_map.py
 import random
+import bisect
 import logging
+from collections.abc import Mapping
+
+from .versioning import SectionVersions
+from .hex_grid import HexGridLayout, HexArrayStorage, HEX_DIRECTIONS, is_array_storage_available, np
+from .spatial_index import HexSpatialIndex
+from .pathfinding import HexPathfinder
+from .map_lod import MapLodPyramid
+from .map_generation import generate_hex_contents
+from .fog_of_war import PlayerVisibility, VISIBILITY_FOGGED, VISIBILITY_EXPLORED
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +26,59 @@ HEX_RESOURCES = {
     "Ancient_Riverbed": ["Sedimentary_Deposits", "Clays", "Subsurface_Ice", "Trace_Organics"]
 }
 MAX_RESOURCES_PER_HEX = 3  # Limit how many resource types appear
+# Cost of moving onto a hex of each type (see pathfinding.py)
+HEX_MOVE_COSTS = {
+    "Plains": 1.0,
+    "Ancient_Riverbed": 1.0,
+    "Cratered_Highlands": 2.0,
+    "Volcanic": 2.5,
+    "Icy_Terrain": 3.0,
+    "Canyon": 4.0,
+}
+# Bit order of the resource bitmasks of the array storage
+HEX_RESOURCE_NAMES = sorted({name for names in HEX_RESOURCES.values() for name in names})
+_HEX_RESOURCE_BITS = {name: 1 << bit for bit, name in enumerate(HEX_RESOURCE_NAMES)}
+
+HEX_STORAGE_DICT = "dict"    # One HexCell object per hex
+HEX_STORAGE_ARRAY = "array"  # NumPy arrays (see hex_grid.py); HexCells are views created on demand
+HEX_STORAGES = (HEX_STORAGE_DICT, HEX_STORAGE_ARRAY)
+
+# Entries kept by the map change journal: beyond this the oldest half is dropped,
+# and a client that synced before the dropped changes receives the full map again
+MAP_JOURNAL_MAX_ENTRIES = 50000
+# Hexes one viewport request (get_viewport_for_json) may cover, explored or not (tiles for get_lod_for_json)
+MAP_VIEWPORT_MAX_HEXES = 20000
+
+
+def _random_hex_resources(hex_type, rng=random):
+    possible = HEX_RESOURCES.get(hex_type, [])
+    num_resources = rng.randint(
+        0, min(len(possible), MAX_RESOURCES_PER_HEX))
+    return rng.sample(possible, num_resources) if possible else []
+
+
+def _encode_resources(names):
+    """Bitmask of resource names (bit order: HEX_RESOURCE_NAMES)."""
+    mask = 0
+    for name in names:
+        mask |= _HEX_RESOURCE_BITS[name]
+    return mask
+
+
+def _building_to_dict(building):
+    # If building is an object with to_dict, use it. Otherwise, maybe just its ID/name.
+    if hasattr(building, 'to_dict'):
+        return building.to_dict()
+    if hasattr(building, 'player_owner_id'):  # A Habitat (the start hex of each player)
+        return {"habitat_id": building.id, "name": building.name}
+    if hasattr(building, 'blueprint_id'):  # Store blueprint ID and level
+        return {"blueprint_id": building.blueprint_id, "level": building.level, "name": building.name}
+    return str(building)  # Fallback to string representation
+
+
+def _decode_resource_mask(mask):
+    """Resource names of a bitmask (bit order: HEX_RESOURCE_NAMES)."""
+    return [name for bit, name in enumerate(HEX_RESOURCE_NAMES) if mask >> bit & 1]
 
 
 class HexCell:
@@ -29,11 +92,7 @@ class HexCell:
         self.hex_type = hex_type if hex_type else random.choice(HEX_TYPES)
 
         if resources is None:
-            possible = HEX_RESOURCES.get(self.hex_type, [])
-            num_resources = random.randint(
-                0, min(len(possible), MAX_RESOURCES_PER_HEX))
-            self.resources = random.sample(
-                possible, num_resources) if possible else []
+            self.resources = _random_hex_resources(self.hex_type)
         else:
             self.resources = resources  # Allow setting resources directly
 
@@ -43,6 +102,8 @@ class HexCell:
         # 0: Unknown, 1: Fogged (terrain visible), 2: Explored (details visible)
         self.visibility_level = visibility_level
         self.owner_player_id = None  # Track which player controls/owns structures here
+        self.version = 0  # Version of the last change, set by MarsHexMap (see get_changed_hexes_for_json)
+        self.index = None  # Linear index in the map layout (see hex_grid.HexGridLayout), set by MarsHexMap
 
     def __str__(self):
         status = f"Explored: {self.is_explored}" if self.is_explored else f"Visibility: {self.visibility_level}"
@@ -56,17 +117,7 @@ class HexCell:
 
     def to_dict(self):
         """Converts HexCell to a JSON-serializable dictionary."""
-        building_data = None
-        if self.building:
-            # If building is an object with to_dict, use it. Otherwise, maybe just its ID/name.
-            if hasattr(self.building, 'to_dict'):
-                building_data = self.building.to_dict()
-            elif hasattr(self.building, 'blueprint_id'):  # Store blueprint ID and level
-                building_data = {"blueprint_id": self.building.blueprint_id,
-                                 "level": self.building.level, "name": self.building.name}
-            else:  # Fallback to string representation
-                building_data = str(self.building)
-
+        building_data = _building_to_dict(self.building) if self.building else None
         return {
             "q": self.q,
             "r": self.r,
@@ -80,29 +131,206 @@ class HexCell:
             "owner_player_id": self.owner_player_id
         }
 
+    def to_fogged_dict(self):
+        """What a player sees of a hex at VISIBILITY_FOGGED: coordinates and terrain only."""
+        return {
+            "q": self.q,
+            "r": self.r,
+            "s": self.s,
+            "hex_type": self.hex_type,
+            "is_explored": False,
+            "visibility_level": VISIBILITY_FOGGED,
+        }
+
+
+class HexCellView(HexCell):
+    """Stateless HexCell over one row of a HexArrayStorage, created on demand."""
+
+    def __init__(self, storage, index, q=None, r=None):  # HexCell.__init__ is not called: the arrays hold the state
+        self._storage = storage
+        self.index = index
+        if q is None:
+            q, r = storage.layout.coords_of(index)
+        self.q, self.r, self.s = q, r, -q - r
+
+    @property
+    def hex_type(self):
+        return self._storage.hex_types[self._storage.terrain[self.index]]
+
+    @hex_type.setter
+    def hex_type(self, value):
+        self._storage.terrain[self.index] = self._storage.type_ids[value]
+
+    @property
+    def resources(self):
+        return self._storage.decode_resources(int(self._storage.resource_masks[self.index]))
+
+    @resources.setter
+    def resources(self, value):
+        self._storage.resource_masks[self.index] = self._storage.encode_resources(value)
+
+    @property
+    def poi(self):
+        return self._storage.pois.get(self.index)
+
+    @poi.setter
+    def poi(self, value):
+        if value is None:
+            self._storage.pois.pop(self.index, None)
+        else:
+            self._storage.pois[self.index] = value
+
+    @property
+    def building(self):
+        return self._storage.buildings.get(self.index)
+
+    @building.setter
+    def building(self, value):
+        if value is None:
+            self._storage.buildings.pop(self.index, None)
+        else:
+            self._storage.buildings[self.index] = value
+
+    @property
+    def is_explored(self):
+        return bool(self._storage.explored[self.index])
+
+    @is_explored.setter
+    def is_explored(self, value):
+        self._storage.explored[self.index] = value
+
+    @property
+    def visibility_level(self):
+        return int(self._storage.visibility[self.index])
+
+    @visibility_level.setter
+    def visibility_level(self, value):
+        self._storage.visibility[self.index] = value
+
+    @property
+    def owner_player_id(self):
+        return self._storage.owner_id(self._storage.owners[self.index])
+
+    @owner_player_id.setter
+    def owner_player_id(self, value):
+        self._storage.owners[self.index] = self._storage.owner_index(value)
+
+    @property
+    def version(self):
+        return int(self._storage.versions[self.index])
+
+    @version.setter
+    def version(self, value):
+        self._storage.versions[self.index] = value
+
+
+class HexCellViewMapping(Mapping):
+    """(q, r, s) -> HexCellView over a HexArrayStorage: the hex_cells of an array-backed MarsHexMap."""
+
+    def __init__(self, storage):
+        self._storage = storage
+
+    def get(self, coords, default=None):
+        q, r, s = coords
+        index = self._storage.layout.index_of(q, r) if q + r + s == 0 else None
+        return default if index is None else HexCellView(self._storage, index, q, r)
+
+    def __getitem__(self, coords):
+        hex_cell = self.get(coords)
+        if hex_cell is None:
+            raise KeyError(coords)
+        return hex_cell
+
+    def __iter__(self):
+        for q, r in self._storage.layout.iter_coords():
+            yield q, r, -q - r
+
+    def __len__(self):
+        return self._storage.layout.count
+
+    def values(self):
+        storage = self._storage
+        return (HexCellView(storage, index) for index in range(storage.layout.count))
+
 
 class MarsHexMap:
     """Manages the hexagonal map grid."""
 
-    def __init__(self, map_radius):
+    def __init__(self, map_radius, storage=HEX_STORAGE_DICT, seed=None):
         if map_radius < 1:
             logger.warning("Map radius must be at least 1. Setting to 1.")
             map_radius = 1
+        if storage not in HEX_STORAGES:
+            raise ValueError(f"Unknown hex storage '{storage}'. Valid: {HEX_STORAGES}")
         self.radius = map_radius
-        self.hex_cells = {}  # Dictionary: (q,r,s) tuple -> HexCell object
+        # With a seed the map is generated from NumPy noise fields (see map_generation.py) and is reproducible
+        self.seed = seed
+        self.layout = HexGridLayout(map_radius)
+        # Array storage: terrain, resources, visibility and ownership in NumPy arrays (large radii)
+        self.storage = None
+        if storage == HEX_STORAGE_ARRAY:
+            if is_array_storage_available():
+                self.storage = HexArrayStorage(self.layout, HEX_TYPES, HEX_RESOURCE_NAMES)
+            else:
+                logger.warning("Array hex storage requested but NumPy is not installed. Using HexCell objects.")
+        # (q,r,s) tuple -> HexCell object (views over the arrays with the array storage)
+        self.hex_cells = HexCellViewMapping(self.storage) if self.storage else {}
+        self._cells_by_index = None if self.storage else [None] * self.layout.count  # Dict storage: index -> HexCell
+        self.player_visibility = {}  # player_id -> PlayerVisibility (fog of war, see reveal_hexes)
+        self._building_hexes = {}  # id(building) -> HexCell holding it (see mark_building_changed)
+        self.versions = SectionVersions(("map",))  # Bumped by every change visible in get_map_data_for_json
+        self.spatial = None  # Built after the map (see below)
+        self.paths = None
         self._create_map()
+        # Append-only change journal (see mark_hex_changed): one (version, hex index) entry per change,
+        # versions in increasing order. It covers every change made after _journal_floor.
+        self._journal_versions = []
+        self._journal_indices = []
+        self._journal_floor = self.versions["map"]
+        # Neighbor table, range/ring/line queries and resource/owner indexes (see spatial_index.py)
+        self.spatial = HexSpatialIndex(self, HEX_RESOURCE_NAMES)
+        # A* routes and cached distance fields (see pathfinding.py)
+        self.paths = HexPathfinder(self, self.get_move_costs())
+        # Per-player super-hex summaries for zoomed-out views (see map_lod.py)
+        self.lod = MapLodPyramid(self, HEX_TYPES, HEX_RESOURCE_NAMES)
         logger.info(
-            f"MarsHexMap created with radius {self.radius}. Total hexes: {len(self.hex_cells)}")
+            f"MarsHexMap created with radius {self.radius}. Total hexes: {len(self.hex_cells)}. Storage: {'array' if self.storage else 'dict'}. Seed: {self.seed}.")
 
     def _create_map(self):
-        """Generates the hexagonal grid."""
-        for q in range(-self.radius, self.radius + 1):
-            r1 = max(-self.radius, -q - self.radius)
-            r2 = min(self.radius, -q + self.radius)
-            for r in range(r1, r2 + 1):
-                s = -q - r
-                hex_coords = (q, r, s)
-                self.hex_cells[hex_coords] = HexCell(q, r, s)
+        """Generates the hexagonal grid: from the seed's noise fields if seeded, else one random draw per hex."""
+        contents = None
+        if self.seed is not None:
+            if np is not None:
+                contents = generate_hex_contents(self.layout, self.seed, HEX_TYPES, HEX_RESOURCES,
+                                                 HEX_RESOURCE_NAMES, MAX_RESOURCES_PER_HEX)
+            else:
+                logger.warning("NumPy is not installed: the map seed drives per-hex random draws instead of noise fields.")
+        rng = random.Random(self.seed) if self.seed is not None else random
+        if self.storage:
+            self._fill_storage(contents, rng)
+        else:
+            terrain, masks = (contents[0].tolist(), contents[1].tolist()) if contents else (None, None)
+            decoded_masks = {}  # Few distinct masks: decode each once
+            for q in range(-self.radius, self.radius + 1):
+                r1 = max(-self.radius, -q - self.radius)
+                r2 = min(self.radius, -q + self.radius)
+                for r in range(r1, r2 + 1):
+                    s = -q - r
+                    hex_coords = (q, r, s)
+                    index = self.layout.index_of(q, r)
+                    if contents:
+                        hex_type = HEX_TYPES[terrain[index]]
+                        if masks[index] not in decoded_masks:
+                            decoded_masks[masks[index]] = _decode_resource_mask(masks[index])
+                        resources = list(decoded_masks[masks[index]])
+                    else:
+                        hex_type = rng.choice(HEX_TYPES)
+                        resources = _random_hex_resources(hex_type, rng)
+                    hex_cell = HexCell(q, r, s, hex_type=hex_type, resources=resources)
+                    hex_cell.index = index
+                    hex_cell.version = self.versions["map"]
+                    self.hex_cells[hex_coords] = hex_cell
+                    self._cells_by_index[index] = hex_cell
 
         start_hex = self.get_hex(0, 0, 0)
         if start_hex:
@@ -122,19 +350,63 @@ class MarsHexMap:
             logger.error(
                 "Could not find starting hex (0,0,0) during map creation!")
 
+    def _fill_storage(self, contents, rng):
+        """Terrain and resources written straight into the arrays (same map as the dict storage)."""
+        storage = self.storage
+        storage.versions[:] = self.versions["map"]
+        if contents:
+            storage.terrain[:], storage.resource_masks[:] = contents
+            return
+        for q in range(-self.radius, self.radius + 1):
+            r1 = max(-self.radius, -q - self.radius)
+            r2 = min(self.radius, -q + self.radius)
+            for r in range(r1, r2 + 1):
+                index = self.layout.index_of(q, r)
+                hex_type = rng.choice(HEX_TYPES)
+                storage.terrain[index] = storage.type_ids[hex_type]
+                storage.resource_masks[index] = storage.encode_resources(_random_hex_resources(hex_type, rng))
+
     def get_hex(self, q, r, s=None):
         """Retrieves a specific hex cell using axial coordinates (q, r) or (q, r, s)."""
         if s is None:
             s = -q - r  # Calculate s if not provided
         return self.hex_cells.get((q, r, s))
 
-    def explore_hex(self, q, r, s=None, explorer_faction="Player"):
-        """Marks a hex as explored and reveals its details."""
+    def get_resource_masks(self):
+        """Resource bitmask (bit order: HEX_RESOURCE_NAMES) of every hex, in index order."""
+        if self.storage:
+            return self.storage.resource_masks
+        return [_encode_resources(hex_cell.resources) for hex_cell in self._cells_by_index]
+
+    def get_move_costs(self):
+        """Cost of moving onto every hex (see HEX_MOVE_COSTS), in index order."""
+        if self.storage:
+            type_costs = np.asarray([HEX_MOVE_COSTS[hex_type] for hex_type in HEX_TYPES])
+            return type_costs[self.storage.terrain].tolist()
+        return [HEX_MOVE_COSTS[hex_cell.hex_type] for hex_cell in self._cells_by_index]
+
+    def get_explored_indices(self):
+        if self.storage:
+            return np.flatnonzero(self.storage.explored).tolist()
+        return [hex_cell.index for hex_cell in self._cells_by_index if hex_cell.is_explored]
+
+    def hex_at(self, index):
+        """HexCell at a linear index of self.layout."""
+        if self.storage:
+            return HexCellView(self.storage, index)
+        return self._cells_by_index[index]
+
+    def explore_hex(self, q, r, s=None, explorer_faction="Player", player_id=None):
+        """Marks a hex as explored and reveals its details (to player_id too, with its neighbors fogged)."""
         target_hex = self.get_hex(q, r, s)
         if target_hex:
+            if player_id is not None:
+                self.reveal_area(player_id, [target_hex])
             if not target_hex.is_explored:
                 target_hex.is_explored = True
                 target_hex.visibility_level = 2
+                self.spatial.on_explored(target_hex.index)
+                self.mark_hex_changed(target_hex)
                 logger.info(
                     f"Hex ({q},{r},{target_hex.s}) explored by {explorer_faction}. Type: {target_hex.hex_type}, Res: {target_hex.resources}")
                 # TODO: Potentially trigger discovery events here
@@ -155,41 +427,78 @@ class MarsHexMap:
             logger.error(
                 f"Invalid coordinates passed to get_neighbors: q={q}, r={r}, s={s}. Sum is not 0.")
             return []
-
+        index = self.layout.index_of(q, r)
+        if index is not None and self.spatial:  # Precomputed neighbor table
+            return [self.hex_at(neighbor) for neighbor in self.spatial.neighbors(index)]
         neighbors = []
-        # Define the 6 standard axial directions for pointy-top hexes
-        hex_directions = [
-            (+1,  0, -1),  # Est (o Destra)
-            (+1, -1,  0),  # Sud-Est (o Giù-Destra)
-            (0, -1, +1),  # Sud-Ovest (o Giù-Sinistra)
-            (-1,  0, +1),  # Ovest (o Sinistra)
-            (-1, +1,  0),  # Nord-Ovest (o Su-Sinistra)
-            (0, +1, -1)   # Nord-Est (o Su-Destra)
-        ]
-        for dq, dr, ds in hex_directions:
-            # Verifica che la direzione stessa sia valida (dq+dr+ds == 0)
-            # if dq + dr + ds != 0:
-            #     logger.warning(f"Invalid hex_direction vector: ({dq},{dr},{ds})")
-            #     continue
-
-            neighbor_q, neighbor_r, neighbor_s = q + dq, r + dr, s + ds
-
-            # Verifica che le coordinate del vicino calcolate siano valide
-            # if neighbor_q + neighbor_r + neighbor_s != 0:
-            #    logger.warning(f"Calculated neighbor coords are invalid: ({neighbor_q},{neighbor_r},{neighbor_s}) from center ({q},{r},{s}) with delta ({dq},{dr},{ds})")
-            #    continue
-
-            neighbor_hex = self.hex_cells.get(
-                (neighbor_q, neighbor_r, neighbor_s))
+        for dq, dr in HEX_DIRECTIONS:
+            neighbor_hex = self.get_hex(q + dq, r + dr)
             if neighbor_hex:
                 neighbors.append(neighbor_hex)
-            # else:
-            #    logger.debug(f"No hex found at neighbor coords: ({neighbor_q},{neighbor_r},{neighbor_s}) (edge of map?)")
         return neighbors
 
+    def find_path(self, q1, r1, q2, r2, player_id=None):
+        """HexCells of a cheapest route from (q1, r1) to (q2, r2); with player_id it avoids other players' hexes."""
+        start, goal = self.layout.index_of(q1, r1), self.layout.index_of(q2, r2)
+        if start is None or goal is None:
+            logger.warning(f"find_path: ({q1},{r1}) or ({q2},{r2}) is outside the map.")
+            return None
+        route = self.paths.find_path(start, goal, player_id)
+        return None if route is None else [self.hex_at(index) for index in route[0]]
+
+    def distance_field(self, q, r, player_id=None):
+        """Cached pathfinding.DistanceField towards (q, r) (e.g. a habitat), or None outside the map."""
+        origin = self.layout.index_of(q, r)
+        return None if origin is None else self.paths.distance_field(origin, player_id)
+
+    def get_player_visibility(self, player_id):
+        """Fog of war of player_id (created empty on first use)."""
+        visibility = self.player_visibility.get(player_id)
+        if visibility is None:
+            visibility = self.player_visibility[player_id] = PlayerVisibility(self.layout.count)
+            self.lod.add_player(player_id, visibility)
+        return visibility
+
+    def reveal_hexes(self, player_id, indices, level=VISIBILITY_EXPLORED):
+        """Raises the hexes at indices to level for player_id. Returns the indices newly revealed."""
+        visibility = self.get_player_visibility(player_id)
+        previous_levels = {index: visibility.level(index) for index in indices}
+        revealed = visibility.reveal(indices, level)
+        for index in revealed:
+            self.lod.on_visibility_changed(player_id, index, previous_levels[index], visibility.level(index))
+            self.mark_hex_changed(self.hex_at(index))  # Delta syncs re-send it
+        return revealed
+
+    def set_player_hex_level(self, player_id, index, level):
+        """Sets the visibility level of one hex for player_id, also lowering it (e.g. to undo a reveal)."""
+        visibility = self.get_player_visibility(player_id)
+        previous_level = visibility.level(index)
+        visibility.set_level(index, level)
+        self.lod.on_visibility_changed(player_id, index, previous_level, level)
+        if level != previous_level:
+            self.mark_hex_changed(self.hex_at(index))  # As in reveal_hexes: delta syncs re-send the hex
+
+    def reveal_area(self, player_id, hex_cells):
+        """Reveals hex_cells as explored to player_id, and their neighbors as fogged. Returns the revealed indices."""
+        revealed = self.reveal_hexes(player_id, [hex_cell.index for hex_cell in hex_cells])
+        neighbor_indices = [neighbor.index for hex_cell in hex_cells
+                            for neighbor in self.get_neighbors(hex_cell.q, hex_cell.r)]
+        return revealed + self.reveal_hexes(player_id, neighbor_indices, VISIBILITY_FOGGED)
+
+    def _player_hex_dict(self, visibility, hex_cell):
+        if hex_cell.index in visibility.explored:
+            return hex_cell.to_dict()
+        return hex_cell.to_fogged_dict()
+
     def get_map_data_for_json(self, player_id=None):
-        """Prepares map data for JSON serialization. Can filter by visibility later."""
-        # TODO: Implement visibility filtering based on player_id if needed
+        """Prepares map data for JSON serialization: the hexes player_id can see, or every explored hex."""
+        if player_id is not None:
+            visibility = self.player_visibility.get(player_id)
+            if visibility is None:
+                return []
+            return [self._player_hex_dict(visibility, self.hex_at(index)) for index in visibility.visible_indices()]
+        if self.storage:  # Only the explored rows are visited
+            return [HexCellView(self.storage, index).to_dict() for index in self.get_explored_indices()]
         map_data = []
         for hex_cell in self.hex_cells.values():
             # For now, send all explored hexes. Implement fog-of-war later.
@@ -200,6 +509,142 @@ class MarsHexMap:
             #     map_data.append(hex_cell.to_dict_fogged()) # A method returning limited data
         return map_data
 
+    def count_hexes_in_box(self, q0, r0, q1, r1):
+        """Hexes of the map in the axial box q0 <= q <= q1, r0 <= r <= r1."""
+        return sum(len(indices) for _, _, indices in self.layout.box_rows(q0, r0, q1, r1))
+
+    def get_viewport_for_json(self, q0, r0, q1, r1, player_id=None):
+        """Columnar lists of the hexes in the axial box q0 <= q <= q1, r0 <= r <= r1 that player_id can see."""
+        box_hexes = self.count_hexes_in_box(q0, r0, q1, r1)
+        if box_hexes > MAP_VIEWPORT_MAX_HEXES:
+            raise ValueError(f"The box covers {box_hexes} hexes, more than the {MAP_VIEWPORT_MAX_HEXES} allowed.")
+        if player_id is not None:
+            visibility = self.player_visibility.get(player_id) or PlayerVisibility(self.layout.count)
+            fogged, explored = visibility.fogged, visibility.explored
+        else:
+            fogged = explored = self.spatial.explored
+        indices, column_q, column_r, levels = [], [], [], []
+        for r, first_q, row in self.layout.box_rows(q0, r0, q1, r1):
+            for index in row:
+                if index in fogged:
+                    indices.append(index)
+                    column_q.append(first_q + index - row.start)
+                    column_r.append(r)
+                    levels.append(VISIBILITY_EXPLORED if index in explored else VISIBILITY_FOGGED)
+
+        if self.storage:
+            selected = np.asarray(indices, dtype=np.intp)
+            types = self.storage.terrain[selected].tolist()
+            masks = self.storage.resource_masks[selected].tolist()
+            owner_ids = [self.storage.owner_id(owner) for owner in self.storage.owners[selected].tolist()]
+            buildings, pois = self.storage.buildings, self.storage.pois
+            sparse = [(position, buildings.get(index), pois.get(index)) for position, index in enumerate(indices)
+                      if index in buildings or index in pois]
+        else:
+            type_ids = {hex_type: type_id for type_id, hex_type in enumerate(HEX_TYPES)}
+            cells = [self._cells_by_index[index] for index in indices]
+            types = [type_ids[hex_cell.hex_type] for hex_cell in cells]
+            masks = [_encode_resources(hex_cell.resources) for hex_cell in cells]
+            owner_ids = [hex_cell.owner_player_id for hex_cell in cells]
+            sparse = [(position, hex_cell.building, hex_cell.poi) for position, hex_cell in enumerate(cells)
+                      if hex_cell.building or hex_cell.poi]
+
+        # "owner": posizione in "owners" (-1 nessuno); edifici e POI sparsi: {"posizione nelle liste": valore}
+        owners, owner_positions, column_owner = [], {}, []
+        for position, owner_id in enumerate(owner_ids):
+            if owner_id is None or levels[position] != VISIBILITY_EXPLORED:
+                column_owner.append(-1)
+                continue
+            if owner_id not in owner_positions:
+                owner_positions[owner_id] = len(owners)
+                owners.append(owner_id)
+            column_owner.append(owner_positions[owner_id])
+        buildings, pois = {}, {}
+        for position, building, poi in sparse:
+            if levels[position] != VISIBILITY_EXPLORED:
+                continue
+            if building:
+                buildings[str(position)] = _building_to_dict(building)
+            if poi:
+                pois[str(position)] = poi
+        for position, level in enumerate(levels):
+            if level != VISIBILITY_EXPLORED:
+                masks[position] = 0  # Esagoni nella nebbia: solo il terreno
+        return {
+            "box": [q0, r0, q1, r1],
+            "q": column_q,
+            "r": column_r,
+            "type": types,
+            "resources": masks,
+            "owner": column_owner,
+            "visibility": levels,
+            "owners": owners,
+            "buildings": buildings,
+            "pois": pois,
+        }
+
+    def get_lod_for_json(self, player_id, level, q0, r0, q1, r1):
+        """Super-hex tiles of LOD level (index in map_lod.LOD_SCALES) in the axial box, as seen by player_id."""
+        box_tiles = self.lod.count_tiles_in_box(level, q0, r0, q1, r1)
+        if box_tiles > MAP_VIEWPORT_MAX_HEXES:
+            raise ValueError(f"The box covers {box_tiles} tiles, more than the {MAP_VIEWPORT_MAX_HEXES} allowed.")
+        return self.lod.get_tiles_for_json(player_id, level, q0, r0, q1, r1)
+
+    def get_changed_hex_indices(self, since):
+        """Indices of the hexes changed after version since, or None if the journal no longer goes back to it."""
+        if since < self._journal_floor:
+            return None
+        start = bisect.bisect_right(self._journal_versions, since)
+        return sorted(set(self._journal_indices[start:]))
+
+    def get_changed_hexes_for_json(self, since, player_id=None):
+        """Like get_map_data_for_json, but only the hexes changed after version since (None: send the whole map)."""
+        changed = self.get_changed_hex_indices(since)
+        if changed is None:
+            return None
+        if player_id is not None:
+            visibility = self.player_visibility.get(player_id)
+            if visibility is None:
+                return []
+            return [self._player_hex_dict(visibility, self.hex_at(index)) for index in changed if index in visibility.fogged]
+        hex_cells = [self.hex_at(index) for index in changed]
+        return [hex_cell.to_dict() for hex_cell in hex_cells if hex_cell.is_explored]
+
+    def mark_hex_changed(self, hex_cell):
+        """To be called after every change of hex_cell visible in get_map_data_for_json."""
+        version = self.versions.touch("map")
+        hex_cell.version = version
+        self._journal_versions.append(version)
+        self._journal_indices.append(hex_cell.index)
+        if len(self._journal_versions) > MAP_JOURNAL_MAX_ENTRIES:
+            dropped = len(self._journal_versions) // 2
+            self._journal_floor = self._journal_versions[dropped - 1]
+            del self._journal_versions[:dropped]
+            del self._journal_indices[:dropped]
+
+    def mark_building_changed(self, building_object):
+        """To be called when a building placed on the map changes (e.g. its level): its hex is re-sent."""
+        hex_cell = self._building_hexes.get(id(building_object))
+        if hex_cell is not None and hex_cell.building is building_object:
+            self.mark_hex_changed(hex_cell)
+
+    def set_hex_owner(self, hex_cell, player_id):
+        """Changes the owner of hex_cell (None: no owner), keeping the owner index up to date."""
+        self.spatial.on_owner_changed(hex_cell.index, hex_cell.owner_player_id, player_id)
+        self.paths.on_owner_changed(hex_cell.index, hex_cell.owner_player_id, player_id)
+        self.lod.on_owner_changed(hex_cell.index, hex_cell.owner_player_id, player_id)
+        hex_cell.owner_player_id = player_id
+        self.mark_hex_changed(hex_cell)
+
+    def set_hex_type(self, hex_cell, hex_type):
+        """Changes the terrain of hex_cell (e.g. terraforming), dropping the distance fields it affects."""
+        if hex_type not in HEX_MOVE_COSTS:
+            raise ValueError(f"Unknown hex type '{hex_type}'. Valid: {HEX_TYPES}")
+        self.lod.on_terrain_changed(hex_cell.index, hex_cell.hex_type, hex_type)
+        hex_cell.hex_type = hex_type
+        self.paths.on_terrain_changed(hex_cell.index, HEX_MOVE_COSTS[hex_type])
+        self.mark_hex_changed(hex_cell)
+
     def place_building(self, q, r, building_object, player_id):
         """Places a building object on a hex and sets ownership."""
         s = -q - r
@@ -216,11 +661,26 @@ class MarsHexMap:
         #    return False, f"Cannot build {building_object.name} on {target_hex.hex_type}."
 
         target_hex.building = building_object
-        target_hex.owner_player_id = player_id
+        self._building_hexes[id(building_object)] = target_hex
+        self.set_hex_owner(target_hex, player_id)
         logger.info(
             f"Placed {building_object} on Hex ({q},{r}) for Player {player_id}.")
         return True, f"{building_object.name} placed successfully."
 
+    def remove_building(self, q, r):
+        """Removes the building on hex (q, r) (e.g. to undo place_building). Ownership is left unchanged."""
+        s = -q - r
+        target_hex = self.get_hex(q, r, s)
+        if not target_hex or not target_hex.building:
+            logger.warning(f"Cannot remove building: Hex ({q},{r}) holds none.")
+            return False, "No building on the target hex."
+        removed_building = target_hex.building
+        target_hex.building = None
+        self._building_hexes.pop(id(removed_building), None)
+        self.mark_hex_changed(target_hex)
+        logger.info(f"Removed {removed_building} from Hex ({q},{r}).")
+        return True, "Building removed."
+
 
 # Example usage for testing
 if __name__ == '__main__':
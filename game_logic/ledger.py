@@ -0,0 +1,112 @@
+# game_logic/ledger.py
+import threading
+import logging
+from contextlib import contextmanager
+
+from .resources import ResourceVector
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerTransaction:
+    """
+    One atomic operation on the resources of one or more habitats.
+    reserve() moves amounts out of Habitat.resources into Habitat.reserved_resources, credit() queues
+    additions; commit() finalizes both, rollback() returns every reserved amount. A failed reserve()
+    marks the whole transaction as failed: the ledger rolls it back when the transaction ends.
+    """
+
+    __slots__ = ("_reservations", "_credits", "failed", "missing")
+
+    def __init__(self):
+        self._reservations = []  # [(habitat, ResourceVector)] in reservation order
+        self._credits = []
+        self.failed = False
+        self.missing = {}  # {resource value: missing amount} of the reserve() that failed
+
+    def reserve(self, habitat, costs):
+        """Reserves costs (dict or ResourceVector) from habitat. Returns False (and fails the transaction) if unaffordable."""
+        if self.failed:
+            return False
+        cost_vector = ResourceVector.from_costs(costs)
+        if not cost_vector.is_affordable_from(habitat.resources):
+            self.failed = True
+            self.missing = {res_enum.value: amount for res_enum, amount in cost_vector.shortfall(habitat.resources).items()}
+            return False
+        habitat.resources -= cost_vector
+        habitat.reserved_resources += cost_vector
+        self._reservations.append((habitat, cost_vector))
+        habitat._notify_resources_changed()
+        return True
+
+    def abort(self):
+        """Fails the transaction for a reason other than resources: everything reserved is returned when it ends."""
+        self.failed = True
+
+    def credit(self, habitat, amounts):
+        """Adds amounts to habitat on commit, capped at its storage capacity (e.g. the receiving end of a transfer)."""
+        self._credits.append((habitat, ResourceVector.from_costs(amounts)))
+
+    def commit(self):
+        for habitat, cost_vector in self._reservations:
+            habitat.reserved_resources -= cost_vector
+        for habitat, amounts in self._credits:
+            habitat.resources += amounts
+            habitat.resources.clamp(upper=habitat.storage_capacity)
+            habitat._notify_resources_changed()
+        self._reservations.clear()
+        self._credits.clear()
+
+    def rollback(self):
+        for habitat, cost_vector in reversed(self._reservations):
+            habitat.reserved_resources -= cost_vector
+            habitat.resources += cost_vector
+            habitat._notify_resources_changed()
+        self._reservations.clear()
+        self._credits.clear()
+
+
+class ResourceLedger:
+    """
+    Serializes resource transactions: a transaction holds the ledger lock from its first reserve()
+    to its commit/rollback, so concurrent requests can never spend the same amounts twice.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def transaction(self):
+        """
+        with ledger.transaction() as txn:
+            if txn.reserve(habitat, cost): ...apply the effects of the purchase...
+        Commits on normal exit; rolls back if a reserve() failed or an exception was raised.
+        """
+        with self._lock:
+            txn = LedgerTransaction()
+            try:
+                yield txn
+            except BaseException:
+                txn.rollback()
+                raise
+            if txn.failed:
+                txn.rollback()
+            else:
+                txn.commit()
+
+    def spend(self, habitat, costs):
+        """Single-habitat purchase. Returns (success, {resource value: missing amount})."""
+        with self.transaction() as txn:
+            txn.reserve(habitat, costs)
+        return not txn.failed, txn.missing
+
+    def transfer(self, source_habitat, target_habitat, amounts):
+        """Moves amounts between habitats atomically. Returns (success, {resource value: missing amount})."""
+        with self.transaction() as txn:
+            if txn.reserve(source_habitat, amounts):
+                txn.credit(target_habitat, amounts)
+        return not txn.failed, txn.missing
+
+
+# Used by habitats that do not belong to a GameState (which owns its own ledger)
+DEFAULT_LEDGER = ResourceLedger()
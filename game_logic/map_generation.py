@@ -0,0 +1,120 @@
+# game_logic/map_generation.py
+import logging
+import math
+
+from .hex_grid import np
+
+logger = logging.getLogger(__name__)
+
+NOISE_OCTAVES = 4
+NOISE_CELL_SIZE = 8.0  # Lattice spacing of the first octave, in hex widths (bigger = larger terrain features)
+
+# Terrain rules on the noise fields, applied in order (later rules override earlier ones).
+# Fields are rank-normalized to [0, 1], so each threshold is roughly the share of the map it selects.
+TERRAIN_RULES = (
+    ("Ancient_Riverbed", "elevation", "below", 0.16),
+    ("Canyon", "elevation_band", "below", 0.12),  # Band of elevation just above the riverbeds
+    ("Cratered_Highlands", "elevation", "above", 0.78),
+    ("Icy_Terrain", "cold", "above", 0.84),
+    ("Volcanic", "volcanism", "above", 0.88),
+)
+DEFAULT_TERRAIN = "Plains"
+
+
+def _hex_centers(layout):
+    """Cartesian centers (pointy-top, unit hex width) of every layout index."""
+    q, r = layout.coordinate_arrays()
+    return q + r * 0.5, r * (math.sqrt(3) / 2)
+
+
+def _value_noise(rng, x, y, cell_size=NOISE_CELL_SIZE, octaves=NOISE_OCTAVES):
+    """Fractal value noise in [0, 1]: random lattice values, smoothstep-interpolated, octaves halving in size."""
+    x = x - x.min()
+    y = y - y.min()
+    total = np.zeros(x.shape)
+    amplitude, amplitude_sum = 1.0, 0.0
+    for octave in range(octaves):
+        gx = x / (cell_size / 2 ** octave)
+        gy = y / (cell_size / 2 ** octave)
+        ix = gx.astype(np.intp)
+        iy = gy.astype(np.intp)
+        fx = gx - ix
+        fy = gy - iy
+        sx = fx * fx * (3 - 2 * fx)
+        sy = fy * fy * (3 - 2 * fy)
+        lattice = rng.random((int(iy.max()) + 2, int(ix.max()) + 2))
+        top = lattice[iy, ix] * (1 - sx) + lattice[iy, ix + 1] * sx
+        bottom = lattice[iy + 1, ix] * (1 - sx) + lattice[iy + 1, ix + 1] * sx
+        total += amplitude * (top * (1 - sy) + bottom * sy)
+        amplitude_sum += amplitude
+        amplitude *= 0.5
+    return total / amplitude_sum
+
+
+def _rank_normalize(field):
+    """Ranks of field scaled to [0, 1] (uniform distribution, ties broken by index)."""
+    ranks = np.empty(field.size)
+    ranks[np.argsort(field, kind="stable")] = np.arange(field.size)
+    return ranks / max(field.size - 1, 1)
+
+
+def generate_noise_fields(layout, rng):
+    """Rank-normalized elevation, ice and volcanism fields, plus the derived fields used by TERRAIN_RULES."""
+    x, y = _hex_centers(layout)
+    elevation = _rank_normalize(_value_noise(rng, x, y))
+    ice = _value_noise(rng, x, y)
+    volcanism = _rank_normalize(_value_noise(rng, x, y, cell_size=NOISE_CELL_SIZE / 2))
+    latitude = np.abs(y) / max(float(np.abs(y).max()), 1.0)  # 0 at the equator, 1 at the poles
+    riverbed_share = next(threshold for name, field, _, threshold in TERRAIN_RULES if name == "Ancient_Riverbed")
+    return {
+        "elevation": elevation,
+        "ice": ice,
+        "volcanism": volcanism,
+        "cold": _rank_normalize(0.6 * ice + 0.4 * latitude),
+        "elevation_band": np.where(elevation >= riverbed_share, elevation - riverbed_share, 1.0),
+    }
+
+
+def assign_terrain(fields, hex_types):
+    """Type IDs (indices in hex_types) of every hex, from TERRAIN_RULES."""
+    type_ids = {hex_type: type_id for type_id, hex_type in enumerate(hex_types)}
+    terrain = np.full(fields["elevation"].size, type_ids[DEFAULT_TERRAIN], dtype=np.uint8)
+    for hex_type, field, comparison, threshold in TERRAIN_RULES:
+        selected = fields[field] < threshold if comparison == "below" else fields[field] > threshold
+        terrain[selected] = type_ids[hex_type]
+    return terrain
+
+
+def assign_resources(rng, terrain, hex_types, hex_resources, resource_names, max_resources):
+    """
+    Resource bitmasks (bit order: resource_names) of every hex. Like HexCell: for each hex,
+    0..min(len(possible), max_resources) distinct resources among the ones of its terrain, uniformly.
+    """
+    resource_bits = {name: 1 << bit for bit, name in enumerate(resource_names)}
+    masks = np.zeros(terrain.size, dtype=np.uint32)
+    for type_id, hex_type in enumerate(hex_types):
+        possible = hex_resources.get(hex_type, [])
+        indices = np.flatnonzero(terrain == type_id)
+        if not possible or indices.size == 0:
+            continue
+        counts = rng.integers(0, min(len(possible), max_resources) + 1, size=indices.size)
+        # Random rank of each possible resource per hex: the ones ranked below the hex's count are picked
+        ranks = np.argsort(np.argsort(rng.random((indices.size, len(possible))), axis=1), axis=1)
+        chosen = ranks < counts[:, None]
+        bits = np.array([resource_bits[name] for name in possible], dtype=np.uint32)
+        masks[indices] = (chosen * bits).sum(axis=1, dtype=np.uint32)
+    return masks
+
+
+def generate_hex_contents(layout, seed, hex_types, hex_resources, resource_names, max_resources):
+    """
+    Terrain type IDs (uint8, indices in hex_types) and resource bitmasks (uint32, bit order: resource_names)
+    of every index of layout, in a few vectorized passes. The same seed gives the same map
+    (NumPy's PCG64 streams do not depend on the process or the platform).
+    """
+    rng = np.random.default_rng(seed)
+    fields = generate_noise_fields(layout, rng)
+    terrain = assign_terrain(fields, hex_types)
+    masks = assign_resources(rng, terrain, hex_types, hex_resources, resource_names, max_resources)
+    logger.debug(f"Generated {layout.count} hexes from seed {seed}.")
+    return terrain, masks
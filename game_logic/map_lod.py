@@ -0,0 +1,227 @@
+# game_logic/map_lod.py
+import logging
+import math
+from array import array
+
+from .hex_grid import np, HexGridLayout
+from .fog_of_war import VISIBILITY_UNKNOWN, VISIBILITY_EXPLORED
+
+logger = logging.getLogger(__name__)
+
+# Scale of each level of the pyramid: a super-hex of scale f spans about f hexes per side (about f * f hexes)
+LOD_SCALES = (4, 8, 16, 32)
+# Per-tile counters of a PlayerLod, in this order (owned/foreign: explored hexes owned by the player/others)
+LOD_COUNTERS = ("visible", "explored", "owned", "foreign")
+_VISIBLE, _EXPLORED, _OWNED, _FOREIGN = range(len(LOD_COUNTERS))
+
+
+def lod_level_for_zoom(zoom):
+    """Index in LOD_SCALES of the coarsest level with scale <= 1 / zoom; None when single hexes are shown."""
+    level = None
+    for index, scale in enumerate(LOD_SCALES):
+        if scale * zoom <= 1:
+            level = index
+    return level
+
+
+def _cube_round(q, r):
+    """Nearest hex (axial) to fractional axial coordinates."""
+    s = -q - r
+    rq, rr, rs = round(q), round(r), round(s)
+    dq, dr, ds = abs(rq - q), abs(rr - r), abs(rs - s)
+    if dq > dr and dq > ds:
+        rq = -rr - rs
+    elif dr > ds:
+        rr = -rq - rs
+    return rq, rr
+
+
+class LodLevel:
+    """Tiling of a HexGridLayout into super-hexes of one scale, shared by every player."""
+
+    def __init__(self, layout, scale):
+        self.scale = scale
+        self.tile_layout = HexGridLayout(math.ceil(layout.radius / scale) + 1)
+        self.tile_of = array("i")  # Hex index -> tile index: the hex of tile_layout nearest to (q / scale, r / scale)
+        if np is not None:
+            q, r = layout.coordinate_arrays()
+            fq, fr = q / scale, r / scale
+            fs = -fq - fr
+            rq, rr, rs = np.rint(fq), np.rint(fr), np.rint(fs)  # Half to even, like round()
+            dq, dr, ds = np.abs(rq - fq), np.abs(rr - fr), np.abs(rs - fs)
+            fix_q = (dq > dr) & (dq > ds)
+            fix_r = ~fix_q & (dr > ds)
+            rq = np.where(fix_q, -rr - rs, rq)
+            rr = np.where(fix_r, -rq - rs, rr)
+            tiles = self.tile_layout.index_array(rq.astype(np.int64), rr.astype(np.int64))
+            self.tile_of.frombytes(tiles.astype(np.int32).tobytes())
+            sizes = np.bincount(tiles, minlength=self.tile_layout.count)
+            self.tile_sizes = array("I", sizes.astype(np.uint32).tobytes())  # Map hexes in each tile
+        else:
+            for q, r in layout.iter_coords():
+                self.tile_of.append(self.tile_layout.index_of(*_cube_round(q / scale, r / scale)))
+            self.tile_sizes = array("I", bytes(4 * self.tile_layout.count))
+            for tile in self.tile_of:
+                self.tile_sizes[tile] += 1
+
+
+class PlayerLod:
+    """What one player sees of each tile of every level, as flat tile-major counter arrays."""
+
+    __slots__ = ("terrain", "resources", "counters")
+
+    def __init__(self, levels, type_count, resource_count):
+        # Terrain types of the visible hexes, resources of the explored hexes, then LOD_COUNTERS
+        self.terrain = [array("I", bytes(4 * level.tile_layout.count * type_count)) for level in levels]
+        self.resources = [array("I", bytes(4 * level.tile_layout.count * resource_count)) for level in levels]
+        self.counters = [array("I", bytes(4 * level.tile_layout.count * len(LOD_COUNTERS))) for level in levels]
+
+
+class MapLodPyramid:
+    """Per-player summaries of the super-hex tiles of each LOD_SCALES level, for zoomed-out map views."""
+
+    def __init__(self, hex_map, hex_types, resource_names):
+        self.hex_map = hex_map
+        self.type_ids = {hex_type: type_id for type_id, hex_type in enumerate(hex_types)}
+        self.type_count = len(self.type_ids)
+        self.resource_count = len(resource_names)
+        self.levels = [LodLevel(hex_map.layout, scale) for scale in LOD_SCALES]
+        self.players = {}  # player_id -> PlayerLod, updated hex by hex by MarsHexMap (one tile per level)
+        self._mask_bits = {}  # Resource bitmask -> its bit numbers (few distinct masks)
+
+    def _bits(self, mask):
+        bits = self._mask_bits.get(mask)
+        if bits is None:
+            bits = self._mask_bits[mask] = tuple(bit for bit in range(self.resource_count) if mask >> bit & 1)
+        return bits
+
+    def _add(self, lod, index, delta, visible, explored, owner=None, player_id=None):
+        """Adds delta (+1/-1) to the counters of the tiles of index: visible part and/or explored part."""
+        type_id = self.type_ids[self.hex_map.hex_at(index).hex_type] if visible else None
+        bits = self._bits(self.hex_map.spatial.resource_mask(index)) if explored else ()
+        owner_counter = None
+        if explored and owner is not None:
+            owner_counter = _OWNED if owner == player_id else _FOREIGN
+        for level_index, level in enumerate(self.levels):
+            tile = level.tile_of[index]
+            counters = lod.counters[level_index]
+            base = tile * len(LOD_COUNTERS)
+            if visible:
+                lod.terrain[level_index][tile * self.type_count + type_id] += delta
+                counters[base + _VISIBLE] += delta
+            if explored:
+                counters[base + _EXPLORED] += delta
+                resources = lod.resources[level_index]
+                for bit in bits:
+                    resources[tile * self.resource_count + bit] += delta
+                if owner_counter is not None:
+                    counters[base + owner_counter] += delta
+
+    # --- Maintenance (called by MarsHexMap) ---
+
+    def add_player(self, player_id, visibility):
+        """Starts the pyramid of player_id from its PlayerVisibility (usually still empty)."""
+        lod = self.players[player_id] = PlayerLod(self.levels, self.type_count, self.resource_count)
+        for index in visibility.visible_indices():
+            explored = index in visibility.explored
+            owner = self.hex_map.hex_at(index).owner_player_id if explored else None
+            self._add(lod, index, 1, True, explored, owner, player_id)
+
+    def on_visibility_changed(self, player_id, index, previous_level, level):
+        lod = self.players.get(player_id)
+        if lod is None or previous_level == level:
+            return
+        was_visible, is_visible = previous_level > VISIBILITY_UNKNOWN, level > VISIBILITY_UNKNOWN
+        was_explored, is_explored = previous_level >= VISIBILITY_EXPLORED, level >= VISIBILITY_EXPLORED
+        owner = self.hex_map.hex_at(index).owner_player_id if was_explored != is_explored else None
+        if is_visible and not was_visible or is_explored and not was_explored:
+            self._add(lod, index, 1, is_visible and not was_visible, is_explored and not was_explored, owner, player_id)
+        if was_visible and not is_visible or was_explored and not is_explored:
+            self._add(lod, index, -1, was_visible and not is_visible, was_explored and not is_explored, owner, player_id)
+
+    def on_owner_changed(self, index, previous_owner, owner):
+        """Before the owner of hex index changes: only the players who explored it see the change."""
+        for player_id, lod in self.players.items():
+            if index not in self.hex_map.player_visibility[player_id].explored:
+                continue
+            for level_index, level in enumerate(self.levels):
+                base = level.tile_of[index] * len(LOD_COUNTERS)
+                counters = lod.counters[level_index]
+                if previous_owner is not None:
+                    counters[base + (_OWNED if previous_owner == player_id else _FOREIGN)] -= 1
+                if owner is not None:
+                    counters[base + (_OWNED if owner == player_id else _FOREIGN)] += 1
+
+    def on_terrain_changed(self, index, previous_type, hex_type):
+        previous_id, type_id = self.type_ids[previous_type], self.type_ids[hex_type]
+        for player_id, lod in self.players.items():
+            if index not in self.hex_map.player_visibility[player_id].fogged:
+                continue
+            for level_index, level in enumerate(self.levels):
+                terrain, base = lod.terrain[level_index], level.tile_of[index] * self.type_count
+                terrain[base + previous_id] -= 1
+                terrain[base + type_id] += 1
+
+    # --- Queries ---
+
+    def count_tiles_in_box(self, level_index, q0, r0, q1, r1):
+        return sum(len(tiles) for _, _, tiles in self._tile_box_rows(level_index, q0, r0, q1, r1))
+
+    def _tile_box_rows(self, level_index, q0, r0, q1, r1):
+        """Rows of the tiles overlapping the hex box q0 <= q <= q1, r0 <= r <= r1 (one tile of margin)."""
+        scale = self.levels[level_index].scale
+        return self.levels[level_index].tile_layout.box_rows(
+            math.floor(q0 / scale) - 1, math.floor(r0 / scale) - 1, math.ceil(q1 / scale) + 1, math.ceil(r1 / scale) + 1)
+
+    def get_tiles_for_json(self, player_id, level_index, q0, r0, q1, r1):
+        """Columnar lists of the tiles of level_index in the hex box that player_id has seen hexes of."""
+        # "q", "r": tile coordinates (central hex (scale * q, scale * r)); "type": dominant visible terrain;
+        # "resources": bitmask found in the explored hexes; "hexes": map hexes in the tile; then LOD_COUNTERS
+        level = self.levels[level_index]
+        lod = self.players.get(player_id)
+        columns = {name: [] for name in ("q", "r", "type", "resources", "hexes") + LOD_COUNTERS}
+        if lod is not None and np is not None:
+            columns = self._tile_columns(lod, level_index, q0, r0, q1, r1)
+        elif lod is not None:
+            terrain, resources, counters = lod.terrain[level_index], lod.resources[level_index], lod.counters[level_index]
+            width = len(LOD_COUNTERS)
+            for r, first_q, tiles in self._tile_box_rows(level_index, q0, r0, q1, r1):
+                for tile in tiles:
+                    tile_counters = counters[tile * width:(tile + 1) * width]
+                    if not tile_counters[_VISIBLE]:
+                        continue
+                    type_counts = terrain[tile * self.type_count:(tile + 1) * self.type_count]
+                    resource_counts = resources[tile * self.resource_count:(tile + 1) * self.resource_count]
+                    columns["q"].append(first_q + tile - tiles.start)
+                    columns["r"].append(r)
+                    columns["type"].append(max(range(self.type_count), key=type_counts.__getitem__))
+                    columns["resources"].append(sum(1 << bit for bit, count in enumerate(resource_counts) if count))
+                    columns["hexes"].append(level.tile_sizes[tile])
+                    for counter, name in enumerate(LOD_COUNTERS):
+                        columns[name].append(tile_counters[counter])
+        return {"level": level_index, "scale": level.scale, "box": [q0, r0, q1, r1], **columns}
+
+    def _tile_columns(self, lod, level_index, q0, r0, q1, r1):
+        """Vectorized get_tiles_for_json: the counter arrays are read in place as NumPy matrices."""
+        tiles, tile_q, tile_r = [], [], []
+        for r, first_q, row in self._tile_box_rows(level_index, q0, r0, q1, r1):
+            tiles.append(np.arange(row.start, row.stop))
+            tile_q.append(np.arange(first_q, first_q + len(row)))
+            tile_r.append(np.full(len(row), r))
+        tiles = np.concatenate(tiles) if tiles else np.zeros(0, dtype=np.intp)
+        counters = np.frombuffer(lod.counters[level_index], dtype=np.uint32).reshape(-1, len(LOD_COUNTERS))[tiles]
+        seen = counters[:, _VISIBLE] > 0
+        tiles, counters = tiles[seen], counters[seen]
+        terrain = np.frombuffer(lod.terrain[level_index], dtype=np.uint32).reshape(-1, self.type_count)[tiles]
+        resources = np.frombuffer(lod.resources[level_index], dtype=np.uint32).reshape(-1, self.resource_count)[tiles]
+        resource_bits = np.left_shift(1, np.arange(self.resource_count, dtype=np.int64))
+        columns = {
+            "q": (np.concatenate(tile_q)[seen] if tile_q else tiles).tolist(),
+            "r": (np.concatenate(tile_r)[seen] if tile_r else tiles).tolist(),
+            "type": terrain.argmax(axis=1).tolist(),  # First of the most frequent, like max() in the loop
+            "resources": ((resources > 0) @ resource_bits).tolist(),
+            "hexes": np.frombuffer(self.levels[level_index].tile_sizes, dtype=np.uint32)[tiles].tolist(),
+        }
+        for counter, name in enumerate(LOD_COUNTERS):
+            columns[name] = counters[:, counter].tolist()
+        return columns
@@ -0,0 +1,189 @@
+# game_logic/pathfinding.py
+import heapq
+import logging
+import math
+from array import array
+from collections import OrderedDict
+
+from .hex_grid import np, NO_HEX, hex_distance
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_DISTANCE_FIELDS = 16  # ~12 bytes per hex each: 1.4 MB per field at radius 200
+# find_path calls towards the same goal (same player) after which the goal gets its own distance field
+FIELD_PROMOTION_REQUESTS = 3
+
+
+class DistanceField:
+    """Cost of reaching origin from every hex (Dijkstra) and the next hop towards it, shared by all routes."""
+
+    __slots__ = ("origin", "player_id", "distances", "next_hops")
+
+    def __init__(self, origin, player_id, distances, next_hops):
+        self.origin = origin
+        self.player_id = player_id
+        self.distances = distances  # array('d'), math.inf for the hexes that cannot reach origin
+        self.next_hops = next_hops  # array('i'), NO_HEX for origin and the unreachable hexes
+
+    def distance(self, index):
+        distance = self.distances[index]
+        return None if distance == math.inf else distance
+
+    def path_from(self, index):
+        """Indices from index to origin (both included), or None if origin cannot be reached."""
+        if self.distances[index] == math.inf:
+            return None
+        path = [index]
+        next_hops = self.next_hops
+        while index != self.origin:
+            index = next_hops[index]
+            path.append(index)
+        return path
+
+
+class HexPathfinder:
+    """Routes across a MarsHexMap on linear hex indices: A* (find_path) and cached Dijkstra fields (distance_field)."""
+
+    def __init__(self, hex_map, move_costs):
+        """move_costs: cost of moving onto each hex, in index order (see MarsHexMap.get_move_costs)."""
+        self.layout = hex_map.layout
+        self.neighbor_table = hex_map.spatial.neighbor_table
+        self.costs = array("d", move_costs)
+        self._min_cost = min(self.costs) if self.costs else 1.0
+        self._q = array("i")  # Coordinates of every index, for the A* heuristic
+        self._r = array("i")
+        if np is not None:
+            q, r = self.layout.coordinate_arrays()
+            self._q.frombytes(q.astype(np.int32).tobytes())
+            self._r.frombytes(r.astype(np.int32).tobytes())
+        else:
+            for q, r in self.layout.iter_coords():
+                self._q.append(q)
+                self._r.append(r)
+        self._owners = {}  # Hex index -> owner player_id: routes for a player never enter other players' hexes
+        for owner, indices in hex_map.spatial.owner_index.items():
+            for index in indices:
+                self._owners[index] = owner
+        self._fields = OrderedDict()  # (origin, player_id) -> DistanceField, least recently used first
+        self._goal_requests = {}  # (goal, player_id) -> find_path calls since the last invalidation
+        self.field_hits = 0
+        self.field_misses = 0
+
+    # --- Maintenance (called by MarsHexMap) ---
+
+    def on_owner_changed(self, index, previous_owner, owner):
+        if owner is None:
+            self._owners.pop(index, None)
+        else:
+            self._owners[index] = owner
+        # Only the fields for which the hex became enterable (or not) are dropped
+        for key in list(self._fields):
+            player_id = key[1]
+            if player_id is None:
+                continue
+            if (previous_owner in (None, player_id)) != (owner in (None, player_id)):
+                del self._fields[key]
+                self._goal_requests.pop(key, None)
+
+    def on_terrain_changed(self, index, move_cost):
+        self.costs[index] = move_cost
+        self._min_cost = min(self.costs)
+        if self._fields:
+            logger.debug(f"Terrain of hex {index} changed: {len(self._fields)} distance fields dropped.")
+        self._fields.clear()
+        self._goal_requests.clear()
+
+    # --- Queries ---
+
+    def _heuristic(self, index, goal):  # Hex distance times the cheapest terrain cost: admissible
+        return hex_distance(self._q[index], self._r[index], self._q[goal], self._r[goal]) * self._min_cost
+
+    def find_path(self, start, goal, player_id=None):
+        """(indices from start to goal, total cost) of a cheapest route, or None if goal cannot be reached."""
+        key = (goal, player_id)
+        field = self._fields.get(key)
+        if field is None:
+            requests = self._goal_requests.get(key, 0) + 1
+            self._goal_requests[key] = requests
+            if requests >= FIELD_PROMOTION_REQUESTS:
+                field = self.distance_field(goal, player_id)
+        else:
+            self._fields.move_to_end(key)
+            self.field_hits += 1
+        if field is not None:
+            path = field.path_from(start)
+            return None if path is None else (path, field.distances[start])
+        return self._a_star(start, goal, player_id)
+
+    def _a_star(self, start, goal, player_id):
+        costs, table, owners = self.costs, self.neighbor_table, self._owners
+        best = {start: 0.0}
+        came_from = {}
+        # Ties on f go to the entry with the higher cost so far (closer to the goal): fewer expansions
+        heap = [(self._heuristic(start, goal), 0.0, start)]
+        while heap:
+            _, negative_cost, index = heapq.heappop(heap)
+            cost = -negative_cost
+            if index == goal:
+                path = [goal]
+                while index != start:
+                    index = came_from[index]
+                    path.append(index)
+                path.reverse()
+                return path, cost
+            if cost > best[index]:
+                continue
+            base = 6 * index
+            for neighbor in table[base:base + 6]:
+                if neighbor == NO_HEX:
+                    continue
+                if player_id is not None and owners.get(neighbor, player_id) != player_id:
+                    continue  # Another player's hex
+                neighbor_cost = cost + costs[neighbor]
+                if neighbor_cost < best.get(neighbor, math.inf):
+                    best[neighbor] = neighbor_cost
+                    came_from[neighbor] = index
+                    heapq.heappush(heap, (neighbor_cost + self._heuristic(neighbor, goal), -neighbor_cost, neighbor))
+        return None
+
+    def distance_field(self, origin, player_id=None):
+        """DistanceField towards origin for player_id (cached)."""
+        key = (origin, player_id)
+        field = self._fields.get(key)
+        if field is not None:
+            self._fields.move_to_end(key)
+            self.field_hits += 1
+            return field
+        self.field_misses += 1
+        field = self._build_field(origin, player_id)
+        self._fields[key] = field
+        if len(self._fields) > MAX_CACHED_DISTANCE_FIELDS:
+            self._fields.popitem(last=False)
+        return field
+
+    def _build_field(self, origin, player_id):
+        costs, table, owners = self.costs, self.neighbor_table, self._owners
+        count = self.layout.count
+        distances = array("d", [math.inf]) * count
+        next_hops = array("i", [NO_HEX]) * count
+        distances[origin] = 0.0
+        heap = [(0.0, origin)]
+        while heap:
+            distance, index = heapq.heappop(heap)
+            if distance > distances[index]:
+                continue
+            if player_id is not None and owners.get(index, player_id) != player_id:
+                continue  # Nobody can move onto another player's hex, so no route goes through it
+            # The neighbors reach origin by moving onto this hex
+            distance += costs[index]
+            base = 6 * index
+            for neighbor in table[base:base + 6]:
+                if neighbor != NO_HEX and distance < distances[neighbor]:
+                    distances[neighbor] = distance
+                    next_hops[neighbor] = index
+                    heapq.heappush(heap, (distance, neighbor))
+        logger.debug(f"Distance field built for origin {origin} (player {player_id}).")
+        return DistanceField(origin, player_id, distances, next_hops)
+
+    def cached_field_count(self):
+        return len(self._fields)
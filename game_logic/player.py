@@ -1,13 +1,19 @@
 # game_logic/player.py
 import uuid
 import logging
+import math
 from .technologies import TECH_TREE, apply_tech_effects, can_research, Technology, TechEffect
 from .resources import ResourceStorage, Resource, INITIAL_RESOURCE_AMOUNTS
 from .habitat import Habitat # Import Habitat for type hinting and instantiation
 from .character import Character, ALL_CHARACTER_BONUSES_MAP # Importa la classe Character e i bonus
+from .versioning import SectionVersions
+from .tech_index import TechStateIndex
 
 logger = logging.getLogger(__name__)
 
+# Versioned sections of a Player (see versioning.py)
+PLAYER_VERSIONED_SECTIONS = ("profile", "character", "habitats", "research", "technologies")
+
 class Player:
     _next_habitat_id_counter = 1 # Simple counter for unique habitat IDs per player session
 
@@ -20,6 +26,7 @@ class Player:
             self.character.player_owner_id = self.id # Link al player
 
         self.habitats = {}
+        self.versions = SectionVersions(PLAYER_VERSIONED_SECTIONS)
 
         # --- Technology State ---
         self.unlocked_technologies = set() # Set of tech IDs
@@ -32,6 +39,9 @@ class Player:
 
         self.current_research_project = None # ID of the tech currently being researched
         self.current_research_progress_rp = 0 # RP accumulated towards the current project
+        self._research_rate = None # Cached generic RP per tick (None = stale, see invalidate_research_rate)
+        self.game_state_ref = None # Set by GameState.add_player
+        self.tech_index = TechStateIndex(self) # Incremental available/locked status of every tech
 
         # --- Apply Faction Starting Bonuses ---
         self._apply_initial_faction_bonuses() # This might unlock initial techs/buildings
@@ -131,9 +141,10 @@ class Player:
                 except Exception as e:
                     logger.error(f"    -> ERROR applying character bonus effect {effect}: {e}", exc_info=True)
         
-        # Dopo aver applicato i bonus che potrebbero influenzare l'habitat, ricalcola
-        if primary_habitat:
-            primary_habitat._recalculate_all_stats()
+        # Dopo aver applicato i bonus che potrebbero influenzare l'habitat, ricalcola.
+        # Gli habitat rilevano il cambio di Character.bonus_version e ricalcolano solo le stats interessate.
+        for habitat in self.habitats.values():
+            habitat._refresh_stats()
 
     def add_habitat(self, habitat_object: Habitat):
         """Adds an existing Habitat object to the player's control."""
@@ -147,9 +158,30 @@ class Player:
 
         habitat_object.id = new_id # Assign the generated ID to the habitat instance
         self.habitats[new_id] = habitat_object
+        self.versions.touch("habitats")
+
+        # In vectorized engine mode the habitat's resource dicts become views into the engine arrays
+        tick_engine = getattr(habitat_object.game_state_ref, 'tick_engine', None)
+        if tick_engine:
+            tick_engine.attach(habitat_object)
         logger.info(f"Habitat '{habitat_object.name}' (ID: {new_id}) added to player '{self.name}'.")
         return new_id
 
+    def remove_habitat(self, habitat_id):
+        """Removes a habitat from the player's control. Returns the removed Habitat, or None if unknown."""
+        habitat_object = self.habitats.pop(habitat_id, None)
+        if habitat_object is None:
+            return None
+        self.versions.touch("habitats")
+        # Frees its row in the vectorized engine and drops its predicted events
+        if habitat_object.tick_engine:
+            habitat_object.tick_engine.detach(habitat_object)
+        event_scheduler = getattr(habitat_object.game_state_ref, 'event_scheduler', None)
+        if event_scheduler:
+            event_scheduler.cancel(("habitat", self.id, habitat_id))
+        logger.info(f"Habitat '{habitat_object.name}' (ID: {habitat_id}) removed from player '{self.name}'.")
+        return habitat_object
+
 
     def get_habitat(self, habitat_id):
         """Retrieves a specific habitat owned by the player."""
@@ -179,8 +211,11 @@ class Player:
         # Uses the standalone can_research function from technologies module
         return can_research(self, tech_id)
 
-    def start_research(self, tech_id: str) -> (bool, str):
-        """Starts researching a technology if prerequisites and costs are met."""
+    def start_research(self, tech_id: str, txn=None) -> (bool, str):
+        """
+        Starts researching a technology if prerequisites and costs are met.
+        With txn (a LedgerTransaction) the resource cost is reserved in it instead of a transaction of its own.
+        """
         can_start, message = self.can_research_tech(tech_id)
         if not can_start:
             logger.warning(f"Cannot start research for {tech_id}: {message}")
@@ -190,18 +225,22 @@ class Player:
         if not tech_data: # Should be caught by can_research, but double-check
              return False, f"Technology '{tech_id}' definition not found."
 
-        # Attempt to spend resource costs from the primary habitat
-        if tech_data.cost_resources:
-            primary_habitat = self.get_primary_habitat()
-            if not primary_habitat:
-                 return False, "Cannot pay research resource cost: No primary habitat."
-            if not primary_habitat.spend_resources(tech_data.cost_resources):
-                 # spend_resources logs the failure reason
+        # Pay the resource costs from the primary habitat, then set the current project
+        primary_habitat = self.get_primary_habitat()
+        if tech_data.cost_resources and not primary_habitat:
+             return False, "Cannot pay research resource cost: No primary habitat."
+        if primary_habitat:
+            # In a batch (txn given) the reservation is returned if a later action of the batch fails
+            if txn is None:
+                paid, missing = primary_habitat.ledger.spend(primary_habitat, tech_data.cost_resources)
+            else:
+                paid, missing = txn.reserve(primary_habitat, tech_data.cost_resources), txn.missing
+            if not paid:
+                 logger.warning(f"Player '{self.name}': Cannot pay research cost for {tech_id}. Missing: {missing}")
                  return False, "Insufficient resources in primary habitat for research cost."
-
-        # If resources spent successfully, set the current project
         self.current_research_project = tech_id
         self.current_research_progress_rp = 0
+        self._notify_research_changed()
         tech_name = tech_data.display_name
         logger.info(f"Player '{self.name}' started research: {tech_name} (ID: {tech_id}). Cost: {tech_data.cost_rp} RP.")
         return True, f"Research started for '{tech_name}'."
@@ -217,6 +256,7 @@ class Player:
             logger.error(f"Current research project '{self.current_research_project}' not found in TECH_TREE. Resetting research.")
             self.current_research_project = None
             self.current_research_progress_rp = 0
+            self.versions.touch("research", "technologies")
             return
 
         # Get total RP production from all habitats
@@ -233,6 +273,58 @@ class Player:
                 self.complete_research()
 
 
+    def _notify_research_changed(self):
+        """Tells the GameState that the predicted completion of the current research is stale."""
+        self.versions.touch("research", "technologies")
+        invalidate_research_predictions = getattr(self.game_state_ref, "invalidate_research_predictions", None)
+        if invalidate_research_predictions:
+            invalidate_research_predictions(self)
+
+    def invalidate_research_rate(self):
+        """Called when a habitat's research production may have changed."""
+        self._research_rate = None
+
+    def get_research_rate(self):
+        """Generic RP per tick, cached until invalidate_research_rate() is called."""
+        if self._research_rate is None:
+            self._research_rate = self.get_total_research_production().get("ResearchPoints", 0)
+        return self._research_rate
+
+    def accrue_research_progress(self):
+        """
+        Adds one tick of RP to the current project without checking for completion.
+        Used by GameState, which schedules the completion check as an event (see event_scheduler.py).
+        """
+        if self.current_research_project:
+            rp_this_tick = self.get_research_rate()
+            if rp_this_tick > 0:
+                self.current_research_progress_rp += rp_this_tick
+
+    def is_research_complete(self):
+        tech_data = TECH_TREE.get(self.current_research_project) if self.current_research_project else None
+        return bool(tech_data) and self.current_research_progress_rp >= tech_data.cost_rp
+
+    def research_ticks_until_completion(self):
+        """Ticks before the current research completes at the current RP rate, or None if it never will."""
+        if not self.current_research_project:
+            return None
+        tech_data = TECH_TREE.get(self.current_research_project)
+        if not tech_data:
+            return 1 # update_research_progress resets the project on the next tick
+        rp_per_tick = self.get_total_research_production().get("ResearchPoints", 0)
+        if rp_per_tick <= 0:
+            return None
+        return max(1, math.ceil((tech_data.cost_rp - self.current_research_progress_rp) / rp_per_tick))
+
+    def advance_research_analytically(self, num_ticks):
+        """Accrues num_ticks ticks of research in closed form. Only valid before the completion tick."""
+        if not self.current_research_project or num_ticks <= 0:
+            return
+        rp_per_tick = self.get_total_research_production().get("ResearchPoints", 0)
+        if rp_per_tick > 0:
+            self.current_research_progress_rp += rp_per_tick * num_ticks
+
+
     def complete_research(self):
         """Completes the current research project and applies its effects."""
         if not self.current_research_project:
@@ -247,6 +339,7 @@ class Player:
         # Reset research state *before* applying effects (in case effects trigger new state)
         self.current_research_project = None
         self.current_research_progress_rp = 0
+        self.versions.touch("research", "technologies")
 
         # Unlock the technology and apply its effects
         self.unlock_technology(completed_tech_id, apply_effects=True)
@@ -262,6 +355,8 @@ class Player:
              return # Don't re-apply effects if already unlocked
 
         self.unlocked_technologies.add(tech_id)
+        self.versions.touch("technologies")
+        self.tech_index.on_technology_unlocked(tech_id)
         tech_name = TECH_TREE[tech_id].display_name
         logger.info(f"Technology '{tech_name}' (ID: {tech_id}) unlocked for player '{self.name}'.")
 
@@ -279,30 +374,20 @@ class Player:
             return "researched"
         if self.current_research_project == tech_id:
             return "researching"
-
-        # Check if available (prereqs met, ignoring cost for status check)
-        tech_data = TECH_TREE.get(tech_id)
-        if not tech_data: return "invalid" # Should not happen if TECH_TREE is consistent
-
-        prereqs_met = all(prereq in self.unlocked_technologies for prereq in tech_data.prerequisites)
-        # Basic building prereq check (more detailed check in can_research)
-        buildings_met = True
-        if tech_data.building_prerequisites:
-             primary_habitat = self.get_primary_habitat()
-             if not primary_habitat: buildings_met = False # Cannot check without habitat
-             else:
-                 for bp_id, level in tech_data.building_prerequisites.items():
-                     if not primary_habitat.buildings.get(bp_id) or primary_habitat.buildings[bp_id].level < level:
-                         buildings_met = False
-                         break
-
-        if prereqs_met and buildings_met:
-            # Check resource cost just for a hint - actual start depends on can_research
-            can_afford_now, _ = self.can_research_tech(tech_id) # This does the full check including resources
-            return "available" if can_afford_now else "locked" # Treat as locked if currently unaffordable
-            # Alternatively: return "available" if only cost is blocking
-        else:
-             return "locked" # Prerequisites not met
+        if tech_id not in TECH_TREE:
+            return "invalid" # Should not happen if TECH_TREE is consistent
+
+        # Prerequisites, building levels and affordability (cost of the primary habitat) are tracked incrementally
+        self.tech_index.sync()
+        return self.tech_index.get_status(tech_id)
+
+    def get_technology_statuses(self):
+        """{tech_id: status} for the whole TECH_TREE, as returned by get_technology_status."""
+        self.tech_index.sync()
+        statuses = self.tech_index.get_statuses()
+        if self.current_research_project in statuses and self.current_research_project not in self.unlocked_technologies:
+            statuses[self.current_research_project] = "researching"
+        return statuses
 
     def update_player_state(self):
         """Core update logic called each game tick for this player."""
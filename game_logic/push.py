@@ -0,0 +1,86 @@
+# game_logic/push.py
+import threading
+import time
+import logging
+
+from .versioning import current_version
+from . import serialization
+
+logger = logging.getLogger(__name__)
+
+SSE_RETRY_MS = 3000           # Reconnection delay suggested to EventSource
+SSE_KEEPALIVE_SECONDS = 15.0  # Comment sent on idle streams, so proxies do not close them
+LONG_POLL_MAX_SECONDS = 30.0  # Upper bound of the wait= parameter of /api/game_state
+
+
+class StateChangeNotifier:
+    """Wakes up the push streams after a tick or an action (they check current_version() themselves)."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+
+    def publish(self):
+        with self._condition:
+            self._condition.notify_all()
+
+    def wait_for_change(self, last_version, timeout=None):
+        """Blocks until a version newer than last_version is issued. Returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: current_version() > last_version, timeout)
+
+
+# One notifier per process: versions are process-wide too (see versioning.py)
+STATE_CHANGES = StateChangeNotifier()
+
+
+def format_sse_message(data=None, event=None, event_id=None, retry=None, comment=None):
+    """One Server-Sent Events message (data must be a string without newlines, e.g. compact JSON)."""
+    lines = []
+    if comment is not None:
+        lines.append(f": {comment}")
+    if retry is not None:
+        lines.append(f"retry: {retry}")
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    if data is not None:
+        lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream_player_state(get_game_state, player_id, since=None, sections=None, notifier=STATE_CHANGES,
+                        keepalive_seconds=SSE_KEEPALIVE_SECONDS):
+    """SSE messages with the state deltas of player_id: the full state (unless since), then one per change."""
+    yield format_sse_message(retry=SSE_RETRY_MS)
+    last_version = since
+    while True:
+        game_state = get_game_state()  # The server can replace the GameState (reset, new game)
+        with game_state.lock:
+            state = game_state.get_player_game_state(player_id, since=last_version, sections=sections)
+        if state is None:
+            logger.info(f"Push stream of player {player_id} ended: player not in the current game.")
+            yield format_sse_message(data="{}", event="reset")
+            return
+        if last_version is None or len(state) > 2:  # More than "version" and "delta"
+            # id = version: a reconnecting EventSource resumes from Last-Event-ID
+            yield format_sse_message(data=serialization.dumps(state), event="state", event_id=state["version"])
+        last_version = state["version"]
+        if not notifier.wait_for_change(last_version, keepalive_seconds):
+            yield format_sse_message(comment="keepalive")
+
+
+def wait_for_player_change(get_game_state, player_id, known_version, timeout, sections=None, notifier=STATE_CHANGES):
+    """Long poll: True as soon as the state of player_id changes after known_version, False after timeout seconds."""
+    deadline = time.monotonic() + timeout
+    while True:
+        game_state = get_game_state()
+        with game_state.lock:
+            state_version = game_state.get_player_state_version(player_id, sections)
+            observed_version = current_version()
+        # A version from the future (e.g. issued by a previous server process) never becomes current
+        if state_version is None or state_version > known_version or known_version > observed_version:
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not notifier.wait_for_change(observed_version, remaining):
+            return False
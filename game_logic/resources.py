@@ -1,4 +1,7 @@
 # game_logic/resources.py
+import math
+from array import array
+from collections.abc import Mapping, MutableMapping
 from enum import Enum
 
 class Resource(Enum):
@@ -19,6 +22,60 @@ class Resource(Enum):
     def __str__(self):
         return self.value
 
+
+class ResourceResolver:
+    """
+    Resolves resource keys to Resource members in O(1): enum members, names ("WATER_ICE"),
+    display values ("Acqua Ghiacciata", as sent back by the JSON API) and their case-folded forms.
+    Built once at import (RESOURCE_RESOLVER); use it instead of Resource[...] or scans over Resource.
+    """
+
+    def __init__(self):
+        self._lookup = {}
+        for res_enum in Resource:
+            for alias in (res_enum.name, res_enum.value, res_enum.name.replace("_", " ")):
+                self._lookup[alias] = res_enum
+                self._lookup[alias.casefold()] = res_enum
+        # Longest names first, so that a name which prefixes another one cannot shadow it
+        self._name_prefixes = tuple(sorted(((res_enum.name + "_", res_enum) for res_enum in Resource),
+                                           key=lambda item: len(item[0]), reverse=True))
+
+    def resolve(self, key):
+        """Returns the Resource for key, or None if it is not a known resource."""
+        if isinstance(key, Resource):
+            return key
+        if isinstance(key, str):
+            res_enum = self._lookup.get(key)
+            return res_enum if res_enum is not None else self._lookup.get(key.casefold())
+        return None
+
+    def normalize(self, resource_dict):
+        """
+        Converts a whole {key: amount} dict (cost, bonus or API payload) to {Resource: amount}.
+        Returns (normalized_dict, unknown_keys); amounts of keys resolving to the same resource are summed.
+        """
+        normalized = {}
+        unknown_keys = []
+        for key, amount in resource_dict.items():
+            res_enum = self.resolve(key)
+            if res_enum is None:
+                unknown_keys.append(key)
+            elif res_enum in normalized:
+                normalized[res_enum] += amount
+            else:
+                normalized[res_enum] = amount
+        return normalized, unknown_keys
+
+    def split_prefixed(self, key):
+        """Splits "WATER_ICE_production_modifier" into (Resource.WATER_ICE, "production_modifier"); (None, key) if no prefix."""
+        for prefix, res_enum in self._name_prefixes:
+            if key.startswith(prefix):
+                return res_enum, key[len(prefix):]
+        return None, key
+
+
+RESOURCE_RESOLVER = ResourceResolver()
+
 # Default starting amounts (can be overridden by faction bonuses)
 INITIAL_RESOURCE_AMOUNTS = {
     Resource.WATER_ICE: 250,
@@ -48,50 +105,199 @@ BASE_PRODUCTION_RATES = {
     Resource.FOOD: 0
 }
 
+# Ordinal of each resource inside a ResourceVector (and in the VectorizedTickEngine columns)
+RESOURCE_ORDER = tuple(Resource)
+RESOURCE_INDEX = {res_enum: i for i, res_enum in enumerate(RESOURCE_ORDER)}
+NUM_RESOURCES = len(RESOURCE_ORDER)
+RESOURCE_INDICES = range(NUM_RESOURCES)
+
+
+def as_resource_values(other):
+    """Per-ordinal values of a ResourceVector, of any {Resource: amount} mapping or of a scalar."""
+    if isinstance(other, ResourceVector):
+        return other._values
+    if isinstance(other, Mapping):
+        return array('d', [other.get(res_enum, 0) for res_enum in RESOURCE_ORDER])
+    return array('d', [other]) * NUM_RESOURCES
+
+
+def _resource_index(key):
+    """Ordinal of a Resource or of one of its names (see ResourceResolver); KeyError for anything else."""
+    index = RESOURCE_INDEX.get(key)
+    if index is None:
+        res_enum = RESOURCE_RESOLVER.resolve(key)
+        if res_enum is None:
+            raise KeyError(f"Unknown resource key {key!r}")
+        index = RESOURCE_INDEX[res_enum]
+    return index
+
+
+class ResourceVector(MutableMapping):
+    """
+    Fixed-size {Resource: amount} mapping stored in an array('d') indexed by resource ordinal.
+    Every resource is always present. Arithmetic, clamping and comparisons work on the whole
+    vector at once (other operands can be ResourceVectors, {Resource: amount} mappings or scalars);
+    the in-place ones (+=, -=, add_scaled, clamp) write into the same array.
+    Keys may be Resource members or their names (see ResourceResolver); other keys raise KeyError.
+    """
+
+    __slots__ = ("_values",)
+
+    def __init__(self, initial=None, fill=0.0):
+        if isinstance(initial, ResourceVector):
+            self._values = array('d', initial._values)
+            return
+        self._values = array('d', [fill]) * NUM_RESOURCES
+        if initial:
+            for key, amount in initial.items():
+                self._values[_resource_index(key)] = amount
+
+    @classmethod
+    def from_costs(cls, costs):
+        """Vector of a cost dict (a ResourceVector is returned as is). Keys are resolved like the constructor's."""
+        if isinstance(costs, ResourceVector):
+            return costs
+        vector = cls()
+        for key, amount in costs.items():
+            vector._values[_resource_index(key)] += amount  # Aliases of the same resource add up
+        return vector
+
+    # --- Mapping protocol ---
+
+    def __getitem__(self, key):
+        return self._values[RESOURCE_INDEX[key]]
+
+    def __setitem__(self, key, value):
+        self._values[RESOURCE_INDEX[key]] = value
+
+    def __delitem__(self, key):
+        raise TypeError("Resources cannot be removed from a ResourceVector.")
+
+    def __iter__(self):
+        return iter(RESOURCE_ORDER)
+
+    def __len__(self):
+        return NUM_RESOURCES
+
+    def copy(self):
+        return ResourceVector(self)
+
+    def __repr__(self):
+        return f"ResourceVector({ {res.name: amount for res, amount in zip(RESOURCE_ORDER, self._values)} })"
+
+    # --- Whole-vector operations ---
+
+    def __add__(self, other):
+        return ResourceVector._wrap(array('d', [a + b for a, b in zip(self._values, as_resource_values(other))]))
+
+    def __sub__(self, other):
+        return ResourceVector._wrap(array('d', [a - b for a, b in zip(self._values, as_resource_values(other))]))
+
+    def __mul__(self, factor):
+        return ResourceVector._wrap(array('d', [a * factor for a in self._values]))
+
+    __rmul__ = __mul__
+
+    def __iadd__(self, other):
+        values, others = self._values, as_resource_values(other)
+        for i in RESOURCE_INDICES:
+            values[i] += others[i]
+        return self
+
+    def __isub__(self, other):
+        values, others = self._values, as_resource_values(other)
+        for i in RESOURCE_INDICES:
+            values[i] -= others[i]
+        return self
+
+    def add_scaled(self, other, factor):
+        """In place: self += other * factor."""
+        values, others = self._values, as_resource_values(other)
+        for i in RESOURCE_INDICES:
+            values[i] += others[i] * factor
+        return self
+
+    def clamp(self, lower=None, upper=None):
+        """In place: each amount is capped at upper, then floored at lower."""
+        values = self._values
+        if upper is not None:
+            uppers = as_resource_values(upper)
+            for i in RESOURCE_INDICES:
+                if values[i] > uppers[i]:
+                    values[i] = uppers[i]
+        if lower is not None:
+            lowers = as_resource_values(lower)
+            for i in RESOURCE_INDICES:
+                if values[i] < lowers[i]:
+                    values[i] = lowers[i]
+        return self
+
+    def ceil(self):
+        return ResourceVector._wrap(array('d', [math.ceil(a) for a in self._values]))
+
+    def __ge__(self, other):
+        """True if every amount is >= the corresponding one of other (e.g. storage >= cost)."""
+        return all(a >= b for a, b in zip(self._values, as_resource_values(other)))
+
+    def __le__(self, other):
+        """True if every amount is <= the corresponding one of other (e.g. cost <= storage)."""
+        return all(a <= b for a, b in zip(self._values, as_resource_values(other)))
+
+    def is_affordable_from(self, available):
+        """True if available covers every positive amount of self (a cost). Zero costs never block, even in a deficit."""
+        values, others = self._values, as_resource_values(available)
+        for i in RESOURCE_INDICES:
+            if values[i] > others[i] and values[i] > 0:
+                return False
+        return True
+
+    def shortfall(self, available):
+        """{Resource: missing amount} for every resource where self (a cost) exceeds available."""
+        return {res_enum: a - b for res_enum, a, b in zip(RESOURCE_ORDER, self._values, as_resource_values(available))
+                if a > b and a > 0}
+
+    def nonzero_items(self):
+        return [(res_enum, a) for res_enum, a in zip(RESOURCE_ORDER, self._values) if a]
+
+    @staticmethod
+    def _wrap(values):
+        vector = ResourceVector.__new__(ResourceVector)
+        vector._values = values
+        return vector
+
+
+# Lower bound applied after every tick: stored resources cannot go negative, energy can (deficit)
+TICK_FLOOR = ResourceVector(fill=0.0)
+TICK_FLOOR[Resource.ENERGY] = float('-inf')
+
 
 class ResourceStorage:
     """Manages storage and retrieval of resources using Resource enums."""
     def __init__(self, initial_quantities=None):
-        self.storage = {}
-        # Initialize all defined resources to 0
-        for resource_enum_member in Resource:
-            self.storage[resource_enum_member] = 0 # Use Enum as key internally
-
-        # Apply global initial defaults
-        for res_enum, amount in INITIAL_RESOURCE_AMOUNTS.items():
-             if res_enum in self.storage:
-                 self.storage[res_enum] = amount
+        # All defined resources, initialized to the global defaults (Enum ordinal as index internally)
+        self.storage = ResourceVector(INITIAL_RESOURCE_AMOUNTS)
 
         # Override or add specific initial quantities
         if initial_quantities:
-            for key, amount in initial_quantities.items():
-                resource_enum = self._get_resource_enum(key)
-                if resource_enum:
-                    # Decide whether to add to default or replace
-                    # Current logic: Adds to the default value
-                    self.storage[resource_enum] = self.storage.get(resource_enum, 0) + amount
-                else:
-                    print(f"Warning (ResourceStorage): Unknown resource key '{key}' in initial quantities.")
+            quantities, unknown_keys = RESOURCE_RESOLVER.normalize(initial_quantities)
+            # Decide whether to add to default or replace
+            # Current logic: Adds to the default value
+            self.storage += quantities
+            for key in unknown_keys:
+                print(f"Warning (ResourceStorage): Unknown resource key '{key}' in initial quantities.")
 
         # print(f"ResourceStorage initialized with (Enum keys): {self.storage}")
 
     def _get_resource_enum(self, key):
         """Helper to convert string or Enum to Enum."""
-        if isinstance(key, Resource):
-            return key
-        elif isinstance(key, str):
-            try:
-                return Resource[key.upper()] # Try matching by uppercase name
-            except KeyError:
-                try:
-                    # Try matching by value (display name) - less efficient
-                    for res_enum in Resource:
-                        if res_enum.value.lower() == key.lower():
-                            return res_enum
-                    return None # Not found by name or value
-                except Exception: # Catch potential errors during value matching
-                    return None
-        return None # Not an Enum or valid string
+        return RESOURCE_RESOLVER.resolve(key)
+
+    def _to_cost_vector(self, costs_dict):
+        """Returns (ResourceVector of the costs, [unknown keys])."""
+        if isinstance(costs_dict, ResourceVector):
+            return costs_dict, []
+        costs, unknown_keys = RESOURCE_RESOLVER.normalize(costs_dict)
+        return ResourceVector(costs), unknown_keys
 
     def get_all_resources(self):
         """Returns a copy of the resource dictionary with string keys (enum values)."""
@@ -130,41 +336,26 @@ class ResourceStorage:
         Attempts to spend resources (dict {ResourceEnum or str: amount}).
         Returns True if successful, False otherwise. Does not spend if any cost cannot be met.
         """
-        can_afford_all, _ = self.can_afford(costs_dict)
-        if can_afford_all:
-            for key, required_amount in costs_dict.items():
-                resource_enum = self._get_resource_enum(key)
-                if resource_enum:
-                    self.storage[resource_enum] = self.storage.get(resource_enum, 0) - required_amount
-                else:
-                    # This case should ideally not be reached if can_afford works correctly
-                    print(f"Critical Error (spend_resources): Resource '{key}' not found after can_afford check.")
-                    # Consider reverting previous spends in a more robust transaction system
-                    return False # Abort spending
-            return True
-        return False
+        cost_vector, unknown_keys = self._to_cost_vector(costs_dict)
+        if unknown_keys or not cost_vector.is_affordable_from(self.storage):
+            return False
+        self.storage -= cost_vector # Single whole-vector subtraction: nothing to roll back
+        return True
 
     def can_afford(self, costs_dict):
         """
         Checks if enough resources are available (dict {ResourceEnum or str: amount}).
         Returns (bool, dict_of_missing_resources {str_value: amount_missing}).
         """
-        missing = {}
-        all_keys_valid = True
-        for key, required_amount in costs_dict.items():
-            resource_enum = self._get_resource_enum(key)
-            if not resource_enum:
-                print(f"Warning (can_afford): Unknown resource '{key}' in costs dict.")
-                missing[str(key)] = required_amount # Report as missing if key is invalid
-                all_keys_valid = False
-                continue
-
-            available = self.storage.get(resource_enum, 0)
-            if available < required_amount:
-                missing[resource_enum.value] = required_amount - available
+        cost_vector, unknown_keys = self._to_cost_vector(costs_dict)
+        if not unknown_keys and cost_vector.is_affordable_from(self.storage):
+            return True, {}
 
-        can_afford = not missing and all_keys_valid
-        return can_afford, missing
+        missing = {res_enum.value: amount for res_enum, amount in cost_vector.shortfall(self.storage).items()}
+        for key in unknown_keys:
+            print(f"Warning (can_afford): Unknown resource '{key}' in costs dict.")
+            missing[str(key)] = costs_dict[key] # Report as missing if key is invalid
+        return False, missing
 
     def __str__(self):
         # Represent with readable names as keys
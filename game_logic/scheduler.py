@@ -0,0 +1,198 @@
+# game_logic/scheduler.py
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Speed multipliers exposed to players (0 = paused)
+GAME_SPEEDS = (0, 1, 2, 5)
+DEFAULT_TICKS_PER_SECOND = 1.0
+
+# What to do with ticks that accumulated while a tick (or the host) overran its slot
+CATCH_UP_BURST = "burst"                # Run the backlog tick by tick, up to max_catch_up_ticks
+CATCH_UP_FAST_FORWARD = "fast_forward"  # Apply the whole backlog at once with GameState.advance_ticks
+CATCH_UP_SKIP = "skip"                  # Drop the backlog and keep the nominal cadence
+CATCH_UP_POLICIES = (CATCH_UP_BURST, CATCH_UP_FAST_FORWARD, CATCH_UP_SKIP)
+
+
+class RealTimeTickScheduler:
+    """
+    Drives GameState ticks from a dedicated background thread with a fixed timestep.
+    Elapsed wall time (scaled by the game speed) is accumulated and converted into whole ticks,
+    so cadence does not depend on HTTP traffic. Request threads only read state under
+    game_state.lock or queue manual ticks with run_ticks(); they never simulate inline.
+    """
+
+    def __init__(self, game_state, ticks_per_second=DEFAULT_TICKS_PER_SECOND, speed=0,
+                 catch_up_policy=CATCH_UP_BURST, max_catch_up_ticks=10):
+        if ticks_per_second <= 0:
+            raise ValueError("ticks_per_second must be positive.")
+        if catch_up_policy not in CATCH_UP_POLICIES:
+            raise ValueError(f"Unknown catch-up policy '{catch_up_policy}'. Valid: {CATCH_UP_POLICIES}")
+        if speed not in GAME_SPEEDS:
+            raise ValueError(f"Invalid game speed '{speed}'. Valid speeds: {GAME_SPEEDS}")
+        self.game_state = game_state
+        self.ticks_per_second = ticks_per_second
+        self.speed = 0
+        self.catch_up_policy = catch_up_policy
+        self.max_catch_up_ticks = max_catch_up_ticks
+
+        self.ticks_run = 0
+        self.overruns = 0
+        self._accumulator = 0.0  # Fractional ticks owed to the game
+        self._manual_ticks = 0   # Ticks requested through run_ticks(), e.g. by /api/action/next_turn
+        self._manual_done = threading.Condition()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._control_lock = threading.Lock()  # start()/stop() may race between request threads
+        self._tick_listeners = []  # Called on the scheduler thread after every tick, outside the game lock
+        self.set_speed(speed)
+
+    # --- Control (safe to call from request threads) ---
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Starts the scheduler thread; does nothing if it is already running."""
+        with self._control_lock:
+            if self.is_running():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="RealTimeTickScheduler", daemon=True)
+            self._thread.start()
+        logger.info(
+            f"Tick scheduler started: {self.ticks_per_second} ticks/s at 1x, speed {self.speed}x, catch-up '{self.catch_up_policy}'.")
+
+    def stop(self, timeout=None):
+        with self._control_lock:
+            if not self.is_running():
+                return
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout)
+        logger.info("Tick scheduler stopped.")
+
+    def set_speed(self, speed):
+        if speed not in GAME_SPEEDS:
+            return False, f"Invalid game speed '{speed}'. Valid speeds: {list(GAME_SPEEDS)}."
+        self.speed = speed
+        if speed == 0:
+            self._accumulator = 0.0  # Pausing never leaves owed ticks behind
+        self._wake.set()
+        logger.info(f"Game speed set to {speed}x.")
+        return True, f"Velocità di gioco impostata a {speed}x." if speed else "Gioco in pausa."
+
+    def set_game_state(self, game_state):
+        """Points the scheduler at a new GameState (e.g. after /start_game or a reset)."""
+        with self._manual_done:
+            self.game_state = game_state
+            self._accumulator = 0.0
+            self._manual_ticks = 0
+            self._manual_done.notify_all()
+
+    def add_tick_listener(self, callback):
+        """callback(game_state, num_ticks) runs after each tick (e.g. to wake up push streams)."""
+        self._tick_listeners.append(callback)
+
+    def run_ticks(self, num_ticks=1, timeout=10.0):
+        """Asks the scheduler thread to run num_ticks ticks and waits for them. Returns False on timeout."""
+        with self._manual_done:
+            target = self.ticks_run + self._manual_ticks + num_ticks
+            self._manual_ticks += num_ticks
+            self._wake.set()
+            return self._manual_done.wait_for(lambda: self.ticks_run >= target or self._manual_ticks == 0, timeout)
+
+    def get_status(self):
+        return {
+            "speed": self.speed,
+            "available_speeds": list(GAME_SPEEDS),
+            "ticks_per_second": self.ticks_per_second,
+            "catch_up_policy": self.catch_up_policy,
+            "ticks_run": self.ticks_run,
+            "overruns": self.overruns,
+            "running": self.is_running(),
+        }
+
+    # --- Scheduler thread ---
+
+    def _run(self):
+        last_time = time.monotonic()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if self.speed:
+                self._accumulator += (now - last_time) * self.ticks_per_second * self.speed
+            last_time = now
+
+            try:
+                self._run_manual_ticks()
+                self._run_due_ticks()
+            except Exception as e:
+                logger.error(f"Error while running scheduled ticks: {e}", exc_info=True)
+
+            # Sleep until the next tick is due (or until woken by a speed change / manual tick)
+            if self.speed:
+                tick_interval = 1.0 / (self.ticks_per_second * self.speed)
+                timeout = max(0.0, (1.0 - self._accumulator) * tick_interval)
+            else:
+                timeout = None
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _run_manual_ticks(self):
+        while self._manual_ticks:
+            try:
+                self._tick(1)
+            except Exception as e:
+                logger.error(f"Error while running a manual tick: {e}", exc_info=True)
+            finally:
+                # A failing tick is not retried: run_ticks() callers are released either way
+                with self._manual_done:
+                    self._manual_ticks = max(self._manual_ticks - 1, 0)
+                    self._manual_done.notify_all()
+
+    def _run_due_ticks(self):
+        due_ticks = int(self._accumulator)
+        if due_ticks <= 0:
+            return
+        self._accumulator -= due_ticks
+        if due_ticks == 1:
+            self._tick(1)
+            return
+
+        # More than one tick owed: a previous tick (or the process) overran its slot
+        self.overruns += 1
+        if self.catch_up_policy == CATCH_UP_SKIP:
+            logger.debug(f"Tick scheduler behind by {due_ticks} ticks: skipping backlog.")
+            self._tick(1)
+        elif self.catch_up_policy == CATCH_UP_FAST_FORWARD:
+            logger.debug(f"Tick scheduler behind by {due_ticks} ticks: fast-forwarding.")
+            self._tick(due_ticks)
+        else:
+            run_ticks = min(due_ticks, self.max_catch_up_ticks)
+            if run_ticks < due_ticks:
+                logger.warning(
+                    f"Tick scheduler behind by {due_ticks} ticks: running {run_ticks}, dropping {due_ticks - run_ticks}.")
+            for _ in range(run_ticks):
+                self._tick(1)
+
+    def _tick(self, num_ticks):
+        game_state = self.game_state
+        started = time.monotonic()
+        with game_state.lock:
+            if num_ticks == 1:
+                game_state.advance_turn()
+            else:
+                game_state.advance_ticks(num_ticks)
+        with self._manual_done:
+            self.ticks_run += num_ticks
+        for callback in self._tick_listeners:
+            try:
+                callback(game_state, num_ticks)
+            except Exception as e:  # The tick already happened: a listener must not make it run again
+                logger.error(f"Error in tick listener {callback!r}: {e}", exc_info=True)
+        elapsed = time.monotonic() - started
+        if self.speed and elapsed > 1.0 / (self.ticks_per_second * self.speed):
+            logger.warning(f"Tick overran its slot ({elapsed * 1000:.1f} ms at {self.speed}x).")
@@ -0,0 +1,84 @@
+# game_logic/serialization.py
+import json
+import logging
+from collections.abc import Mapping
+from enum import Enum
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib json module is used instead
+    orjson = None
+
+from .technologies import Technology, TechEffect
+from .hex_map import HexCell
+
+logger = logging.getLogger(__name__)
+
+if orjson is not None:
+    # Enum keys are written as their value, like Enum values
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+else:
+    ORJSON_OPTIONS = 0
+
+
+def is_orjson_available():
+    return orjson is not None
+
+
+def _json_key(key):
+    if isinstance(key, Enum):
+        return key.value
+    return key if isinstance(key, str) else str(key)
+
+
+def json_default(obj):
+    """
+    Encodes the game objects that JSON does not know: Enums (Resource, CharacterAttribute...) as their
+    value, Technology/TechEffect/HexCell via to_dict(), sets as lists, other mappings (ResourceVector,
+    ResourceArrayView) as dicts with string keys and NumPy scalars as Python numbers.
+    """
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (Technology, TechEffect, HexCell)):
+        return obj.to_dict()
+    if isinstance(obj, Mapping):
+        return {_json_key(k): v for k, v in obj.items()}
+    if hasattr(obj, "item") and callable(obj.item):  # NumPy scalar
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def to_json_compatible(data):
+    """Recursive copy of data made only of JSON types (string keys). The encoders do not need it."""
+    if isinstance(data, Mapping):
+        return {_json_key(k): to_json_compatible(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [to_json_compatible(item) for item in data]
+    if isinstance(data, (str, int, float, bool)) or data is None:
+        return data
+    try:
+        return to_json_compatible(json_default(data))
+    except TypeError:
+        return data  # Left as is: the caller decides (templates can still use its attributes)
+
+
+def dumps(obj, indent=None, sort_keys=False, **kwargs):
+    """
+    Encodes obj in one pass: with orjson if installed, else with the stdlib json module.
+    The stdlib cannot encode dicts with Enum keys (e.g. blueprint costs): those objects are
+    converted with to_json_compatible first.
+    """
+    if orjson is not None:
+        option = ORJSON_OPTIONS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=json_default, option=option).decode("utf-8")
+    kwargs.setdefault("default", json_default)
+    try:
+        return json.dumps(obj, indent=indent, sort_keys=sort_keys, **kwargs)
+    except TypeError:
+        return json.dumps(to_json_compatible(obj), indent=indent, sort_keys=sort_keys, **kwargs)
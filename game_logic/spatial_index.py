@@ -0,0 +1,202 @@
+# game_logic/spatial_index.py
+import logging
+from array import array
+
+from .hex_grid import np, NO_HEX, HEX_DIRECTIONS, hex_distance
+from .fog_of_war import HexBitset
+
+logger = logging.getLogger(__name__)
+
+# Cost of checking one hex of a ring relative to one candidate of the vectorized scan in nearest_with_resource
+RING_SCAN_COST_RATIO = 20
+
+
+class HexSpatialIndex:
+    """Neighbor table, ring/range/line queries and resource/owner/explored indexes of a MarsHexMap."""
+
+    def __init__(self, hex_map, resource_names):
+        """resource_names: bit order of the resource bitmasks of hex_map.get_resource_masks()."""
+        self.layout = hex_map.layout
+        self.neighbor_table = self._build_neighbor_table()  # Six entries per hex, NO_HEX past the map edge
+        self._resource_bits = {name: 1 << bit for bit, name in enumerate(resource_names)}
+        masks = hex_map.get_resource_masks()
+        self.resource_index = {}  # Resource name -> array of the indices of the hexes that have it (sorted)
+        self._resource_coords = {}  # Resource name -> NumPy (q, r) of those hexes, for _nearest_by_scan
+        if np is not None:
+            masks = np.asarray(masks, dtype=np.uint32)
+            self._resource_masks = array("I")
+            self._resource_masks.frombytes(masks.tobytes())
+            q, r = self.layout.coordinate_arrays()
+            for name, bit in self._resource_bits.items():
+                indices = np.flatnonzero(masks & bit)
+                self.resource_index[name] = array("i", indices.tolist())
+                self._resource_coords[name] = (q[indices].astype(np.int32), r[indices].astype(np.int32))
+        else:
+            self._resource_masks = array("I", masks)
+            for name in self._resource_bits:
+                self.resource_index[name] = array("i")
+            for index, mask in enumerate(masks):
+                for name, bit in self._resource_bits.items():
+                    if mask & bit:
+                        self.resource_index[name].append(index)
+        # Terrain and resources never change; MarsHexMap keeps these two up to date (set_hex_owner, explore_hex)
+        self.owner_index = {}  # player_id -> set of the indices of the hexes the player owns
+        self.explored = HexBitset(self.layout.count)
+        for index in hex_map.get_explored_indices():
+            self.explored.add(index)
+
+    def _build_neighbor_table(self):
+        """Flat array: the neighbors of index i are at [6 * i, 6 * i + 6), in HEX_DIRECTIONS order."""
+        layout = self.layout
+        if np is not None:
+            q, r = layout.coordinate_arrays()
+            columns = [layout.index_array(q + dq, r + dr) for dq, dr in HEX_DIRECTIONS]
+            table = array("i")
+            table.frombytes(np.stack(columns, axis=1).astype(np.int32).tobytes())
+            return table
+        table = array("i")
+        for q, r in layout.iter_coords():
+            for dq, dr in HEX_DIRECTIONS:
+                index = layout.index_of(q + dq, r + dr)
+                table.append(NO_HEX if index is None else index)
+        return table
+
+    # --- Maintenance (called by MarsHexMap) ---
+
+    def on_owner_changed(self, index, previous_owner, owner):
+        if previous_owner is not None:
+            owned = self.owner_index.get(previous_owner)
+            if owned is not None:
+                owned.discard(index)
+                if not owned:
+                    del self.owner_index[previous_owner]
+        if owner is not None:
+            self.owner_index.setdefault(owner, set()).add(index)
+
+    def on_explored(self, index, explored=True):
+        if explored:
+            self.explored.add(index)
+        else:
+            self.explored.discard(index)
+
+    # --- Queries ---
+
+    def neighbors(self, index):
+        """Indices of the neighbors of index inside the map."""
+        base = 6 * index
+        return [neighbor for neighbor in self.neighbor_table[base:base + 6] if neighbor != NO_HEX]
+
+    def ring(self, q, r, k):
+        """Indices of the hexes at distance exactly k from (q, r), walking the ring (outside ones skipped)."""
+        if k == 0:
+            index = self.layout.index_of(q, r)
+            return [] if index is None else [index]
+        indices = []
+        dq, dr = HEX_DIRECTIONS[4]
+        hex_q, hex_r = q + dq * k, r + dr * k
+        for dq, dr in HEX_DIRECTIONS:
+            for _ in range(k):
+                index = self.layout.index_of(hex_q, hex_r)
+                if index is not None:
+                    indices.append(index)
+                hex_q += dq
+                hex_r += dr
+        return indices
+
+    def in_range(self, q, r, k):
+        """Indices of the hexes within distance k of (q, r): one contiguous index range per map row."""
+        indices = []
+        for dr in range(-k, k + 1):
+            indices.extend(self.layout.row_index_range(r + dr, q + max(-k, -dr - k), q + min(k, -dr + k)))
+        return indices
+
+    def line(self, q1, r1, q2, r2):
+        """Indices of the hexes on the straight line from (q1, r1) to (q2, r2), both included."""
+        steps = hex_distance(q1, r1, q2, r2)
+        indices = []
+        for step in range(steps + 1):
+            t = step / steps if steps else 0.0
+            # Nudged off the hex edges, so that ties always round the same way
+            q = q1 + 1e-6 + (q2 - q1) * t
+            r = r1 + 1e-6 + (r2 - r1) * t
+            s = -q1 - r1 - 2e-6 + ((-q2 - r2) - (-q1 - r1)) * t
+            rq, rr, rs = round(q), round(r), round(s)
+            dq, dr, ds = abs(rq - q), abs(rr - r), abs(rs - s)
+            if dq > dr and dq > ds:
+                rq = -rr - rs
+            elif dr > ds:
+                rr = -rq - rs
+            index = self.layout.index_of(rq, rr)
+            if index is not None:
+                indices.append(index)
+        return indices
+
+    def resource_mask(self, index):
+        """Resource bitmask of the hex at index (bit order: the resource_names of the constructor)."""
+        return self._resource_masks[index]
+
+    def hexes_with_resource(self, resource, explored_only=False):
+        indices = self.resource_index.get(resource, ())
+        if explored_only:
+            return [index for index in indices if index in self.explored]
+        return list(indices)
+
+    def hexes_owned_by(self, player_id):
+        return sorted(self.owner_index.get(player_id, ()))
+
+    def nearest_with_resource(self, q, r, resource, max_distance=None, explored_only=False):
+        """Index of the nearest hex to (q, r) with resource (lowest index among equally near ones), or None."""
+        # Ring by ring while cheaper than scanning every hex with the resource (common ones are found nearby)
+        bit = self._resource_bits.get(resource)
+        if bit is None:
+            return None
+        if max_distance is None:
+            max_distance = 2 * self.layout.radius
+        candidates = len(self.resource_index[resource])
+        if explored_only:
+            candidates = min(candidates, len(self.explored))
+        scan_cost = candidates / (RING_SCAN_COST_RATIO if np is not None else 1)
+        masks = self._resource_masks
+        searched = 0
+        for k in range(max_distance + 1):
+            if searched > scan_cost:
+                return self._nearest_by_scan(q, r, resource, max_distance, explored_only)
+            ring = self.ring(q, r, k)
+            hits = [index for index in ring
+                    if masks[index] & bit and (not explored_only or index in self.explored)]
+            if hits:
+                return min(hits)
+            searched += len(ring)
+        return None
+
+    def _nearest_by_scan(self, q, r, resource, max_distance, explored_only):
+        candidates = self.resource_index[resource]
+        if np is None:
+            best, best_key = None, None
+            for index in candidates:
+                if explored_only and index not in self.explored:
+                    continue
+                distance = hex_distance(q, r, *self.layout.coords_of(index))
+                if distance <= max_distance and (best_key is None or (distance, index) < best_key):
+                    best, best_key = index, (distance, index)
+            return best
+        if not candidates:
+            return None
+        candidate_q, candidate_r = self._resource_coords[resource]
+        distances = (np.abs(candidate_q - q) + np.abs(candidate_r - r) + np.abs(candidate_q + candidate_r - q - r)) // 2
+        valid = distances <= max_distance
+        indices = np.frombuffer(candidates, dtype=np.int32)
+        if explored_only:
+            explored = np.unpackbits(np.frombuffer(self.explored.bits, dtype=np.uint8), bitorder="little")
+            valid &= explored[indices].astype(bool)
+        if not valid.any():
+            return None
+        # Candidates are sorted by index: argmin picks the lowest index among the nearest
+        return int(indices[np.argmin(np.where(valid, distances, max_distance + 1))])
+
+    def nearest_owned_by(self, q, r, player_id):
+        """Index of the nearest hex owned by player_id (lowest index among equally near ones), or None."""
+        owned = self.owner_index.get(player_id)
+        if not owned:
+            return None
+        return min(owned, key=lambda index: (hex_distance(q, r, *self.layout.coords_of(index)), index))
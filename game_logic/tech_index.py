@@ -0,0 +1,149 @@
+# game_logic/tech_index.py
+import logging
+
+from .technologies import TECH_TREE
+from .resources import ResourceVector
+
+logger = logging.getLogger(__name__)
+
+TECH_STATUS_RESEARCHED = "researched"
+TECH_STATUS_AVAILABLE = "available"
+TECH_STATUS_LOCKED = "locked"
+
+
+def _build_static_indexes():
+    """Reverse prerequisite edges, building-gated techs and compiled resource costs of TECH_TREE."""
+    dependents = {}
+    for tech_id, tech in TECH_TREE.items():
+        for prereq_id in tech.prerequisites:
+            dependents.setdefault(prereq_id, []).append(tech_id)
+    building_gated = frozenset(tech_id for tech_id, tech in TECH_TREE.items() if tech.building_prerequisites)
+    cost_vectors = {tech_id: ResourceVector.from_costs(tech.cost_resources)
+                    for tech_id, tech in TECH_TREE.items() if tech.cost_resources}
+    return dependents, building_gated, cost_vectors
+
+
+TECH_DEPENDENTS, BUILDING_GATED_TECHS, TECH_COST_VECTORS = _build_static_indexes()
+
+
+class TechStateIndex:
+    """
+    Per-player availability of every tech in TECH_TREE, kept up to date incrementally.
+    The frontier holds the techs not yet researched whose tech and building prerequisites are met;
+    a frontier tech is "available" when its resource cost is affordable from the primary habitat.
+    - An unlock updates only the techs that list it as a prerequisite (on_technology_unlocked).
+    - Building prerequisites are re-checked only when the primary habitat's "buildings" version changes,
+      affordability only when its "resources" version changes and only for the frontier techs with a cost.
+    Every status change bumps the player's "technologies" version (see versioning.py).
+    """
+
+    def __init__(self, player):
+        self.player = player
+        self.frontier = set()
+        self._costed_frontier = set()  # Frontier techs with a resource cost
+        self._missing_prerequisites = {}  # tech_id -> number of prerequisites not yet researched
+        self._buildings_met = {}
+        self._affordable = {}
+        self._statuses = {}  # tech_id -> researched/available/locked ("researching" is added by Player)
+        self._primary_habitat = None
+        self._buildings_version = None
+        self._resources_version = None
+        self._rebuild()
+
+    def _rebuild(self):
+        """Full recomputation (at creation and when the primary habitat changes)."""
+        unlocked = self.player.unlocked_technologies
+        self._primary_habitat = self.player.get_primary_habitat()
+        self._buildings_version = self._primary_habitat.versions["buildings"] if self._primary_habitat else None
+        self._resources_version = self._primary_habitat.versions["resources"] if self._primary_habitat else None
+        self.frontier.clear()
+        self._costed_frontier.clear()
+        self._affordable.clear()
+        changed = False
+        for tech_id, tech in TECH_TREE.items():
+            self._missing_prerequisites[tech_id] = sum(1 for prereq_id in tech.prerequisites if prereq_id not in unlocked)
+            self._buildings_met[tech_id] = self._check_buildings(tech)
+            changed |= self._update_tech(tech_id)
+        if changed:
+            self.player.versions.touch("technologies")
+
+    def _check_buildings(self, tech):
+        if not tech.building_prerequisites:
+            return True
+        if not self._primary_habitat:
+            return False
+        for blueprint_id, required_level in tech.building_prerequisites.items():
+            building = self._primary_habitat.buildings.get(blueprint_id)
+            if not building or building.level < required_level:
+                return False
+        return True
+
+    def _check_affordable(self, tech_id):
+        return bool(self._primary_habitat) and \
+            TECH_COST_VECTORS[tech_id].is_affordable_from(self._primary_habitat.resources)
+
+    def _update_tech(self, tech_id):
+        """Recomputes frontier membership and status of one tech. Returns True if its status changed."""
+        if tech_id in self.player.unlocked_technologies:
+            self.frontier.discard(tech_id)
+            self._costed_frontier.discard(tech_id)
+            status = TECH_STATUS_RESEARCHED
+        elif self._missing_prerequisites[tech_id] == 0 and self._buildings_met[tech_id]:
+            self.frontier.add(tech_id)
+            affordable = True
+            if tech_id in TECH_COST_VECTORS:
+                self._costed_frontier.add(tech_id)
+                affordable = self._affordable[tech_id] = self._check_affordable(tech_id)
+            status = TECH_STATUS_AVAILABLE if affordable else TECH_STATUS_LOCKED
+        else:
+            self.frontier.discard(tech_id)
+            self._costed_frontier.discard(tech_id)
+            status = TECH_STATUS_LOCKED
+        if self._statuses.get(tech_id) == status:
+            return False
+        self._statuses[tech_id] = status
+        return True
+
+    def on_technology_unlocked(self, tech_id):
+        """Called by Player.unlock_technology after adding tech_id to unlocked_technologies."""
+        if tech_id not in TECH_TREE:
+            return
+        changed = self._update_tech(tech_id)
+        for dependent_id in TECH_DEPENDENTS.get(tech_id, ()):
+            self._missing_prerequisites[dependent_id] -= 1
+            changed |= self._update_tech(dependent_id)
+        if changed:
+            self.player.versions.touch("technologies")
+
+    def sync(self):
+        """Brings building and affordability checks up to date. O(1) when the primary habitat did not change."""
+        primary_habitat = self.player.get_primary_habitat()
+        if primary_habitat is not self._primary_habitat:
+            self._rebuild()
+            return
+        if not primary_habitat:
+            return
+        changed = False
+        buildings_version = primary_habitat.versions["buildings"]
+        if buildings_version != self._buildings_version:
+            self._buildings_version = buildings_version
+            for tech_id in BUILDING_GATED_TECHS:
+                buildings_met = self._check_buildings(TECH_TREE[tech_id])
+                if buildings_met != self._buildings_met[tech_id]:
+                    self._buildings_met[tech_id] = buildings_met
+                    changed |= self._update_tech(tech_id)
+        resources_version = primary_habitat.versions["resources"]
+        if resources_version != self._resources_version:
+            self._resources_version = resources_version
+            for tech_id in tuple(self._costed_frontier):
+                if self._check_affordable(tech_id) != self._affordable.get(tech_id):
+                    changed |= self._update_tech(tech_id)
+        if changed:
+            self.player.versions.touch("technologies")
+
+    def get_status(self, tech_id):
+        """researched/available/locked as of the last sync(), or None for techs not in TECH_TREE."""
+        return self._statuses.get(tech_id)
+
+    def get_statuses(self):
+        return dict(self._statuses)
@@ -1,5 +1,5 @@
 # game_logic/technologies.py
-from .resources import Resource # Assicurati che Resource sia il tuo Enum
+from .resources import Resource, RESOURCE_RESOLVER # Assicurati che Resource sia il tuo Enum
 import logging
 
 logger = logging.getLogger(__name__)
@@ -36,7 +36,11 @@ class Technology:
         self.cost_rp = cost_rp
         self.prerequisites = prerequisites if prerequisites else []
         self.effects = effects if effects else [] # Should be list of TechEffect objects
-        self.cost_resources = cost_resources if cost_resources else {} # {ResourceEnum: amount}
+        self.cost_resources = {} # {ResourceEnum: amount}
+        if cost_resources:
+            self.cost_resources, unknown_keys = RESOURCE_RESOLVER.normalize(cost_resources)
+            for res_key in unknown_keys:
+                logger.warning(f"Technology '{id_name}': Invalid resource key '{res_key}' in cost_resources.")
         self.building_prerequisites = building_prerequisites if building_prerequisites else {} # {blueprint_id: level}
 
     def __str__(self):
@@ -741,7 +745,8 @@ def can_research(player, tech_id: str) -> (bool, str): # Aggiunto type hint per
     # Check tech prerequisites
     for prereq_id in tech.prerequisites:
         if prereq_id not in player.unlocked_technologies:
-            prereq_name = TECH_TREE.get(prereq_id, {}).get('display_name', prereq_id)
+            prereq_tech = TECH_TREE.get(prereq_id)
+            prereq_name = prereq_tech.display_name if prereq_tech else prereq_id
             return False, f"Missing prerequisite tech: '{prereq_name}'."
 
     # Check building prerequisites (requires habitat)
@@ -802,15 +807,9 @@ def apply_tech_effects(player, tech_id: str):
                     logger.warning(f"    -> Skipping modify_building_stat for '{effect.target}': No primary habitat.")
                     continue
                 
-                target_res_or_stat_for_mod = None
-                stat_key_for_mod = effect.attribute # This should be the final part like "production_modifier" or "efficiency_modifier"
-                
                 # Check if attribute targets a specific resource production/consumption
-                for res_enum in Resource: # Iterate through your Resource Enum
-                    if effect.attribute.startswith(res_enum.name + "_"): # e.g., "WATER_ICE_production_modifier"
-                        target_res_or_stat_for_mod = res_enum # The Resource Enum member itself
-                        stat_key_for_mod = effect.attribute.replace(res_enum.name + "_", "", 1) # Remove "WATER_ICE_" part
-                        break
+                # e.g. "WATER_ICE_production_modifier" -> (Resource.WATER_ICE, "production_modifier")
+                target_res_or_stat_for_mod, stat_key_for_mod = RESOURCE_RESOLVER.split_prefixed(effect.attribute)
                 # Check for generic RP production
                 if effect.attribute.startswith("ResearchPoints_"): # e.g., "ResearchPoints_production_modifier"
                      target_res_or_stat_for_mod = "ResearchPoints" # Use string key for non-Resource stats
@@ -833,13 +832,7 @@ def apply_tech_effects(player, tech_id: str):
                         logger.warning(f"    -> Skipping modify_global_stat for PlayerHabitat: No primary habitat.")
                         continue
                     # Similar logic to identify resource/stat target
-                    target_res_or_stat_for_mod = None
-                    stat_key_for_mod = effect.attribute
-                    for res_enum in Resource: # Iterate through your Resource Enum
-                        if effect.attribute.startswith(res_enum.name + "_"):
-                            target_res_or_stat_for_mod = res_enum
-                            stat_key_for_mod = effect.attribute.replace(res_enum.name + "_", "", 1)
-                            break
+                    target_res_or_stat_for_mod, stat_key_for_mod = RESOURCE_RESOLVER.split_prefixed(effect.attribute)
                     if effect.attribute.startswith("ResearchPoints_"):
                         target_res_or_stat_for_mod = "ResearchPoints"
                         stat_key_for_mod = effect.attribute.replace("ResearchPoints_", "", 1)
@@ -898,6 +891,7 @@ def apply_tech_effects(player, tech_id: str):
             logger.error(f"    -> ERROR applying effect {effect}: {e}", exc_info=True)
     
     # Ensure stats are updated after applying all effects that might influence habitat directly
+    # (apply_tech_modifier already invalidated only the affected stats)
     if primary_habitat:
-        primary_habitat._recalculate_all_stats()
+        primary_habitat._refresh_stats()
     logger.info(f"Finished applying effects for tech: {tech.display_name}")
\ No newline at end of file
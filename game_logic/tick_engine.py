@@ -0,0 +1,225 @@
+# game_logic/tick_engine.py
+import logging
+from collections.abc import MutableMapping
+
+from .resources import Resource, RESOURCE_ORDER, RESOURCE_INDEX, ResourceVector, as_resource_values
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional: without it GameState keeps the per-habitat dict tick
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Column order of every (habitat x resource) array: the ResourceVector ordinals
+NUM_RESOURCES = len(RESOURCE_ORDER)
+ENERGY_INDEX = RESOURCE_INDEX[Resource.ENERGY]
+FOOD_INDEX = RESOURCE_INDEX[Resource.FOOD]
+WATER_INDEX = RESOURCE_INDEX[Resource.WATER_ICE]
+
+# (habitat x resource) arrays, and per-habitat arrays (net_population: population net_production was computed for)
+ROW_FIELDS = ("resources", "storage_capacity", "net_production",
+              "gross_production", "consumption", "upkeep_per_capita", "upkeep_modifier")
+POPULATION_FIELDS = ("population", "max_population", "growth_rate", "morale", "net_population")
+
+INITIAL_ROW_CAPACITY = 16
+
+
+def is_vectorized_engine_available():
+    return np is not None
+
+
+class ResourceArrayView(MutableMapping):
+    """Dict-like view {Resource: amount} over one habitat row of a VectorizedTickEngine array."""
+
+    __slots__ = ("_engine", "_field", "_row")
+
+    def __init__(self, engine, field, row):
+        self._engine = engine
+        self._field = field  # Name of the engine array (it can be reallocated when the engine grows)
+        self._row = row
+
+    def __getitem__(self, key):
+        return float(getattr(self._engine, self._field)[self._row, RESOURCE_INDEX[key]])
+
+    def __setitem__(self, key, value):
+        getattr(self._engine, self._field)[self._row, RESOURCE_INDEX[key]] = value
+
+    def __delitem__(self, key):
+        raise TypeError("Resource columns cannot be removed from a ResourceArrayView.")
+
+    def __iter__(self):
+        return iter(RESOURCE_ORDER)
+
+    def __len__(self):
+        return len(RESOURCE_ORDER)
+
+    def copy(self):
+        return dict(self.items())
+
+    # Same in-place whole-row operations as ResourceVector
+    def _row_values(self):
+        return getattr(self._engine, self._field)[self._row]
+
+    def __iadd__(self, other):
+        self._row_values()[:] += np.asarray(as_resource_values(other))
+        return self
+
+    def __isub__(self, other):
+        self._row_values()[:] -= np.asarray(as_resource_values(other))
+        return self
+
+    def add_scaled(self, other, factor):
+        self._row_values()[:] += np.asarray(as_resource_values(other)) * factor
+        return self
+
+    def clamp(self, lower=None, upper=None):
+        row = self._row_values()
+        if upper is not None:
+            np.minimum(row, np.asarray(as_resource_values(upper)), out=row)
+        if lower is not None:
+            np.maximum(row, np.asarray(as_resource_values(lower)), out=row)
+        return self
+
+    def __repr__(self):
+        return f"ResourceArrayView({ {res.name: amount for res, amount in self.items()} })"
+
+
+class VectorizedTickEngine:
+    """
+    Structure-of-arrays storage for the resources, population and derived stats of every habitat in a game.
+    The net production, add/clamp/energy-deficit and population growth steps of Habitat.update_tick run for
+    all habitats at once; the attached Habitat attributes become ResourceArrayView objects over the engine rows.
+    """
+
+    def __init__(self, initial_capacity=INITIAL_ROW_CAPACITY):
+        if np is None:
+            raise RuntimeError("VectorizedTickEngine requires NumPy.")
+        self.habitats = []  # Row index -> Habitat
+        self._stale_habitats = set()  # Habitats with invalidated stats, refreshed at the next tick
+        for field in ROW_FIELDS:
+            setattr(self, field, np.zeros((initial_capacity, NUM_RESOURCES), dtype=np.float64))
+        for field in POPULATION_FIELDS:
+            setattr(self, field, np.zeros(initial_capacity, dtype=np.float64))
+        # Energy is the only resource allowed to go below zero (deficit)
+        self._floor_mask = np.ones(NUM_RESOURCES, dtype=bool)
+        self._floor_mask[ENERGY_INDEX] = False
+
+    def attach(self, habitat):
+        """Moves the habitat's resource dicts and population into the engine arrays and replaces them with views."""
+        if habitat.tick_engine is not None:
+            return habitat.tick_engine_row
+        row = len(self.habitats)
+        if row >= self.resources.shape[0]:
+            self._grow(max(INITIAL_ROW_CAPACITY, row * 2))
+
+        for res_enum, col in RESOURCE_INDEX.items():
+            self.resources[row, col] = habitat.resources.get(res_enum, 0)
+            self.storage_capacity[row, col] = habitat.storage_capacity.get(res_enum, float('inf'))
+            self.net_production[row, col] = habitat.current_net_production.get(res_enum, 0)
+        self.population[row] = habitat.population
+
+        habitat.resources = ResourceArrayView(self, "resources", row)
+        habitat.storage_capacity = ResourceArrayView(self, "storage_capacity", row)
+        habitat.current_net_production = ResourceArrayView(self, "net_production", row)
+        habitat.tick_engine = self
+        habitat.tick_engine_row = row
+        self.habitats.append(habitat)
+        self.sync(habitat)
+        logger.debug(f"Habitat '{habitat.name}' attached to vectorized tick engine (row {row}).")
+        return row
+
+    def detach(self, habitat):
+        """Gives the habitat back its own ResourceVectors and population; the last row moves into the freed one."""
+        if habitat.tick_engine is not self:
+            return
+        row = habitat.tick_engine_row
+        population = habitat.population
+        habitat.resources = ResourceVector(habitat.resources)
+        habitat.storage_capacity = ResourceVector(habitat.storage_capacity)
+        habitat.current_net_production = ResourceVector(habitat.current_net_production)
+        habitat.tick_engine = None
+        habitat.tick_engine_row = None
+        habitat.population = population
+        self._stale_habitats.discard(habitat)
+
+        last_row = len(self.habitats) - 1
+        if row != last_row:
+            for field in ROW_FIELDS + POPULATION_FIELDS:
+                values = getattr(self, field)
+                values[row] = values[last_row]
+            moved = self.habitats[last_row]
+            self.habitats[row] = moved
+            moved.tick_engine_row = row
+            for view in (moved.resources, moved.storage_capacity, moved.current_net_production):
+                view._row = row
+        self.habitats.pop()
+        logger.debug(f"Habitat '{habitat.name}' detached from vectorized tick engine (row {row}).")
+
+    def mark_stale(self, habitat):
+        """Called by Habitat.invalidate_stats: the habitat's stats are refreshed before the next array step."""
+        self._stale_habitats.add(habitat)
+
+    def sync(self, habitat):
+        """Copies the derived stats read by the array step from the habitat into its row."""
+        row = habitat.tick_engine_row
+        for res_enum, col in RESOURCE_INDEX.items():
+            self.gross_production[row, col] = habitat._gross_production.get(res_enum, 0)
+            self.consumption[row, col] = habitat._total_consumption.get(res_enum, 0)
+        for res_enum, (per_capita, modifier) in habitat._population_upkeep().items():
+            self.upkeep_per_capita[row, RESOURCE_INDEX[res_enum]] = per_capita
+            self.upkeep_modifier[row, RESOURCE_INDEX[res_enum]] = modifier
+        self.max_population[row] = habitat.max_population
+        self.growth_rate[row] = habitat.population_growth_rate
+        self.morale[row] = habitat.morale
+        self.net_population[row] = habitat._net_production_population
+
+    def _grow(self, new_capacity):
+        for field in ROW_FIELDS + POPULATION_FIELDS:
+            old = getattr(self, field)
+            grown = np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:old.shape[0]] = old
+            setattr(self, field, grown)
+        logger.debug(f"Vectorized tick engine grown to {new_capacity} rows.")
+
+    def tick(self, time_delta=1):
+        """Applies one tick of net production, resource accrual and population growth to every attached habitat."""
+        num_rows = len(self.habitats)
+        if not num_rows:
+            return
+
+        # Only habitats whose stats were invalidated go through Habitat._refresh_stats; character bonuses
+        # are picked up by Player._apply_character_bonuses, which refreshes its habitats itself
+        if self._stale_habitats:
+            stale_habitats, self._stale_habitats = self._stale_habitats, set()
+            for habitat in stale_habitats:
+                habitat._refresh_stats()
+
+        # Same operations (and float rounding) as Habitat._update_net_production: prod - (cons + pop * per_capita * mod)
+        population = self.population[:num_rows]
+        net_production = self.net_production[:num_rows]
+        np.multiply(population[:, None], self.upkeep_per_capita[:num_rows], out=net_production)
+        net_production *= self.upkeep_modifier[:num_rows]
+        net_production += self.consumption[:num_rows]
+        np.subtract(self.gross_production[:num_rows], net_production, out=net_production)
+        version = None
+        for row in np.flatnonzero(population != self.net_population[:num_rows]):
+            version = self.habitats[row].versions.touch("stats", version=version)
+        self.net_population[:num_rows] = population
+
+        resources = self.resources[:num_rows]
+        new_amounts = resources + net_production * time_delta
+        np.minimum(new_amounts, self.storage_capacity[:num_rows], out=new_amounts)
+        new_amounts[:, self._floor_mask] = np.maximum(new_amounts[:, self._floor_mask], 0)
+        resources[:] = new_amounts
+
+        for row in np.flatnonzero(resources[:, ENERGY_INDEX] < 0):
+            logger.warning(
+                f"Habitat '{self.habitats[row].name}': Energy deficit! ({resources[row, ENERGY_INDEX]:.2f}) Applying penalties...")
+
+        # Habitat._grow_population: needs food, water and room; growth = pop * rate * morale * dt
+        max_population = self.max_population[:num_rows]
+        can_grow = (resources[:, FOOD_INDEX] > 0) & (resources[:, WATER_INDEX] > 0) & (population < max_population)
+        grown = population + population * self.growth_rate[:num_rows] * self.morale[:num_rows] * time_delta
+        np.minimum(grown, max_population, out=grown)
+        np.copyto(population, grown, where=can_grow)
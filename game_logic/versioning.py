@@ -0,0 +1,54 @@
+# game_logic/versioning.py
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Process-wide counter: versions of different objects (and games) are comparable
+_version_lock = threading.Lock()
+_last_version = 0
+
+
+def next_version():
+    """Issues a new version, greater than every version issued before."""
+    global _last_version
+    with _version_lock:
+        _last_version += 1
+        return _last_version
+
+
+def current_version():
+    """The last issued version: every change made so far has a version <= this one."""
+    return _last_version
+
+
+class SectionVersions:
+    """Version of the last change of each section of an object (e.g. a Habitat's "resources")."""
+
+    __slots__ = ("_versions",)
+
+    def __init__(self, sections):
+        version = next_version()  # Every section starts at the creation of the object
+        self._versions = dict.fromkeys(sections, version)
+
+    def touch(self, *sections, version=None):
+        """Marks sections (all of them if none is given) as changed. Returns the version used."""
+        if version is None:
+            version = next_version()
+        for section in sections or tuple(self._versions):
+            if section not in self._versions:
+                raise KeyError(f"Unknown versioned section '{section}'")
+            self._versions[section] = version
+        return version
+
+    def __getitem__(self, section):
+        return self._versions[section]
+
+    def latest(self, *sections):
+        """Highest version among sections (all of them if none is given)."""
+        if not sections:
+            return max(self._versions.values())
+        return max(self._versions[section] for section in sections)
+
+    def to_dict(self):
+        return dict(self._versions)
@@ -1,3 +1,24 @@
+// Le azioni rispondono solo con l'esito, le risorse dell'habitat toccato e la versione del nuovo stato:
+// il resto arriva dallo stream o dal long poll (streamModule.js) oppure, se non sono attivi, con una richiesta ?since=.
+async function syncStateAfterAction(result) {
+    const primaryHabitat = localGameState.habitats_overview && localGameState.habitats_overview[0];
+    if (result.resources && primaryHabitat && result.habitat_id === primaryHabitat.id) {
+        localGameState.resources = result.resources;
+    }
+    const alreadyUpToDate = Number.isInteger(localGameState.version) && localGameState.version >= result.version;
+    if (!stateStream && !isLongPolling && !alreadyUpToDate) {
+        try {
+            const response = await fetch(`${API_BASE_URL}/game_state${gameStateSinceQuery()}`);
+            if (response.ok) {
+                updateLocalGameState(await response.json());
+            }
+        } catch (error) {
+            console.error("Network error fetching the state delta after an action:", error);
+        }
+    }
+    updateFullUI();
+}
+
 async function handleNextTurn() {
     if (isAdvancingTurn) {
         displayMessage("Avanzamento turno già in corso...", true, 1500);
@@ -12,9 +33,8 @@ async function handleNextTurn() {
         const response = await fetch(`${API_BASE_URL}/action/next_turn`, { method: 'POST' });
         const data = await response.json(); // Aspetta sempre la risposta JSON
         if (response.ok) {
-            updateLocalGameState(data.game_state || data); // data potrebbe contenere game_state o essere esso stesso lo stato
-            updateFullUI();
-            displayMessage(`Turno ${localGameState.current_turn} completato. Anno: ${localGameState.current_year}`, false, 3000);
+            await syncStateAfterAction(data);
+            displayMessage(`Turno ${data.current_turn} completato. Anno: ${data.current_year}`, false, 3000);
             if(data.event_messages && data.event_messages.length > 0) {
                 data.event_messages.forEach(msg => displaySystemChatMessage(msg));
             }
@@ -78,8 +98,7 @@ async function handleBuildNewBuilding(blueprintId) {
         });
         const data = await response.json();
         if (response.ok) {
-            updateLocalGameState(data.game_state || data);
-            updateFullUI(); // Aggiorna per riflettere il nuovo edificio e le risorse
+            await syncStateAfterAction(data); // Riflette il nuovo edificio e le risorse
             // displaySelectedHexInfo(selectedHexCoords.q, selectedHexCoords.r); // Ricarica info esagono selezionato
             displayMessage(`Edificio ${buildingDisplayName} costruito con successo!`, false, 3000);
         } else {
@@ -126,8 +145,7 @@ async function handleUpgradeBuilding(blueprintIdToUpgrade) {
         });
         const data = await response.json();
         if (response.ok) {
-            updateLocalGameState(data.game_state || data);
-            updateFullUI();
+            await syncStateAfterAction(data);
             displayMessage(`Edificio ${buildingDisplayName} potenziato con successo!`, false, 3000);
         } else {
             displayMessage(`Potenziamento di ${buildingDisplayName} fallito: ${data.error || response.statusText}`, true);
@@ -166,8 +184,7 @@ async function handleStartResearch(techId) {
         });
         const data = await response.json();
         if (response.ok) {
-            updateLocalGameState(data.game_state || data);
-            updateFullUI();
+            await syncStateAfterAction(data);
             displayMessage(`Ricerca per ${techName} avviata con successo!`, false, 3000);
         } else {
             displayMessage(`Avvio ricerca per ${techName} fallito: ${data.error || response.statusText}`, true);
@@ -197,8 +214,7 @@ async function handleCancelResearch(techId) {
         });
         const data = await response.json();
         if (response.ok) {
-            updateLocalGameState(data.game_state || data);
-            updateFullUI();
+            await syncStateAfterAction(data);
             displayMessage(`Ricerca per ${techName} annullata.`, false, 3000);
         } else {
             displayMessage(`Annullamento ricerca per ${techName} fallito: ${data.error || response.statusText}`, true);
@@ -222,8 +238,7 @@ async function handleExploreHex(q, r) {
         });
         const data = await response.json();
         if (response.ok) {
-            updateLocalGameState(data.game_state || data);
-            updateFullUI(); // Aggiorna mappa e info
+            await syncStateAfterAction(data); // Aggiorna mappa e info
             displayMessage(data.message || `Esplorazione di (${q},${r}) completata!`, false, 3000);
             // Se l'esagono appena esplorato era quello selezionato, aggiorna le sue info
             if (selectedHexCoords && selectedHexCoords.q === q && selectedHexCoords.r === r) {
@@ -17,6 +17,7 @@ function setupGamePage() {
 
     if (ui.hexMap) { // Assumiamo che hexMap sia il contenitore cliccabile
         ui.hexMap.addEventListener('click', handleHexClickEvent);
+        setupMapPanning();
     } else {
         console.warn("ui.hexMap not found, cannot add click listener for hexes.");
     }
@@ -33,17 +34,21 @@ async function fetchInitialGameState() {
     displayMessage("Sincronizzazione con il server...", false, 15000); // Messaggio a lunga durata
 
     try {
-        const response = await fetch(`${API_BASE_URL}/game_state`);
+        const response = await fetch(`${API_BASE_URL}/game_state?fields=${INITIAL_STATE_FIELDS.join(',')}`);
         const data = await response.json();
 
         if (response.ok) {
             console.log("GameState received:", data);
+            await loadCatalog(data.catalog_version);
             updateLocalGameState(data);
             updateFullUI(); // Aggiorna tutta l'UI con i nuovi dati
+            startStateStream(); // Da qui in poi i cambiamenti arrivano dal server (streamModule.js)
             displaySystemChatMessage("Stato del gioco sincronizzato con il server."); // Usa la funzione per i messaggi di sistema
             clearTimeout(messageTimeout); // Cancella il messaggio "Sincronizzazione..."
             displayMessage("Sincronizzazione completata.", false, 2000);
 
+            // Mappa: solo il riquadro visibile (vedi fetchMapViewport)
+            await fetchMapViewport({ reset: true });
             // Seleziona l'esagono di partenza (0,0) o il primo esagono se (0,0) non esiste
             if (localGameState.map_data && localGameState.map_data.length > 0) {
                 const startHex = localGameState.map_data.find(h => h.q === 0 && h.r === 0) || localGameState.map_data[0];
@@ -71,6 +76,20 @@ async function fetchInitialGameState() {
     }
 }
 
+// Il catalogo versionato è immutabile: dopo il primo caricamento arriva dalla cache del browser.
+async function loadCatalog(catalogVersion) {
+    if (localGameState.CATALOG && localGameState.CATALOG.version === catalogVersion) {
+        return;
+    }
+    const url = catalogVersion ? `${API_BASE_URL}/catalog/${catalogVersion}` : `${API_BASE_URL}/catalog`;
+    const response = await fetch(url);
+    if (!response.ok) {
+        throw new Error(`Catalog request failed (${response.status})`);
+    }
+    localGameState.CATALOG = await response.json();
+    console.log("Static catalog loaded, version:", localGameState.CATALOG.version);
+}
+
 function updateFullUI() {
     console.log("Updating Full UI...");
     if (!document.body.classList.contains('game-active-page')) {
@@ -14,17 +14,21 @@ let localGameState = {
     morale: 0,
     habitat_buildings: {}, // Oggetti { name: "Nome Edificio", level: X } keyed by blueprint_id
     primary_habitat_report: "",
-    technologies: {}, // Oggetti tech keyed by tech_id
+    technologies: {}, // Oggetti tech keyed by tech_id (catalogo + technology_statuses, vedi applyCatalogToGameState)
     current_research: null, // Oggetto { tech_id, progress_rp, required_rp }
     research_production: {},
     map_data: [], // Array di oggetti esagono
     events: [],
     available_actions: {},
-    available_buildings: [], // Array di oggetti blueprint disponibili per la costruzione
+    available_buildings: [], // Array di oggetti blueprint disponibili per la costruzione (catalogo + available_building_ids)
+    technology_statuses: {}, // { tech_id: status } dal server
+    available_building_ids: [], // Blueprint IDs dal server
+    CATALOG: null, // Definizioni statiche da /api/catalog/<catalog_version>
     TECH_TREE_DEFINITIONS: {}, // Caricato da Flask
     BUILDING_BLUEPRINT_DEFINITIONS: {}, // Caricato da Flask
     character: null, // Oggetto personaggio { name, level, attributes, active_bonuses_details, xp, xp_to_next_level, attribute_points_available, bonus_points_available, icon }
-    habitats_overview: [] // Array di { id: habitat_id, name: "Nome Habitat" }
+    habitats_overview: [], // Array di { id: habitat_id, name: "Nome Habitat" }
+    version: null // Versione dell'ultimo stato ricevuto dal server (vedi gameStateSinceQuery)
 };
 
 let localCharacterSetupData = {
@@ -41,10 +45,129 @@ let confirmedCharacterSelection = { type: null, idOrName: null }; // type: 'pred
 let confirmedFactionId = null;
 
 
+// Le risposte dello stato portano "version": rimandandola come ?since= il server invia solo le sezioni cambiate,
+// che updateLocalGameState unisce allo stato locale.
+function gameStateSinceQuery() {
+    return Number.isInteger(localGameState.version) ? `?since=${localGameState.version}` : "";
+}
+
+// Il server invia solo ID e stati: nomi, descrizioni e costi vengono dal catalogo statico.
+function applyCatalogToGameState() {
+    const catalog = localGameState.CATALOG;
+    if (!catalog) {
+        console.warn("Catalog not loaded yet: technologies and buildings cannot be displayed.");
+        return;
+    }
+    const technologies = {};
+    Object.entries(localGameState.technology_statuses || {}).forEach(([techId, status]) => {
+        if (catalog.technologies[techId]) {
+            technologies[techId] = { ...catalog.technologies[techId], status: status };
+        }
+    });
+    localGameState.technologies = technologies;
+    localGameState.available_buildings = (localGameState.available_building_ids || [])
+        .map(bpId => catalog.buildings[bpId])
+        .filter(Boolean);
+}
+
+// Sezioni dello stato iniziale (vedi STATE_SECTIONS): tutte tranne "map", che arriva a riquadri da /api/map
+// (vedi fetchMapViewport) e poi come delta dallo stream
+const INITIAL_STATE_FIELDS = ["clock", "profile", "character", "primary_resources", "primary_report", "primary_stats",
+    "primary_buildings", "habitats_overview", "technologies", "research", "events"];
+
+// Stesso limite del log eventi del server (MAX_EVENTS_LOG)
+const MAX_LOCAL_EVENTS = 30;
+
+// Indice "q,r" -> posizione in map_data (ricostruito quando il server invia la mappa completa)
+let mapDataIndex = null;
+// Esagoni cambiati dall'ultimo rendering della mappa: mapModule.js aggiorna solo le loro caselle
+const pendingHexKeys = new Set();
+let mapNeedsFullRender = true;
+
+function hexKey(q, r) {
+    return `${q},${r}`;
+}
+
+function getMapHex(q, r) {
+    if (!mapDataIndex) {
+        mapDataIndex = new Map(localGameState.map_data.map((hex, index) => [hexKey(hex.q, hex.r), index]));
+    }
+    const index = mapDataIndex.get(hexKey(q, r));
+    return index === undefined ? undefined : localGameState.map_data[index];
+}
+
+// Mappa completa: indice e caselle vanno ricostruiti
+function replaceMapData(mapData) {
+    localGameState.map_data = mapData;
+    mapDataIndex = null;
+    pendingHexKeys.clear();
+    mapNeedsFullRender = true;
+}
+
+// Delta: gli esagoni cambiati sostituiscono quelli con le stesse coordinate in map_data
+function applyChangedHexes(changedHexes) {
+    changedHexes.forEach(hex => {
+        const key = hexKey(hex.q, hex.r);
+        if (getMapHex(hex.q, hex.r) === undefined) {
+            mapDataIndex.set(key, localGameState.map_data.length);
+            localGameState.map_data.push(hex);
+        } else {
+            localGameState.map_data[mapDataIndex.get(key)] = hex;
+        }
+        pendingHexKeys.add(key);
+    });
+}
+
+// Risposta di /api/map (colonne parallele, vedi MarsHexMap.get_viewport_for_json): ogni esagono diventa un
+// oggetto come quelli di map_data (tabelle di decodifica dal catalogo) e viene unito come un delta.
+function applyMapViewport(viewport) {
+    const catalog = localGameState.CATALOG;
+    if (!catalog || !catalog.hex_types) {
+        console.warn("Catalog not loaded yet: the map viewport cannot be decoded.");
+        return;
+    }
+    const hexes = viewport.q.map((q, i) => {
+        const r = viewport.r[i];
+        const hex = { q: q, r: r, s: -q - r, hex_type: catalog.hex_types[viewport.type[i]], visibility_level: viewport.visibility[i] };
+        hex.is_explored = hex.visibility_level === 2;
+        if (hex.is_explored) {
+            hex.resources = catalog.hex_resources.filter((name, bit) => viewport.resources[i] & (1 << bit));
+            hex.owner_player_id = viewport.owner[i] >= 0 ? viewport.owners[viewport.owner[i]] : null;
+            hex.building = viewport.buildings[i] || null;
+            hex.poi = viewport.pois[i] || null;
+        }
+        return hex;
+    });
+    applyChangedHexes(hexes);
+}
+
+// Delta: i nuovi eventi vengono accodati. La stessa modifica può arrivare sia dallo stream sia dalla
+// risposta di un'azione: gli eventi già presenti (stessa "version") vengono ignorati.
+function appendNewEvents(newEvents) {
+    const lastEvent = localGameState.events[localGameState.events.length - 1];
+    const lastVersion = lastEvent && Number.isInteger(lastEvent.version) ? lastEvent.version : -1;
+    localGameState.events.push(...newEvents.filter(event => event.version > lastVersion));
+    if (localGameState.events.length > MAX_LOCAL_EVENTS) {
+        localGameState.events = localGameState.events.slice(-MAX_LOCAL_EVENTS);
+    }
+}
+
 function updateLocalGameState(newState) {
     console.log("Attempting to update local GState. newState received keys:", JSON.stringify(Object.keys(newState)));
     if (newState && typeof newState === 'object') {
         for (const key in newState) {
+            if (key === 'changed_hexes') {
+                applyChangedHexes(newState[key]);
+                continue;
+            }
+            if (key === 'map_data') {
+                replaceMapData(newState[key]);
+                continue;
+            }
+            if (key === 'new_events') {
+                appendNewEvents(newState[key]);
+                continue;
+            }
             if (newState.hasOwnProperty(key)) {
                 if (localGameState.hasOwnProperty(key)) {
                     // Gestione merge per oggetti (non array) per preservare eventuali sotto-proprietà non sovrascritte
@@ -60,6 +183,9 @@ function updateLocalGameState(newState) {
                 }
             }
         }
+        if ('technology_statuses' in newState || 'available_building_ids' in newState) {
+            applyCatalogToGameState();
+        }
         console.log("Local GState updated. Current turn:", localGameState.current_turn);
         console.log("localGameState.resources AFTER update:", JSON.stringify(localGameState.resources));
         // Aggiungi altri log se necessario per debug specifico, es.
@@ -1,6 +1,38 @@
+// Casella DOM di ogni esagono disegnato, per chiave "q,r" (vedi hexKey)
+const hexElementsByKey = new Map();
+
+// --- Paginazione per viewport ---
+// La mappa non arriva con lo stato: /api/map restituisce solo gli esagoni del riquadro visibile
+// (più MAP_VIEWPORT_MARGIN esagoni per lato), e trascinando la mappa si caricano i riquadri scoperti.
+// I cambiamenti degli esagoni già caricati arrivano poi come delta (changed_hexes).
+const MAP_VIEWPORT_MARGIN = 6;
+const MAP_VIEWPORT_FETCH_DELAY_MS = 150;
+let mapPanX = 0; // Spostamento (px) della mappa rispetto a (0,0) centrato
+let mapPanY = 0;
+let mapZoom = 1; // Scala della mappa (rotella del mouse): sotto 1/4 il server invia super-esagoni (LOD)
+const MAP_MIN_ZOOM = 1 / 32;
+const MAP_ZOOM_STEP = 1.25;
+let mapLod = null; // Ultima risposta LOD di /api/map: finché c'è, si disegnano i suoi super-esagoni
+let loadedMapBox = null; // Ultimo riquadro caricato { q0, r0, q1, r1 }
+let mapViewportTimer = null;
+let isFetchingMapViewport = false;
+let mapDrag = null; // Trascinamento in corso { x, y, panX, panY, moved }
+let mapWasDragged = false; // Il click che chiude un trascinamento non seleziona esagoni
+
 function updateCenterPanelMap() {
     // console.log("[updateCenterPanelMap] START - Rendering map.");
-    renderHexMap();
+    // Rendering completo solo alla prima mappa (o a una mappa completa): poi si aggiornano le sole caselle cambiate
+    if (mapLod) {
+        // Zoom ridotto: i cambiamenti arrivano come esagoni, si ricaricano i super-esagoni del riquadro
+        if (pendingHexKeys.size > 0) {
+            pendingHexKeys.clear();
+            scheduleMapViewportFetch({ refresh: true });
+        }
+    } else if (mapNeedsFullRender || hexElementsByKey.size === 0) {
+        renderHexMap();
+    } else if (pendingHexKeys.size > 0) {
+        patchHexTiles();
+    }
 
     // Gestisce l'aggiornamento del pannello info esagono.
     // Se nessun esagono è selezionato, displaySelectedHexInfo mostrerà un placeholder.
@@ -17,6 +49,9 @@ function renderHexMap() {
         console.error("HexMap UI elements (container or map itself) not found for rendering.");
         return;
     }
+    mapNeedsFullRender = false;
+    pendingHexKeys.clear();
+    hexElementsByKey.clear();
     if (!localGameState.map_data || localGameState.map_data.length === 0) {
         ui.hexMap.innerHTML = '<p class="loading-placeholder">Dati mappa non disponibili o mappa vuota.</p>';
         return;
@@ -33,97 +68,312 @@ function renderHexMap() {
     // Per centrare (0,0) nel container, l'angolo (0,0) di #hexMap deve essere spostato.
     // L'esagono (0,0) sarà disegnato a (0,0) *dentro* #hexMap.
     // Vogliamo che il *centro* di questo esagono sia al centro del container.
-    const mapLeftOffset = (containerWidth / 2) - (HEX_GFX_WIDTH / 2);
-    const mapTopOffset = (containerHeight / 2) - (HEX_GFX_HEIGHT / 2);
-
     ui.hexMap.style.position = 'absolute'; // Necessario per left/top
-    ui.hexMap.style.left = `${Math.round(mapLeftOffset)}px`;
-    ui.hexMap.style.top = `${Math.round(mapTopOffset)}px`;
+    positionHexMap();
     // console.log(`Centering map: #hexMap CSS left: ${ui.hexMap.style.left}, top: ${ui.hexMap.style.top}. Container W:${containerWidth}, H:${containerHeight}`);
 
 
     localGameState.map_data.forEach(hex => {
-        // Calcolo coordinate pixel per "pointy top" hexes, axial coordinates
-        // q = column, r = row
-        // x = size * 3/2 * q
-        // y = size * sqrt(3)/2 * q  +  size * sqrt(3) * r
-        // Questa è per "flat top". Adattiamo per "pointy top" con offset per righe.
-        // Le costanti HEX_HORIZ_SPACING e HEX_VERT_ROW_SPACING dovrebbero gestire questo.
-
-        // pixelX e pixelY sono l'angolo superiore sinistro dell'immagine dell'esagono
-        let pixelX = hex.q * HEX_HORIZ_SPACING;
-        let pixelY = hex.r * HEX_VERT_ROW_SPACING + (hex.q % 2 !== 0 ? HEX_VERT_COL_OFFSET : 0);
-
-        // console.log(`Hex (q:${hex.q}, r:${hex.r}) -> pixelX:${pixelX.toFixed(1)}, pixelY:${pixelY.toFixed(1)} (Top-left of hex image)`);
-
-        const hexElement = document.createElement('div');
-        hexElement.className = 'hex'; // Classe base per dimensioni da CSS
-        hexElement.classList.add(hex.is_explored ? (hex.hex_type || 'UnknownTerrain') : 'unexplored');
-        hexElement.style.position = 'absolute'; // Gli esagoni sono posizionati assolutamente dentro #hexMap
-        hexElement.style.left = `${Math.round(pixelX)}px`;
-        hexElement.style.top = `${Math.round(pixelY)}px`;
-        // Dimensioni width/height sono definite da .hex nel CSS ( HEX_GFX_WIDTH, HEX_GFX_HEIGHT )
-
-        hexElement.dataset.q = hex.q;
-        hexElement.dataset.r = hex.r;
-        // hexElement.dataset.s = hex.s; // s = -q-r, calcolabile se necessario
-
-        // Tooltip
-        let tooltipText = `Coordinate: (${hex.q}, ${hex.r})\nTipo: ${hex.hex_type || 'Sconosciuto'}`;
-        if (hex.is_explored) {
-            if (hex.resources && hex.resources.length > 0) {
-                tooltipText += `\nRisorse: ${hex.resources.map(r => resourceVisualsMap[r] || r).join(', ')}`;
-            }
-            if (hex.building) {
-                tooltipText += `\nEdificio: ${hex.building.name || 'N/D'} (Lvl ${hex.building.level || 1})`;
-            }
-            if (hex.poi) tooltipText += `\nPOI: ${hex.poi}`;
+        const hexElement = createHexElement(hex);
+        hexElementsByKey.set(hexKey(hex.q, hex.r), hexElement);
+        ui.hexMap.appendChild(hexElement);
+    });
+    // console.log("Map rendering with absolute positioning complete.");
+}
+
+// Sostituisce le caselle degli esagoni cambiati (pendingHexKeys) senza ridisegnare la mappa
+function patchHexTiles() {
+    pendingHexKeys.forEach(key => {
+        const [q, r] = key.split(',').map(Number);
+        const hexElement = createHexElement(getMapHex(q, r));
+        const previousElement = hexElementsByKey.get(key);
+        if (previousElement) {
+            previousElement.replaceWith(hexElement);
         } else {
-            tooltipText += "\n(Inesplorato)";
+            ui.hexMap.appendChild(hexElement);
         }
-        hexElement.title = tooltipText;
+        hexElementsByKey.set(key, hexElement);
+    });
+    pendingHexKeys.clear();
+}
 
-        if (selectedHexCoords && hex.q === selectedHexCoords.q && hex.r === selectedHexCoords.r) {
-            hexElement.classList.add('selected');
+// Posizione (px nel container) dell'origine di #hexMap, con trascinamento (mapPanX, mapPanY) e zoom
+function hexMapOrigin() {
+    return {
+        left: (ui.hexMapContainer.clientWidth / 2) - (HEX_GFX_WIDTH * mapZoom / 2) + mapPanX,
+        top: (ui.hexMapContainer.clientHeight / 2) - (HEX_GFX_HEIGHT * mapZoom / 2) + mapPanY
+    };
+}
+
+function positionHexMap() {
+    const origin = hexMapOrigin();
+    ui.hexMap.style.left = `${Math.round(origin.left)}px`;
+    ui.hexMap.style.top = `${Math.round(origin.top)}px`;
+    ui.hexMap.style.transformOrigin = '0 0';
+    ui.hexMap.style.transform = `scale(${mapZoom})`;
+}
+
+// Riquadro assiale (q0..q1, r0..r1) degli esagoni visibili nel container, dalle stesse formule di createHexElement
+function visibleMapBox() {
+    const container = ui.hexMapContainer;
+    const origin = hexMapOrigin();
+    // Pixel di #hexMap (prima dello zoom) visibili nel container
+    const left = (container.scrollLeft - origin.left) / mapZoom;
+    const top = (container.scrollTop - origin.top) / mapZoom;
+    const width = container.clientWidth / mapZoom;
+    const height = container.clientHeight / mapZoom;
+    return {
+        q0: Math.floor((left - HEX_GFX_WIDTH) / HEX_HORIZ_SPACING),
+        q1: Math.ceil((left + width) / HEX_HORIZ_SPACING),
+        r0: Math.floor((top - HEX_GFX_HEIGHT - HEX_VERT_COL_OFFSET) / HEX_VERT_ROW_SPACING),
+        r1: Math.ceil((top + height) / HEX_VERT_ROW_SPACING)
+    };
+}
+
+function isBoxLoaded(box) {
+    return loadedMapBox !== null && box.q0 >= loadedMapBox.q0 && box.q1 <= loadedMapBox.q1 &&
+        box.r0 >= loadedMapBox.r0 && box.r1 <= loadedMapBox.r1;
+}
+
+// Carica da /api/map il riquadro visibile (con margine), se non è già stato caricato.
+// reset: ricarica da zero (stato iniziale: nessun esagono di una partita precedente resta in map_data);
+// refresh: ricarica anche un riquadro già caricato (super-esagoni cambiati).
+async function fetchMapViewport({ reset = false, refresh = false } = {}) {
+    if (!ui.hexMapContainer || isFetchingMapViewport) {
+        return;
+    }
+    const visible = visibleMapBox();
+    if (!reset && !refresh && isBoxLoaded(visible)) {
+        return;
+    }
+    const margin = Math.ceil(MAP_VIEWPORT_MARGIN / mapZoom);
+    const box = {
+        q0: visible.q0 - margin, r0: visible.r0 - margin,
+        q1: visible.q1 + margin, r1: visible.r1 + margin
+    };
+    isFetchingMapViewport = true;
+    try {
+        const response = await fetch(`${API_BASE_URL}/map?q0=${box.q0}&r0=${box.r0}&q1=${box.q1}&r1=${box.r1}&zoom=${mapZoom}`);
+        const data = await response.json();
+        if (!response.ok) {
+            console.error("Error fetching map viewport:", response.status, data);
+            return;
+        }
+        loadedMapBox = box;
+        if (reset) {
+            replaceMapData([]);
+        }
+        if (data.scale) { // Super-esagoni (vedi MapLodPyramid.get_tiles_for_json)
+            mapLod = data;
+            renderLodTiles();
+            return;
         }
+        if (mapLod) { // Di nuovo esagoni singoli: la mappa va ridisegnata
+            mapLod = null;
+            mapNeedsFullRender = true;
+        }
+        applyMapViewport(data);
+        updateCenterPanelMap();
+    } catch (error) {
+        console.error("Network error fetching map viewport:", error);
+    } finally {
+        isFetchingMapViewport = false;
+    }
+}
 
-        const hexContentDiv = document.createElement('div');
-        hexContentDiv.className = 'hex-content-visuals'; // Per icone, testo, ecc. dentro l'esagono
-
-        if (hex.is_explored) {
-            if (hex.building) {
-                hexElement.classList.add('has-building');
-                const buildingIconHtml = buildingVisualsMap[hex.building.blueprint_id] || buildingVisualsMap['default'];
-                hexContentDiv.innerHTML = `<span class="hex-icon building-icon">${buildingIconHtml}</span>`;
-            } else if (hex.resources && hex.resources.length > 0) {
-                // Mostra la prima risorsa o un'icona generica
-                const primaryResource = hex.resources[0];
-                const resourceIconHtml = resourceVisualsMap[primaryResource] || resourceVisualsMap['default'];
-                hexContentDiv.innerHTML = `<span class="hex-icon resource-icon" title="${primaryResource}">${resourceIconHtml}</span>`;
-            }
-            // Rimuovi la riga di debug con coordinate pixel
-            // hexContentDiv.innerHTML+= '<span> R '+hex.r+' Q '+hex.q+'</span>'
+function scheduleMapViewportFetch(options = {}) {
+    clearTimeout(mapViewportTimer);
+    mapViewportTimer = setTimeout(() => fetchMapViewport(options), MAP_VIEWPORT_FETCH_DELAY_MS);
+}
+
+// Zoom ridotto: un super-esagono per casella, centrato sul suo esagono centrale e ingrandito di mapLod.scale
+function renderLodTiles() {
+    hexElementsByKey.clear();
+    mapNeedsFullRender = true; // Tornando agli esagoni singoli la mappa va ridisegnata
+    ui.hexMap.innerHTML = '';
+    positionHexMap();
+    for (let i = 0; i < mapLod.q.length; i++) {
+        ui.hexMap.appendChild(createLodTileElement(mapLod, i));
+    }
+}
+
+function createLodTileElement(lod, i) {
+    const q = lod.q[i] * lod.scale; // Esagono centrale del super-esagono
+    const r = lod.r[i] * lod.scale;
+    const hexType = localGameState.CATALOG.hex_types[lod.type[i]];
+    const tileElement = document.createElement('div');
+    tileElement.className = 'hex lod-tile';
+    tileElement.classList.add(lod.explored[i] > 0 ? hexType : 'unexplored');
+    tileElement.style.position = 'absolute';
+    tileElement.style.left = `${Math.round(q * HEX_HORIZ_SPACING)}px`;
+    tileElement.style.top = `${Math.round(r * HEX_VERT_ROW_SPACING + (q % 2 !== 0 ? HEX_VERT_COL_OFFSET : 0))}px`;
+    tileElement.style.transform = `scale(${lod.scale})`;
+    tileElement.dataset.tileQ = q;
+    tileElement.dataset.tileR = r;
+    if (lod.owned[i] > 0) {
+        tileElement.classList.add('player-controlled-hex');
+    }
+    const resources = localGameState.CATALOG.hex_resources.filter((name, bit) => lod.resources[i] & (1 << bit));
+    let tooltipText = `Settore (${q}, ${r}) - Terreno prevalente: ${hexType}\nEsplorati: ${lod.explored[i]}/${lod.hexes[i]}`;
+    if (resources.length > 0) {
+        tooltipText += `\nRisorse: ${resources.map(res => resourceVisualsMap[res] || res).join(', ')}`;
+    }
+    if (lod.owned[i] > 0 || lod.foreign[i] > 0) {
+        tooltipText += `\nControllati: ${lod.owned[i]} tuoi, ${lod.foreign[i]} di altri`;
+    }
+    tileElement.title = tooltipText;
+    return tileElement;
+}
+
+// Click su un super-esagono: zoom pieno centrato sul suo esagono centrale
+function zoomToHex(q, r) {
+    mapZoom = 1;
+    mapPanX = -q * HEX_HORIZ_SPACING;
+    mapPanY = -(r * HEX_VERT_ROW_SPACING + (q % 2 !== 0 ? HEX_VERT_COL_OFFSET : 0));
+    positionHexMap();
+    loadedMapBox = null;
+    fetchMapViewport();
+}
+
+function zoomMap(factor) {
+    const previousZoom = mapZoom;
+    mapZoom = Math.min(1, Math.max(MAP_MIN_ZOOM, mapZoom * factor));
+    if (mapZoom === previousZoom) {
+        return;
+    }
+    // Stesso punto della mappa al centro del container
+    mapPanX *= mapZoom / previousZoom;
+    mapPanY *= mapZoom / previousZoom;
+    positionHexMap();
+    loadedMapBox = null; // Il livello di dettaglio può cambiare: si ricarica il riquadro
+    scheduleMapViewportFetch();
+}
+
+function setupMapPanning() {
+    const container = ui.hexMapContainer;
+    if (!container || !ui.hexMap) {
+        console.warn("ui.hexMapContainer not found, map panning disabled.");
+        return;
+    }
+    container.addEventListener('mousedown', (event) => {
+        if (event.button !== 0) return;
+        mapDrag = { x: event.clientX, y: event.clientY, panX: mapPanX, panY: mapPanY, moved: false };
+    });
+    window.addEventListener('mousemove', (event) => {
+        if (!mapDrag) return;
+        const dx = event.clientX - mapDrag.x;
+        const dy = event.clientY - mapDrag.y;
+        if (Math.abs(dx) + Math.abs(dy) > 4) {
+            mapDrag.moved = true;
+            container.classList.add('panning');
+        }
+        mapPanX = mapDrag.panX + dx;
+        mapPanY = mapDrag.panY + dy;
+        positionHexMap();
+    });
+    window.addEventListener('mouseup', () => {
+        if (!mapDrag) return;
+        mapWasDragged = mapDrag.moved;
+        mapDrag = null;
+        container.classList.remove('panning');
+        if (mapWasDragged) {
+            fetchMapViewport();
         }
+    });
+    container.addEventListener('wheel', (event) => {
+        event.preventDefault();
+        zoomMap(event.deltaY < 0 ? MAP_ZOOM_STEP : 1 / MAP_ZOOM_STEP);
+    }, { passive: false });
+    container.addEventListener('scroll', () => scheduleMapViewportFetch());
+    window.addEventListener('resize', () => scheduleMapViewportFetch());
+}
 
-        if (hex.owner_player_id === localGameState.player_id) {
-            hexElement.classList.add('player-controlled-hex');
+function createHexElement(hex) {
+    // Calcolo coordinate pixel per "pointy top" hexes, axial coordinates
+    // q = column, r = row
+    // x = size * 3/2 * q
+    // y = size * sqrt(3)/2 * q  +  size * sqrt(3) * r
+    // Questa è per "flat top". Adattiamo per "pointy top" con offset per righe.
+    // Le costanti HEX_HORIZ_SPACING e HEX_VERT_ROW_SPACING dovrebbero gestire questo.
+
+    // pixelX e pixelY sono l'angolo superiore sinistro dell'immagine dell'esagono
+    let pixelX = hex.q * HEX_HORIZ_SPACING;
+    let pixelY = hex.r * HEX_VERT_ROW_SPACING + (hex.q % 2 !== 0 ? HEX_VERT_COL_OFFSET : 0);
+
+    // console.log(`Hex (q:${hex.q}, r:${hex.r}) -> pixelX:${pixelX.toFixed(1)}, pixelY:${pixelY.toFixed(1)} (Top-left of hex image)`);
+
+    const hexElement = document.createElement('div');
+    hexElement.className = 'hex'; // Classe base per dimensioni da CSS
+    hexElement.classList.add(hex.is_explored ? (hex.hex_type || 'UnknownTerrain') : 'unexplored');
+    hexElement.style.position = 'absolute'; // Gli esagoni sono posizionati assolutamente dentro #hexMap
+    hexElement.style.left = `${Math.round(pixelX)}px`;
+    hexElement.style.top = `${Math.round(pixelY)}px`;
+    // Dimensioni width/height sono definite da .hex nel CSS ( HEX_GFX_WIDTH, HEX_GFX_HEIGHT )
+
+    hexElement.dataset.q = hex.q;
+    hexElement.dataset.r = hex.r;
+    // hexElement.dataset.s = hex.s; // s = -q-r, calcolabile se necessario
+
+    // Tooltip
+    let tooltipText = `Coordinate: (${hex.q}, ${hex.r})\nTipo: ${hex.hex_type || 'Sconosciuto'}`;
+    if (hex.is_explored) {
+        if (hex.resources && hex.resources.length > 0) {
+            tooltipText += `\nRisorse: ${hex.resources.map(r => resourceVisualsMap[r] || r).join(', ')}`;
         }
-        if (hex.q === 0 && hex.r === 0) { // Esagono di partenza
-            hexElement.classList.add('player-start-hex');
+        if (hex.building) {
+            tooltipText += `\nEdificio: ${hex.building.name || 'N/D'} (Lvl ${hex.building.level || 1})`;
         }
+        if (hex.poi) tooltipText += `\nPOI: ${hex.poi}`;
+    } else {
+        tooltipText += "\n(Inesplorato)";
+    }
+    hexElement.title = tooltipText;
 
-        hexElement.appendChild(hexContentDiv);
-        ui.hexMap.appendChild(hexElement);
-    });
-    // console.log("Map rendering with absolute positioning complete.");
+    if (selectedHexCoords && hex.q === selectedHexCoords.q && hex.r === selectedHexCoords.r) {
+        hexElement.classList.add('selected');
+    }
+
+    const hexContentDiv = document.createElement('div');
+    hexContentDiv.className = 'hex-content-visuals'; // Per icone, testo, ecc. dentro l'esagono
+
+    if (hex.is_explored) {
+        if (hex.building) {
+            hexElement.classList.add('has-building');
+            const buildingIconHtml = buildingVisualsMap[hex.building.blueprint_id] || buildingVisualsMap['default'];
+            hexContentDiv.innerHTML = `<span class="hex-icon building-icon">${buildingIconHtml}</span>`;
+        } else if (hex.resources && hex.resources.length > 0) {
+            // Mostra la prima risorsa o un'icona generica
+            const primaryResource = hex.resources[0];
+            const resourceIconHtml = resourceVisualsMap[primaryResource] || resourceVisualsMap['default'];
+            hexContentDiv.innerHTML = `<span class="hex-icon resource-icon" title="${primaryResource}">${resourceIconHtml}</span>`;
+        }
+        // Rimuovi la riga di debug con coordinate pixel
+        // hexContentDiv.innerHTML+= '<span> R '+hex.r+' Q '+hex.q+'</span>'
+    }
+
+    if (hex.owner_player_id === localGameState.player_id) {
+        hexElement.classList.add('player-controlled-hex');
+    }
+    if (hex.q === 0 && hex.r === 0) { // Esagono di partenza
+        hexElement.classList.add('player-start-hex');
+    }
+
+    hexElement.appendChild(hexContentDiv);
+    return hexElement;
 }
 
 
 function handleHexClickEvent(event) {
     // console.log("Hex map click event triggered.");
+    if (mapWasDragged) { // Fine di un trascinamento, non un click
+        mapWasDragged = false;
+        return;
+    }
     const hexElement = event.target.closest('.hex');
 
-    if (hexElement) {
+    if (hexElement && hexElement.classList.contains('lod-tile')) {
+        zoomToHex(Number(hexElement.dataset.tileQ), Number(hexElement.dataset.tileR));
+    } else if (hexElement) {
         const q = parseInt(hexElement.dataset.q, 10);
         const r = parseInt(hexElement.dataset.r, 10);
 
@@ -193,7 +443,7 @@ function displaySelectedHexInfo(q, r) {
         return;
     }
 
-    const hexData = localGameState.map_data.find(h => h.q === q && h.r === r);
+    const hexData = getMapHex(q, r);
 
     if (!hexData) {
         if (hexDetailsContent) hexDetailsContent.innerHTML = '<p class="error-text">Dati esagono non trovati!</p>';
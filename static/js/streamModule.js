@@ -0,0 +1,77 @@
+// --- Push dello stato (Server-Sent Events su /api/stream) ---
+// Il server invia un messaggio "state" con le sezioni cambiate dopo ogni tick o azione;
+// l'id di ogni messaggio è la sua versione, così EventSource riprende da Last-Event-ID dopo una riconnessione.
+
+let stateStream = null;
+let isLongPolling = false;
+const LONG_POLL_WAIT_SECONDS = 25;
+
+function startStateStream() {
+    if (!window.EventSource) {
+        console.warn("EventSource not supported: falling back to long polling.");
+        startLongPolling();
+        return;
+    }
+    stopStateStream();
+    stateStream = new EventSource(`${API_BASE_URL}/stream${gameStateSinceQuery()}`);
+
+    stateStream.addEventListener('state', (event) => {
+        const delta = JSON.parse(event.data);
+        // Una risposta di un'azione può essere già più recente del messaggio
+        if (Number.isInteger(localGameState.version) && delta.version <= localGameState.version) {
+            return;
+        }
+        updateLocalGameState(delta);
+        updateFullUI();
+    });
+
+    // Il giocatore non è più nella partita (es. reset del server): si ricarica lo stato completo
+    stateStream.addEventListener('reset', () => {
+        console.warn("State stream reset by the server.");
+        stopStateStream();
+        localGameState.version = null;
+        fetchInitialGameState();
+    });
+
+    stateStream.onerror = () => {
+        console.warn("State stream interrupted, the browser will reconnect.");
+    };
+}
+
+function stopStateStream() {
+    isLongPolling = false;
+    if (stateStream) {
+        stateStream.close();
+        stateStream = null;
+    }
+}
+
+// Senza EventSource: /api/game_state?since=<versione>&wait=<secondi> risponde appena lo stato cambia
+// (o allo scadere dell'attesa, con un delta vuoto).
+async function startLongPolling() {
+    if (isLongPolling) {
+        return;
+    }
+    isLongPolling = true;
+    while (isLongPolling) {
+        try {
+            const since = Number.isInteger(localGameState.version) ? localGameState.version : 0;
+            const response = await fetch(`${API_BASE_URL}/game_state?since=${since}&wait=${LONG_POLL_WAIT_SECONDS}`);
+            if (!response.ok) {
+                console.warn("Long poll stopped, status:", response.status);
+                isLongPolling = false;
+                return;
+            }
+            const delta = await response.json();
+            if (Object.keys(delta).length > 2) { // Più di "version" e "delta"
+                updateLocalGameState(delta);
+                updateFullUI();
+            } else {
+                localGameState.version = delta.version;
+            }
+        } catch (error) {
+            console.error("Network error during long poll, retrying:", error);
+            await new Promise(resolve => setTimeout(resolve, 3000));
+        }
+    }
+}
@@ -0,0 +1,25 @@
+# tests/conftest.py
+import pytest
+
+from game_logic.character import get_predefined_character_objects
+from game_logic.factions import AVAILABLE_FACTIONS_OBJECTS
+from game_logic.game_loop_singleplayer import GameState
+from game_logic.player import Player
+
+
+def new_game(faction_id="ARCOLOGY_STATES", character_index=0, map_radius=3, **kwargs):
+    """GameState with one player (faction_id, predefined character character_index)."""
+    game_state = GameState(map_radius=map_radius, **kwargs)
+    player = Player("Test", AVAILABLE_FACTIONS_OBJECTS[faction_id], get_predefined_character_objects()[character_index])
+    game_state.add_player(player)
+    return game_state, player
+
+
+@pytest.fixture
+def game():
+    return new_game()
+
+
+@pytest.fixture
+def habitat(game):
+    return game[1].get_primary_habitat()
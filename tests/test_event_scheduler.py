@@ -0,0 +1,49 @@
+# tests/test_event_scheduler.py
+from game_logic.event_scheduler import GameEventScheduler, COMPACT_MIN_SIZE
+from game_logic.habitat import stats_affected_by_modifier
+
+from .conftest import new_game
+
+
+def test_rescheduling_compacts_cancelled_entries():
+    scheduler = GameEventScheduler()
+    owners = [("habitat", index) for index in range(COMPACT_MIN_SIZE)]
+    for owner_key in owners:
+        scheduler.schedule(100, owner_key, "storage_full")
+    for round_number in range(10):
+        for owner_key in owners:
+            scheduler.reschedule(owner_key, [(100 + round_number, "storage_full", round_number)])
+        assert len(scheduler._heap) <= 2 * len(owners)  # Never more than half cancelled entries
+    assert len(scheduler) == len(owners)
+
+    due_events = scheduler.pop_due(200)
+    assert [payload for _, _, payload in due_events] == [9] * len(owners)
+    assert [owner_key for owner_key, _, _ in due_events] == owners  # Same-tick events keep scheduling order
+    assert len(scheduler) == 0 and scheduler.peek_tick() is None
+
+
+def test_cancel_keeps_other_owners_events():
+    scheduler = GameEventScheduler()
+    scheduler.schedule(5, "a", "kind")
+    scheduler.schedule(3, "b", "kind")
+    scheduler.cancel("b")
+    assert len(scheduler) == 1
+    assert scheduler.peek_tick() == 5
+    assert scheduler.pop_due(5) == [("a", "kind", None)]
+
+
+def test_research_completes_in_the_tick_its_rate_changes():
+    game_state, player = new_game("INDO_PACIFIC_BLOCK")  # Starts with a ResearchLab
+    habitat = player.get_primary_habitat()
+    assert player.start_research("civ_t1_colonial_charter")[0]
+    for _ in range(3):
+        game_state.advance_turn()
+
+    # Refreshed inside the next tick: the cached research rate and its prediction go stale mid-tick
+    modifier_key = "ResearchPoints_production_modifier"
+    habitat.active_tech_modifiers["GLOBAL"][modifier_key] = 1000.0
+    habitat.invalidate_stats(*stats_affected_by_modifier(modifier_key))
+    game_state.advance_turn()
+
+    assert player.current_research_project is None
+    assert "civ_t1_colonial_charter" in player.unlocked_technologies
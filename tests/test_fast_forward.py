@@ -0,0 +1,55 @@
+# tests/test_fast_forward.py
+import pytest
+
+from benchmarks.synthetic_states import build_game_state
+from game_logic.game_loop_singleplayer import FAST_FORWARD_TOLERANCE
+from game_logic.resources import Resource
+
+from .conftest import new_game
+
+
+def _numbers(game_state):
+    """Clock, research, populations, stored amounts and net production of game_state, in a fixed order."""
+    numbers = [game_state.current_turn, game_state.current_year, game_state.current_tick_in_year]
+    for player in game_state.players.values():
+        numbers += [player.current_research_progress_rp, len(player.unlocked_technologies)]
+        for habitat in player.habitats.values():
+            numbers.append(habitat.population)
+            numbers += [habitat.resources.get(res_enum, 0) for res_enum in Resource]
+            numbers += [habitat.current_net_production.get(res_enum, 0) for res_enum in Resource]
+    return numbers
+
+
+def assert_fast_forward_matches(make_game_state, num_ticks):
+    looped, fast = make_game_state(), make_game_state()
+    for _ in range(num_ticks):
+        looped.advance_turn()
+    fast.advance_ticks(num_ticks)
+    expected, actual = _numbers(looped), _numbers(fast)
+    assert len(actual) == len(expected)
+    for expected_number, actual_number in zip(expected, actual):
+        assert abs(expected_number - actual_number) / max(1.0, abs(expected_number)) <= FAST_FORWARD_TOLERANCE
+
+
+@pytest.mark.parametrize("phase", ["early", "mid", "late"])
+def test_advance_ticks_matches_advance_turn(phase):
+    assert_fast_forward_matches(lambda: build_game_state(phase, num_players=3), 300)
+
+
+@pytest.mark.parametrize("num_ticks", [1, 2, 7, 150])
+def test_advance_ticks_short_runs(num_ticks):
+    assert_fast_forward_matches(lambda: build_game_state("mid", num_players=2), num_ticks)
+
+
+def test_advance_ticks_across_research_and_depletion():
+    def make_game_state():
+        # ResearchLab: research completes on the way, then food and water run out and energy goes negative
+        game_state, player = new_game("INDO_PACIFIC_BLOCK")
+        player.start_research("civ_t1_colonial_charter")
+        return game_state
+    assert_fast_forward_matches(make_game_state, 1000)
+
+
+def test_advance_ticks_with_vectorized_engine():
+    pytest.importorskip("numpy")
+    assert_fast_forward_matches(lambda: build_game_state("mid", num_players=3, vectorized_engine=True), 300)
@@ -0,0 +1,33 @@
+# tests/test_habitat_stats.py
+import pytest
+
+from game_logic.habitat import (STAT_MAX_POPULATION, STAT_STORAGE_CAPACITY, FOOD_CONSUMPTION_PER_CAPITA,
+                                WATER_CONSUMPTION_PER_CAPITA)
+from game_logic.resources import Resource
+
+
+def _fresh_net_production(habitat):
+    habitat._recalculate_all_stats()
+    return dict(habitat.current_net_production)
+
+
+@pytest.mark.parametrize("stale_section", [STAT_MAX_POPULATION, STAT_STORAGE_CAPACITY])
+def test_refresh_updates_upkeep_when_other_stats_are_dirty(habitat, stale_section):
+    habitat._refresh_stats()
+    before = dict(habitat.current_net_production)
+    habitat.population += 7
+    habitat.invalidate_stats(stale_section)  # e.g. a population_capacity_modifier tech
+    habitat._refresh_stats()
+
+    assert habitat.current_net_production[Resource.FOOD] == pytest.approx(
+        before[Resource.FOOD] - 7 * FOOD_CONSUMPTION_PER_CAPITA)
+    assert habitat.current_net_production[Resource.WATER_ICE] == pytest.approx(
+        before[Resource.WATER_ICE] - 7 * WATER_CONSUMPTION_PER_CAPITA)
+    assert dict(habitat.current_net_production) == pytest.approx(_fresh_net_production(habitat))
+
+
+def test_refresh_updates_upkeep_when_nothing_else_is_dirty(habitat):
+    habitat._refresh_stats()
+    habitat.population += 3
+    habitat._refresh_stats()
+    assert dict(habitat.current_net_production) == pytest.approx(_fresh_net_production(habitat))
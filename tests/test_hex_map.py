@@ -0,0 +1,17 @@
+# tests/test_hex_map.py
+from game_logic.fog_of_war import VISIBILITY_FOGGED, VISIBILITY_EXPLORED
+
+
+def test_set_player_hex_level_marks_the_hex_changed(game):
+    game_state, player = game
+    hex_map = game_state.map
+    index = hex_map.get_hex(0, 0).index
+    assert hex_map.get_player_visibility(player.id).level(index) == VISIBILITY_EXPLORED
+
+    since = hex_map.versions["map"]
+    hex_map.set_player_hex_level(player.id, index, VISIBILITY_FOGGED)  # e.g. undoing an exploration
+    assert hex_map.get_changed_hex_indices(since) == [index]
+
+    since = hex_map.versions["map"]
+    hex_map.set_player_hex_level(player.id, index, VISIBILITY_FOGGED)
+    assert hex_map.get_changed_hex_indices(since) == []
@@ -0,0 +1,120 @@
+# tests/test_ledger.py
+import pytest
+
+from game_logic.habitat import Habitat
+from game_logic.ledger import ResourceLedger
+from game_logic.resources import Resource, ResourceVector
+
+COST = {Resource.REGOLITH_COMPOSITES: 100, Resource.ENERGY: 50}
+
+
+@pytest.fixture
+def ledger():
+    return ResourceLedger()
+
+
+def _outpost(game_state, player):
+    habitat = Habitat(name="Outpost", faction=player.faction, player_owner_id=player.id, game_state_ref=game_state)
+    player.add_habitat(habitat)
+    return habitat
+
+
+def test_reserve_then_commit(ledger, habitat):
+    before = ResourceVector(habitat.resources)
+    with ledger.transaction() as txn:
+        assert txn.reserve(habitat, COST)
+        assert habitat.resources[Resource.REGOLITH_COMPOSITES] == before[Resource.REGOLITH_COMPOSITES] - 100
+        assert habitat.reserved_resources[Resource.ENERGY] == 50  # Held until the transaction ends
+    assert habitat.resources[Resource.ENERGY] == before[Resource.ENERGY] - 50
+    assert not any(habitat.reserved_resources.values())
+
+
+def test_failed_reserve_rolls_back_earlier_reservations(ledger, habitat):
+    before = ResourceVector(habitat.resources)
+    unaffordable = {Resource.RARE_EARTH_ELEMENTS: before[Resource.RARE_EARTH_ELEMENTS] + 10}
+    with ledger.transaction() as txn:
+        assert txn.reserve(habitat, COST)
+        assert not txn.reserve(habitat, unaffordable)
+        assert not txn.reserve(habitat, COST)  # A failed transaction reserves nothing more
+    assert txn.failed
+    assert txn.missing == {Resource.RARE_EARTH_ELEMENTS.value: 10}
+    assert dict(habitat.resources) == dict(before)
+    assert not any(habitat.reserved_resources.values())
+
+
+def test_exception_rolls_back(ledger, habitat):
+    before = ResourceVector(habitat.resources)
+    with pytest.raises(RuntimeError):
+        with ledger.transaction() as txn:
+            txn.reserve(habitat, COST)
+            raise RuntimeError("effect failed")
+    assert dict(habitat.resources) == dict(before)
+    assert not any(habitat.reserved_resources.values())
+
+
+def test_transfer_credits_up_to_capacity(ledger, game):
+    game_state, player = game
+    source, target = player.get_primary_habitat(), _outpost(game_state, player)
+    source.resources[Resource.FOOD] += 1000
+    target.resources[Resource.FOOD] = target.storage_capacity[Resource.FOOD] - 10
+    source_food = source.resources[Resource.FOOD]
+
+    assert ledger.transfer(source, target, {Resource.FOOD: 100}) == (True, {})
+    assert source.resources[Resource.FOOD] == source_food - 100
+    assert target.resources[Resource.FOOD] == target.storage_capacity[Resource.FOOD]
+
+    success, missing = ledger.transfer(source, target, {Resource.FOOD: source_food})
+    assert not success and missing == {Resource.FOOD.value: 100}
+    assert source.resources[Resource.FOOD] == source_food - 100
+
+
+def _upgrade(habitat, blueprint_id="BasicHabitatModule"):
+    return {"type": "upgrade", "habitat_id": habitat.id, "blueprint_id": blueprint_id}
+
+
+def test_batch_rolls_back_every_action(game, habitat):
+    game_state, player = game
+    for res_enum in list(habitat.resources):
+        habitat.resources[res_enum] += 5000
+    before = ResourceVector(habitat.resources)
+    max_population = habitat.max_population
+
+    success, _, results = game_state.player_batch_action(player.id, [_upgrade(habitat), _upgrade(habitat, "Nope")])
+
+    assert not success
+    assert [result["success"] for result in results] == [True, False]
+    assert habitat.buildings["BasicHabitatModule"].level == 1
+    assert habitat.max_population == max_population
+    assert dict(habitat.resources) == dict(before)
+    assert not any(habitat.reserved_resources.values())
+
+
+def test_batch_rolls_back_when_resources_run_out(game, habitat):
+    game_state, player = game
+    before = ResourceVector(habitat.resources)
+    actions = [_upgrade(habitat)] * 10  # Each level costs more than the stock left by the previous ones
+
+    success, _, results = game_state.player_batch_action(player.id, actions)
+
+    assert not success and results[0]["success"] and not results[-1]["success"]
+    assert habitat.buildings["BasicHabitatModule"].level == 1
+    assert dict(habitat.resources) == dict(before)
+
+
+def test_batch_applies_every_action(game, habitat):
+    game_state, player = game
+    for res_enum in list(habitat.resources):
+        habitat.resources[res_enum] += 5000
+
+    max_population = habitat.max_population
+
+    success, _, results = game_state.player_batch_action(player.id, [_upgrade(habitat), _upgrade(habitat)])
+
+    assert success and all(result["success"] for result in results)
+    assert habitat.buildings["BasicHabitatModule"].level == 3
+    assert not any(habitat.reserved_resources.values())
+    # Stats are refreshed once at the end of the batch
+    assert habitat.max_population > max_population
+    batch_max_population = habitat.max_population
+    habitat._recalculate_all_stats()
+    assert habitat.max_population == batch_max_population
@@ -0,0 +1,77 @@
+# tests/test_pathfinding.py
+import random
+
+import pytest
+
+from game_logic.hex_map import MarsHexMap, HEX_STORAGE_DICT, HEX_STORAGE_ARRAY
+from game_logic.pathfinding import FIELD_PROMOTION_REQUESTS
+
+
+@pytest.fixture(params=[HEX_STORAGE_DICT, HEX_STORAGE_ARRAY])
+def hex_map(request):
+    if request.param == HEX_STORAGE_ARRAY:
+        pytest.importorskip("numpy")
+    hex_map = MarsHexMap(12, storage=request.param, seed=5)
+    rng = random.Random(2)
+    for index in rng.sample(range(hex_map.layout.count), 80):
+        hex_map.set_hex_owner(hex_map.hex_at(index), rng.choice(["a", "b"]))
+    return hex_map
+
+
+def _route_cost(hex_map, path, player_id):
+    paths = hex_map.paths
+    for index, next_index in zip(path, path[1:]):
+        assert next_index in hex_map.spatial.neighbors(index)
+        assert player_id is None or paths._owners.get(next_index, player_id) == player_id
+    return sum(paths.costs[index] for index in path[1:])
+
+
+@pytest.mark.parametrize("player_id", [None, "a"])
+def test_a_star_matches_distance_field(hex_map, player_id):
+    paths, rng = hex_map.paths, random.Random(3)
+    count = hex_map.layout.count
+    for _ in range(60):
+        start, goal = rng.randrange(count), rng.randrange(count)
+        route = paths._a_star(start, goal, player_id)
+        field = paths._build_field(goal, player_id)
+        if route is None:
+            assert field.distance(start) is None and field.path_from(start) is None
+            continue
+        path, cost = route
+        assert path[0] == start and path[-1] == goal
+        assert cost == pytest.approx(field.distance(start))
+        assert _route_cost(hex_map, path, player_id) == pytest.approx(cost)
+        field_path = field.path_from(start)
+        assert field_path[0] == start and field_path[-1] == goal
+        assert _route_cost(hex_map, field_path, player_id) == pytest.approx(cost)
+
+
+def test_find_path_promotes_goal_to_a_cached_field(hex_map):
+    paths, count = hex_map.paths, hex_map.layout.count
+    goal = count // 2
+    starts = random.Random(4).sample(range(count), FIELD_PROMOTION_REQUESTS + 2)
+    for request_number, start in enumerate(starts, 1):
+        route = paths.find_path(start, goal, "a")
+        expected = paths._a_star(start, goal, "a")
+        assert (route is None) == (expected is None)
+        if route:
+            assert route[1] == pytest.approx(expected[1])
+        assert ((goal, "a") in paths._fields) == (request_number >= FIELD_PROMOTION_REQUESTS)
+
+
+def test_fields_follow_owner_and_terrain_changes(hex_map):
+    paths = hex_map.paths
+    origin = hex_map.get_hex(0, 0)
+    field = hex_map.distance_field(0, 0, "a")
+    blocked = hex_map.get_hex(1, 0)
+
+    hex_map.set_hex_owner(blocked, "b")  # Not enterable for "a" any more
+    assert hex_map.distance_field(0, 0, "a") is not field
+    hex_map.set_hex_type(hex_map.get_hex(2, -1), "Canyon")
+    refreshed = hex_map.distance_field(0, 0, "a")
+    assert refreshed.distance(blocked.index) == paths._build_field(origin.index, "a").distance(blocked.index)
+    for index in random.Random(5).sample(range(hex_map.layout.count), 40):
+        route = paths._a_star(index, origin.index, "a")
+        assert (route is None) == (refreshed.distance(index) is None)
+        if route:
+            assert route[1] == pytest.approx(refreshed.distance(index))
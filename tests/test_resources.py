@@ -0,0 +1,31 @@
+# tests/test_resources.py
+import pytest
+
+from game_logic.resources import Resource, ResourceVector, TICK_FLOOR
+
+
+@pytest.mark.parametrize("build", [ResourceVector, ResourceVector.from_costs])
+def test_vector_keys_resolve_names_and_reject_unknown_keys(build):
+    vector = build({Resource.FOOD: 1, "WATER_ICE": 2, "Energia": 3})
+    assert (vector[Resource.FOOD], vector[Resource.WATER_ICE], vector[Resource.ENERGY]) == (1, 2, 3)
+    with pytest.raises(KeyError):
+        build({"ResearchPoints": 10})
+
+
+def test_in_place_operations_keep_the_same_array():
+    vector = ResourceVector({Resource.FOOD: 10, Resource.ENERGY: 5})
+    values = vector._values
+    vector += {Resource.FOOD: 1}
+    vector -= ResourceVector({Resource.ENERGY: 10})
+    vector.add_scaled({Resource.WATER_ICE: 2}, 3)
+    vector.clamp(TICK_FLOOR, ResourceVector(fill=8))
+    assert vector._values is values
+    assert dict(vector) == {Resource.WATER_ICE: 6, Resource.REGOLITH_COMPOSITES: 0, Resource.RARE_EARTH_ELEMENTS: 0,
+                            Resource.ENERGY: -5, Resource.FOOD: 8}
+
+
+def test_zero_costs_never_block_affordability():
+    cost = ResourceVector.from_costs({Resource.FOOD: 5, Resource.ENERGY: 0})
+    assert cost.is_affordable_from(ResourceVector({Resource.FOOD: 5, Resource.ENERGY: -100}))
+    assert not cost.is_affordable_from(ResourceVector({Resource.FOOD: 4}))
+    assert cost.shortfall(ResourceVector({Resource.FOOD: 4})) == {Resource.FOOD: 1}
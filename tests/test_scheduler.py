@@ -0,0 +1,23 @@
+# tests/test_scheduler.py
+from game_logic.scheduler import RealTimeTickScheduler
+
+
+def test_start_is_idempotent_and_restartable(game):
+    game_state, _ = game
+    scheduler = RealTimeTickScheduler(game_state)
+    scheduler.stop()  # Never started: nothing to stop
+    assert not scheduler.is_running()
+
+    scheduler.start()
+    thread = scheduler._thread
+    scheduler.start()
+    assert scheduler._thread is thread and scheduler.is_running()
+
+    scheduler.stop(timeout=5)
+    assert not scheduler.is_running()
+
+    scheduler.start()  # e.g. the first request after a game reset
+    assert scheduler.is_running()
+    assert scheduler.run_ticks(2, timeout=5)
+    assert game_state.current_turn == 2
+    scheduler.stop(timeout=5)
@@ -0,0 +1,75 @@
+# tests/test_tick_engine.py
+import pytest
+
+pytest.importorskip("numpy")
+
+from game_logic.character import get_predefined_character_objects
+from game_logic.factions import AVAILABLE_FACTIONS_OBJECTS
+from game_logic.game_loop_singleplayer import GameState
+from game_logic.habitat import stats_affected_by_modifier
+from game_logic.player import Player
+from game_logic.resources import ResourceVector
+
+
+def _game_with_all_factions(vectorized_engine):
+    game_state = GameState(map_radius=3, vectorized_engine=vectorized_engine)
+    for faction_id, faction in sorted(AVAILABLE_FACTIONS_OBJECTS.items()):
+        game_state.add_player(Player(faction_id, faction, get_predefined_character_objects()[0]))
+    return game_state
+
+
+def _snapshot(game_state):
+    return [(habitat.population, dict(habitat.resources), dict(habitat.current_net_production))
+            for player in game_state.players.values() for habitat in player.habitats.values()]
+
+
+def _boost_food_production(game_state):
+    for player in game_state.players.values():
+        habitat = player.get_primary_habitat()
+        habitat.active_tech_modifiers["GLOBAL"]["FOOD_production_modifier"] = 2.0
+        habitat.invalidate_stats(*stats_affected_by_modifier("FOOD_production_modifier"))
+
+
+def test_vectorized_tick_matches_dict_tick():
+    dict_game, vector_game = _game_with_all_factions(False), _game_with_all_factions(True)
+    for tick in range(60):
+        if tick == 20:  # Invalidated stats are refreshed before the array step
+            _boost_food_production(dict_game)
+            _boost_food_production(vector_game)
+        dict_game.advance_turn()
+        vector_game.advance_turn()
+    assert _snapshot(vector_game) == _snapshot(dict_game)
+
+
+def test_population_growth_touches_stats_version():
+    game_state = _game_with_all_factions(True)
+    habitat = next(iter(game_state.players.values())).get_primary_habitat()
+    game_state.advance_turn()
+    version = habitat.versions["stats"]
+    game_state.advance_turn()  # Net production now reflects the population grown in the previous tick
+    assert habitat.versions["stats"] > version
+
+
+def test_detach_frees_the_row_and_keeps_values():
+    game_state = _game_with_all_factions(True)
+    for _ in range(10):
+        game_state.advance_turn()
+    engine = game_state.tick_engine
+    first_player, last_player = list(game_state.players.values())[0], list(game_state.players.values())[-1]
+    removed, moved = first_player.get_primary_habitat(), last_player.get_primary_habitat()
+    removed_state, moved_state = _snapshot(game_state)[0], _snapshot(game_state)[-1]
+    num_rows = len(engine.habitats)
+
+    assert first_player.remove_habitat(removed.id) is removed
+
+    assert len(engine.habitats) == num_rows - 1
+    assert removed.tick_engine is None and removed.tick_engine_row is None
+    assert isinstance(removed.resources, ResourceVector)
+    assert (removed.population, dict(removed.resources), dict(removed.current_net_production)) == removed_state
+    assert engine.habitats[moved.tick_engine_row] is moved
+    assert (moved.population, dict(moved.resources), dict(moved.current_net_production)) == moved_state
+
+    removed.invalidate_stats()  # A detached habitat no longer reaches the engine
+    assert removed not in engine._stale_habitats
+    game_state.advance_turn()
+    assert dict(removed.resources) == removed_state[1]